@@ -1,21 +1,128 @@
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
+from django.conf import settings
 from django.http import HttpResponse
 from django.template.loader import get_template
+from rest_framework.renderers import JSONRenderer
 
+import orjson
+from pypdf import PdfReader, PdfWriter
 from xhtml2pdf import pisa
 
+# Rows rendered after the parallel chunks of render_pdf_chunked, together
+# with the totals and the page footer
+PDF_TAIL_ROWS = 10
 
-def render_to_pdf(template_src, context_dict={}):
+
+def render_single_pass(template_src, context_dict={}):
     '''
-    Returns a PDF file created as per the template and dictionary passed in
-    :param template_src: The path of the html template to be used for pdf generation
-    :param context_dict: Dictionary containing variables to pass into the html template
-    :return: A PDF object that can then be sent back to client or saved on server
+    Renders the html template with the context through xhtml2pdf in one pass.
+    Raises ValueError when xhtml2pdf reports errors.
     '''
     template = get_template(template_src)
     html = template.render(context_dict)
     result = BytesIO()
     pdf = pisa.pisaDocument(BytesIO(html.encode("ISO-8859-1")), result)
     if pdf.err:
-        return HttpResponse("Invalid PDF", status_code=400, content_type='text/plain')
-    return HttpResponse(result.getvalue(), content_type='application/pdf')
+        raise ValueError('Invalid PDF')
+    return result.getvalue()
+
+
+def page_count(pdf: bytes) -> int:
+    return len(PdfReader(BytesIO(pdf)).pages)
+
+
+def render_pdf_chunked(template_src, context_dict, chunk_size: int, processes: int = None):
+    '''
+    Renders a long notes report as several documents in a process pool and
+    merges their pages with pypdf. Each process lays out one chunk of
+    `context_dict['notes']`, so peak memory per process is bounded by the
+    chunk size. The template gets a `chunk` with the S/N offset, and the
+    header goes to the first chunk only. A short tail of rows with the
+    totals is rendered last, once the page count of everything before it is
+    known, so the "page N of M" footer is correct. Every chunk starts on a
+    new page.
+    '''
+    notes = context_dict['notes']
+    tail_rows = min(len(notes), PDF_TAIL_ROWS)
+    body = notes[:len(notes) - tail_rows]
+
+    def chunk_context(rows, offset, **chunk):
+        chunk.setdefault('first', offset == 0)
+        return {**context_dict, 'notes': rows,
+                'chunk': {'offset': offset, 'last': False, 'total': len(notes), **chunk}}
+
+    contexts = [chunk_context(body[start:start + chunk_size], start)
+                for start in range(0, len(body), chunk_size)]
+    with ProcessPoolExecutor(processes) as pool:
+        parts = list(pool.map(render_single_pass, [template_src] * len(contexts), contexts))
+
+    # The tail usually fits on one page; render again in the rare case it doesn't
+    offset = sum(page_count(part) for part in parts)
+    tail_pages = 1
+    for _ in range(3):
+        tail = render_single_pass(template_src, chunk_context(
+            notes[len(body):], len(body), last=True,
+            page=offset + tail_pages, pages=offset + tail_pages))
+        if page_count(tail) == tail_pages:
+            break
+        tail_pages = page_count(tail)
+
+    writer = PdfWriter()
+    for part in parts + [tail]:
+        for page in PdfReader(BytesIO(part)).pages:
+            writer.add_page(page)
+    result = BytesIO()
+    writer.write(result)
+    return result.getvalue()
+
+
+def render_pdf_bytes(template_src, context_dict={}, mode: str = None):
+    '''
+    Returns the PDF document for the template and context as bytes, rendered
+    in one pass or, in the 'parallel' mode (NOTES_PDF_RENDER_MODE) and for
+    more than NOTES_PDF_CHUNK_SIZE notes, with render_pdf_chunked.
+    '''
+    mode = mode or getattr(settings, 'NOTES_PDF_RENDER_MODE', 'single')
+    chunk_size = getattr(settings, 'NOTES_PDF_CHUNK_SIZE', 250)
+    if mode == 'parallel' and len(context_dict.get('notes', ())) > chunk_size:
+        return render_pdf_chunked(template_src, context_dict, chunk_size,
+                                  getattr(settings, 'NOTES_PDF_PROCESSES', None))
+    return render_single_pass(template_src, context_dict)
+
+
+def render_to_pdf(template_src, context_dict={}, mode: str = None):
+    '''
+    Returns a PDF file created as per the template and dictionary passed in
+    :param template_src: The path of the html template to be used for pdf generation
+    :param context_dict: Dictionary containing variables to pass into the html template
+    :param mode: 'single' or 'parallel'; NOTES_PDF_RENDER_MODE by default
+    :return: A PDF object that can then be sent back to client or saved on server
+    '''
+    try:
+        pdf = render_pdf_bytes(template_src, context_dict, mode)
+    except ValueError:
+        return HttpResponse("Invalid PDF", status=400, content_type='text/plain')
+    return HttpResponse(pdf, content_type='application/pdf')
+
+
+class FastJSONRenderer(JSONRenderer):
+    '''
+    Drop-in JSONRenderer that encodes with orjson.
+    Output is byte-identical to JSONRenderer for compact, non-ASCII-escaped
+    JSON; indented output and anything orjson can't encode falls back to it.
+    '''
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default,
+                               option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same strict JavaScript subset escaping as JSONRenderer
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -117,6 +117,19 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        # e.g. django.core.cache.backends.filebased.FileBasedCache with a
+        # directory as CACHE_LOCATION, to share entries between workers
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'online-notes'),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -199,6 +212,12 @@ SIMPLE_JWT = {
 
 AUTH_USER_MODEL = 'core.User'
 
+# In-process caches used by core.authentication.CustomUserAuthentication
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_PRINCIPAL_CACHE_SIZE = 10000
+# Seconds a cached user may be served; bounds staleness across worker processes
+AUTH_PRINCIPAL_CACHE_TTL = 60
+
 # Register Djoser serializer
 DJOSER = {
     'SERIALIZERS': {
@@ -213,3 +232,129 @@ EMAIL_PORT = os.environ.get('SMTP_PORT')
 EMAIL_HOST_USER = os.environ.get('SMTP_USER')
 EMAIL_HOST_PASSWORD = os.environ.get('SMTP_PASS')
 EMAIL_USE_TLS = os.environ.get('SMTP_USE_TLS')
+
+# Notes list pagination (keyset/cursor based)
+NOTES_PAGINATE_BY_DEFAULT = os.environ.get(
+    'NOTES_PAGINATE_BY_DEFAULT', 'False') == 'True'
+NOTES_PAGE_SIZE = 50
+NOTES_MAX_PAGE_SIZE = 500
+# Upper bound for ?count=estimate, so counting stays O(page) on large accounts
+NOTES_COUNT_ESTIMATE_CAP = 1000
+
+# HTTP caching of note reads (ETag / Last-Modified are always sent)
+NOTES_CACHE_MAX_AGE = int(os.environ.get('NOTES_CACHE_MAX_AGE', 0))
+NOTES_STALE_WHILE_REVALIDATE = int(
+    os.environ.get('NOTES_STALE_WHILE_REVALIDATE', 30))
+
+# Server-side cache of rendered note list/detail responses
+NOTES_RESPONSE_CACHE_ENABLED = os.environ.get(
+    'NOTES_RESPONSE_CACHE_ENABLED', 'True') == 'True'
+NOTES_RESPONSE_CACHE_ALIAS = 'default'
+NOTES_RESPONSE_CACHE_TIMEOUT = 300
+
+# Serve note reads from values() rows instead of NoteSerializer instances.
+# Rendering uses orjson.
+NOTES_FAST_READ_PATH = os.environ.get('NOTES_FAST_READ_PATH', 'True') == 'True'
+
+# Full-text note search: 'auto' uses SQLite FTS5 or a MySQL FULLTEXT index
+# when available, 'table' the portable NoteSearchTerm index (backfill with
+# `manage.py rebuild_search_index` after switching to it)
+NOTES_SEARCH_BACKEND = os.environ.get('NOTES_SEARCH_BACKEND', 'auto')
+
+# Title autocomplete. Owners with up to NOTES_AUTOCOMPLETE_WARM_MAX notes are
+# served from an in-process trigram index kept for NOTES_AUTOCOMPLETE_CACHE_TTL
+# seconds; larger accounts query the NoteTitleTrigram table.
+NOTES_AUTOCOMPLETE_THRESHOLD = 0.5
+NOTES_AUTOCOMPLETE_RECENCY_WEIGHT = 0.1
+NOTES_AUTOCOMPLETE_MAX_LIMIT = 50
+NOTES_AUTOCOMPLETE_WARM_MAX = 5000
+NOTES_AUTOCOMPLETE_CACHE_SIZE = 1000
+NOTES_AUTOCOMPLETE_CACHE_TTL = 30
+
+# Serve /notes/stats/ from per-owner counters maintained on every note write
+# instead of aggregating the notes table. Run `manage.py repair_note_stats`
+# after turning this on for an existing database.
+NOTES_STATS_COUNTERS = os.environ.get('NOTES_STATS_COUNTERS', 'False') == 'True'
+
+# Upper bound on operations per POST /notes/batch/ request
+NOTES_BATCH_MAX_OPERATIONS = 500
+
+# Local working files (import error reports, export caches)
+NOTES_DATA_DIR = Path(os.environ.get('NOTES_DATA_DIR', BASE_DIR / 'var'))
+
+# Streaming note imports: rows per bulk_create batch, and where the
+# per-import files of rejected rows are kept
+NOTES_IMPORT_BATCH_SIZE = 1000
+NOTES_IMPORT_DIR = NOTES_DATA_DIR / 'imports'
+
+# Rows fetched per database round trip by the streaming CSV/JSON exports
+NOTES_EXPORT_CHUNK_SIZE = 2000
+
+# PDF reports rendered by `manage.py run_report_workers`: pool size, render
+# attempts per report, seconds before the first retry of a failed render
+# (doubled per failure up to the maximum), seconds before a report left running by a dead worker
+# is queued again, and seconds finished report files are kept
+NOTES_REPORT_DIR = NOTES_DATA_DIR / 'reports'
+NOTES_REPORT_WORKERS = int(os.environ.get('NOTES_REPORT_WORKERS', 2))
+NOTES_REPORT_MAX_ATTEMPTS = 3
+NOTES_REPORT_RETRY_DELAY = 30
+NOTES_REPORT_MAX_RETRY_DELAY = 600
+NOTES_REPORT_STALE_AFTER = 900
+NOTES_REPORT_RETENTION = 86400
+
+# Rendered PDF reports, cached by a hash of their inputs and evicted least
+# recently used first once the directory outgrows NOTES_PDF_CACHE_MAX_BYTES
+NOTES_PDF_CACHE_DIR = NOTES_DATA_DIR / 'pdf-cache'
+NOTES_PDF_CACHE_MAX_BYTES = int(os.environ.get('NOTES_PDF_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# 'parallel' renders reports of more than NOTES_PDF_CHUNK_SIZE notes as
+# chunks in a pool of NOTES_PDF_PROCESSES processes (default: one per CPU)
+# and merges the pages; 'single' renders in one xhtml2pdf pass
+NOTES_PDF_RENDER_MODE = os.environ.get('NOTES_PDF_RENDER_MODE', 'single')
+NOTES_PDF_CHUNK_SIZE = 250
+NOTES_PDF_PROCESSES = int(os.environ['NOTES_PDF_PROCESSES']) if os.environ.get('NOTES_PDF_PROCESSES') else None
+
+# PDF report engine: 'xhtml2pdf' renders app/pdf_template.html, 'reportlab'
+# draws the same report directly and is much faster. The reportlab engine
+# embeds subsets of TrueType fonts: DejaVu Sans when installed, else the
+# Vera fonts bundled with reportlab, or the regular, bold, italic and bold
+# italic files listed in NOTES_PDF_FONT_FILES
+NOTES_PDF_ENGINE = os.environ.get('NOTES_PDF_ENGINE', 'xhtml2pdf')
+NOTES_PDF_FONT_FILES = None
+
+# Email outbox drained by `manage.py dispatch_emails`: messages per batch,
+# attempts before a message becomes a dead letter, the retry delay (doubled
+# per failure up to the maximum), seconds before a message left sending by
+# a stopped dispatcher is queued again, and seconds sent messages and dead
+# letters are kept.
+# Attachments wait in NOTES_OUTBOX_DIR until they are sent
+NOTES_OUTBOX_DIR = NOTES_DATA_DIR / 'outbox'
+NOTES_OUTBOX_BATCH_SIZE = 50
+NOTES_OUTBOX_MAX_ATTEMPTS = 8
+NOTES_OUTBOX_RETRY_DELAY = 60
+NOTES_OUTBOX_MAX_RETRY_DELAY = 3600
+NOTES_OUTBOX_STALE_AFTER = 600
+NOTES_OUTBOX_RETENTION = 7 * 86400
+
+# Due-date reminders sent by `manage.py send_reminders`: unfinished notes
+# overdue or due within NOTES_REMINDER_DAYS_AHEAD days, at most
+# NOTES_REMINDER_MAX_NOTES listed per digest, NOTES_REMINDER_BATCH_SIZE
+# digests per transaction and SMTP connection. NOTES_REMINDER_WINDOW caps a
+# run in seconds; the next run resumes from the checkpoint
+NOTES_REMINDER_DAYS_AHEAD = 1
+NOTES_REMINDER_MAX_NOTES = 20
+NOTES_REMINDER_BATCH_SIZE = 200
+NOTES_REMINDER_WINDOW = None
+
+# Largest file accepted by /send_attachment/. Requests whose Content-Length
+# is already over the limit are refused before their body is read
+NOTES_ATTACHMENT_MAX_BYTES = int(os.environ.get('NOTES_ATTACHMENT_MAX_BYTES', 10 * 1024 * 1024))
+
+# Note revisions: every NOTES_REVISION_SNAPSHOT_EVERY-th is a full copy and
+# the rest are deltas, which bounds how many deltas rebuilding one applies.
+# Each note keeps its newest NOTES_REVISION_LIMIT revisions, and
+# `manage.py prune_note_revisions` deletes those older than
+# NOTES_REVISION_RETENTION days
+NOTES_REVISION_SNAPSHOT_EVERY = 10
+NOTES_REVISION_LIMIT = 50
+NOTES_REVISION_RETENTION = 365
@@ -16,3 +16,19 @@ class UserAdmin(admin.ModelAdmin):
 
 
 admin.site.register(models.User, UserAdmin)
+
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'to',
+        'subject',
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'sent_at'
+    )
+    list_filter = ('status',)
+
+
+admin.site.register(models.OutboundEmail, OutboundEmailAdmin)
@@ -1,12 +1,26 @@
+import copy
+import hashlib
 from django.conf import settings
 import jwt
 from rest_framework import authentication, exceptions
-from . import models
+from . import cache, models, services
+
+
+# Verified token payloads, keyed by a digest of the raw token
+token_cache = cache.LRUCache(
+    'auth.tokens', max_size=getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10000))
+
+# (user, principal) pairs keyed by user id; invalidated by core.signals
+principal_cache = cache.LRUCache(
+    'auth.principals', max_size=getattr(settings, 'AUTH_PRINCIPAL_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'AUTH_PRINCIPAL_CACHE_TTL', 60))
 
 
 class CustomUserAuthentication(authentication.BaseAuthentication):
     '''
     This class is responsible for authenticating a user based on their token.
+    The user and their notes owner are resolved in a single query and the
+    resulting principal is returned as `request.auth`.
     '''
 
     def authenticate(self, request):
@@ -21,15 +35,43 @@ class CustomUserAuthentication(authentication.BaseAuthentication):
         if ('Bearer' in token) or (str(token).startswith('Bearer')):
             token = str(token).replace('Bearer', '').strip()
 
-        try:
-            payload = jwt.decode(
-                token, settings.JWT_SECRET, algorithms=['HS256'])
+        payload = self.decode_token(token)
+
+        cached = principal_cache.get(payload["id"])
+        if cached is not None:
+            user, principal = cached
+            # Hand out a copy so request-level changes never leak into the cache
+            return (copy.copy(user), principal)
+
+        user = models.User.objects.select_related(
+            'owner').filter(id=payload["id"]).first()
 
-        except:
-            raise exceptions.AuthenticationFailed("Unauthorized")
+        if user is None:
+            return (None, None)
 
-        user = models.User.objects.filter(id=payload["id"]).first()
+        principal = services.PrincipalDataClass.from_instance(user)
+        principal_cache.set(user.id, (user, principal))
 
-        return (user, None)
+        return (copy.copy(user), principal)
 
         # return super().authenticate(request)
+
+    def decode_token(self, token: str) -> dict:
+        '''
+        Verify the token, reusing an earlier verification of the same token
+        until its `exp` claim passes.
+        '''
+        key = hashlib.sha256(token.encode()).digest()
+        payload = token_cache.get(key)
+
+        if payload is None:
+            try:
+                payload = jwt.decode(
+                    token, settings.JWT_SECRET, algorithms=['HS256'])
+
+            except:
+                raise exceptions.AuthenticationFailed("Unauthorized")
+
+            token_cache.set(key, payload, expires_at=payload.get("exp"))
+
+        return payload
@@ -0,0 +1,89 @@
+"""
+In-process caches and the registry their hit/miss counters are reported through.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+_stats_providers = {}
+
+
+def register_stats(name: str, provider) -> None:
+    '''
+    Register a callable returning a dict of counters, reported under `name`.
+    '''
+    _stats_providers[name] = provider
+
+
+def collect_stats() -> dict:
+    '''
+    Snapshot the counters of every registered cache.
+    '''
+    return {name: provider() for name, provider in sorted(_stats_providers.items())}
+
+
+class LRUCache:
+    '''
+    A thread-safe, size-bounded LRU mapping with optional expiry per entry.
+    Entries expire at the earlier of `ttl` seconds after insertion and the
+    absolute `expires_at` timestamp given to `set`.
+    '''
+
+    def __init__(self, name: str, max_size: int, ttl: float = None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        register_stats(name, self.stats)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.time():
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, expires_at: float = None) -> None:
+        if self.ttl is not None:
+            ttl_expiry = time.time() + self.ttl
+            expires_at = ttl_expiry if expires_at is None else min(expires_at, ttl_expiry)
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+        }
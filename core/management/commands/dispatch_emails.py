@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from core.outbox import dispatch, retry_dead
+
+
+class Command(BaseCommand):
+    help = '''
+    Send the emails queued in the outbox over a reused SMTP connection,
+    retrying failures with exponential backoff. Messages that fail
+    NOTES_OUTBOX_MAX_ATTEMPTS times are kept as dead letters.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when no email is due.')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no email is due instead of waiting for more.')
+        parser.add_argument('--retry-dead', nargs='*', type=int, metavar='ID',
+                            help='Queue dead letters (all, or the given ids) again before sending.')
+
+    def handle(self, *args, **options):
+        if options['retry_dead'] is not None:
+            retried = retry_dead(options['retry_dead'])
+            self.stdout.write(f'Queued {retried} dead emails again')
+
+        try:
+            sent = dispatch(options['poll_interval'], burst=options['burst'])
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(f'Sent {sent} emails')
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import models as auth_models
 
 # Create your models here.
@@ -70,3 +71,48 @@ class User(auth_models.AbstractUser):
 
     def __str__(self) -> str:
         return f"{self.email}"
+
+
+class OutboundEmail(models.Model):
+    '''
+    An email waiting in the outbox. Views enqueue messages here and return at
+    once; `manage.py dispatch_emails` delivers them (see core.outbox), so a
+    slow SMTP server never holds up a request.
+    '''
+    STATUS_QUEUED = 'queued'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_DEAD, 'Dead'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    to = models.EmailField(max_length=255)
+    # Attachments are spooled to NOTES_OUTBOX_DIR until the message is sent
+    attachment_path = models.CharField(max_length=500, blank=True)
+    attachment_name = models.CharField(max_length=255, blank=True)
+    attachment_type = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Retries back off exponentially from NOTES_OUTBOX_RETRY_DELAY; for dead
+    # letters, when the message died
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # The batch that claimed the message while it is being sent
+    claim = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} to {self.to} ({self.status})'
@@ -0,0 +1,265 @@
+import base64
+import datetime
+import io
+import os
+import socket
+import time
+import uuid
+from email.mime.base import MIMEBase
+from pathlib import Path
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.message import DEFAULT_ATTACHMENT_MIME_TYPE
+from django.db.models import F
+from django.utils import timezone
+from .models import OutboundEmail
+
+# Bytes of an attachment base64 encoded at a time
+ENCODE_BLOCK_SIZE = 57 * 1024
+
+
+def outbox_dir() -> Path:
+    return Path(getattr(settings, 'NOTES_OUTBOX_DIR', 'outbox'))
+
+
+def batch_size() -> int:
+    return getattr(settings, 'NOTES_OUTBOX_BATCH_SIZE', 50)
+
+
+def max_attempts() -> int:
+    return getattr(settings, 'NOTES_OUTBOX_MAX_ATTEMPTS', 8)
+
+
+def retry_delay(attempts: int) -> datetime.timedelta:
+    '''
+    Wait before retrying a message that has failed `attempts` times:
+    NOTES_OUTBOX_RETRY_DELAY seconds, doubled per failure up to
+    NOTES_OUTBOX_MAX_RETRY_DELAY.
+    '''
+    base = getattr(settings, 'NOTES_OUTBOX_RETRY_DELAY', 60)
+    ceiling = getattr(settings, 'NOTES_OUTBOX_MAX_RETRY_DELAY', 3600)
+    return datetime.timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), ceiling))
+
+
+def spool_attachment(file) -> Path:
+    '''
+    Keep an uploaded file in the outbox directory, so the message can be
+    sent after the request is gone. Uploads Django already spooled to a
+    temporary file are moved; small in-memory ones are written out.
+    '''
+    directory = outbox_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / uuid.uuid4().hex
+    if hasattr(file, 'temporary_file_path'):
+        file_move_safe(file.temporary_file_path(), path)
+        return path
+    with open(path, 'wb') as destination:
+        for chunk in file.chunks():
+            destination.write(chunk)
+    return path
+
+
+def encode_attachment(path: str, name: str, content_type: str) -> MIMEBase:
+    '''
+    A base64 MIME part of the file, encoded from disk a block at a time so
+    the raw file is never held in memory alongside its encoding. Blocks are
+    a multiple of 57 bytes, one 76 character line of base64 each.
+    '''
+    encoded = io.StringIO()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(ENCODE_BLOCK_SIZE), b''):
+            encoded.write(base64.encodebytes(block).decode('ascii'))
+
+    part = MIMEBase(*(content_type or DEFAULT_ATTACHMENT_MIME_TYPE).split('/', 1))
+    part.set_payload(encoded.getvalue())
+    part['Content-Transfer-Encoding'] = 'base64'
+    try:
+        name.encode('ascii')
+    except UnicodeEncodeError:
+        name = ('utf-8', '', name)
+    part.add_header('Content-Disposition', 'attachment', filename=name)
+    return part
+
+
+def enqueue_email(data: dict) -> OutboundEmail:
+    '''
+    Queue an email built from the same `data` as Util.send_verifyEmail:
+    email_subject, email_body, email_address and an optional uploaded file.
+    '''
+    email = OutboundEmail(subject=data['email_subject'], body=data['email_body'], to=data['email_address'])
+    file = data.get('file')
+    if file is not None:
+        email.attachment_path = str(spool_attachment(file))
+        email.attachment_name = file.name
+        email.attachment_type = file.content_type or ''
+    email.save()
+    return email
+
+
+def new_claim() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def claimed(claim: str) -> list:
+    '''
+    The messages being sent under `claim`.
+    '''
+    return list(OutboundEmail.objects.filter(claim=claim, status=OutboundEmail.STATUS_SENDING).order_by('id'))
+
+
+def enqueue_emails(messages: list, claim: str = None) -> list:
+    '''
+    Queue many emails without attachments with one INSERT. `messages` are
+    `data` dicts as for enqueue_email(). With `claim`, the messages are
+    inserted already claimed under it, for the caller to send them itself
+    with claimed() and send_batch(); dispatchers leave them alone unless
+    they go stale. Rows are found by the claim rather than by primary key,
+    which bulk_create doesn't set on every database.
+    '''
+    fields = {}
+    if claim:
+        fields = {'status': OutboundEmail.STATUS_SENDING, 'claim': claim,
+                  'claimed_at': timezone.now(), 'attempts': 1}
+    return OutboundEmail.objects.bulk_create([
+        OutboundEmail(subject=data['email_subject'], body=data['email_body'], to=data['email_address'], **fields)
+        for data in messages])
+
+
+def claim_batch(size: int = None) -> list:
+    '''
+    Claim up to `size` messages that are due. The claim is one conditional
+    UPDATE tagged with a token, so concurrent dispatchers never send the
+    same message twice.
+    '''
+    now = timezone.now()
+    due = list(OutboundEmail.objects.filter(
+        status=OutboundEmail.STATUS_QUEUED, next_attempt_at__lte=now
+    ).order_by('next_attempt_at', 'id').values_list('id', flat=True)[:size or batch_size()])
+    if not due:
+        return []
+
+    claim = new_claim()
+    OutboundEmail.objects.filter(pk__in=due, status=OutboundEmail.STATUS_QUEUED).update(
+        status=OutboundEmail.STATUS_SENDING, claim=claim, claimed_at=now, attempts=F('attempts') + 1)
+    return claimed(claim)
+
+
+def build_message(email: OutboundEmail, connection) -> EmailMessage:
+    message = EmailMessage(subject=email.subject, body=email.body, to=[email.to], connection=connection)
+    if email.attachment_path:
+        message.attach(encode_attachment(email.attachment_path, email.attachment_name, email.attachment_type))
+    return message
+
+
+def mark_sent(emails: list) -> None:
+    OutboundEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+        status=OutboundEmail.STATUS_SENT, claim='', last_error='', sent_at=timezone.now())
+    for email in emails:
+        if email.attachment_path:
+            Path(email.attachment_path).unlink(missing_ok=True)
+
+
+def mark_failed(email: OutboundEmail, error: Exception) -> None:
+    '''
+    Schedule the message for another attempt, or move it to the dead letters
+    once it has used up NOTES_OUTBOX_MAX_ATTEMPTS. Dead messages keep their
+    attachment until they are retried or purged, and their next_attempt_at
+    is when they died.
+    '''
+    dead = email.attempts >= max_attempts()
+    OutboundEmail.objects.filter(pk=email.pk).update(
+        status=OutboundEmail.STATUS_DEAD if dead else OutboundEmail.STATUS_QUEUED, claim='',
+        last_error=str(error) or error.__class__.__name__,
+        next_attempt_at=timezone.now() if dead else timezone.now() + retry_delay(email.attempts))
+
+
+def send_batch(batch: list, connection) -> int:
+    '''
+    Send the claimed messages one by one over `connection`. Failures are
+    recorded as they happen and close the connection, which is reopened for
+    the next message; the sent ones are marked with a single UPDATE at the
+    end. Returns the messages sent.
+    '''
+    sent = []
+    for email in batch:
+        try:
+            connection.open()
+            if not build_message(email, connection).send():
+                raise ValueError('The email backend did not accept the message.')
+        except Exception as e:
+            connection.close()
+            mark_failed(email, e)
+            continue
+        sent.append(email)
+    if sent:
+        mark_sent(sent)
+    return len(sent)
+
+
+def requeue_stale() -> int:
+    '''
+    Put back messages left sending by a dispatcher that stopped, after
+    NOTES_OUTBOX_STALE_AFTER seconds, or move them to the dead letters once
+    they have used up their attempts. Delivery is at least once: a message
+    the server accepted just before the dispatcher died is sent again.
+    '''
+    cutoff = timezone.now() - datetime.timedelta(seconds=getattr(settings, 'NOTES_OUTBOX_STALE_AFTER', 600))
+    stale = OutboundEmail.objects.filter(status=OutboundEmail.STATUS_SENDING, claimed_at__lt=cutoff)
+    dead = stale.filter(attempts__gte=max_attempts()).update(
+        status=OutboundEmail.STATUS_DEAD, claim='', next_attempt_at=timezone.now(),
+        last_error='The dispatcher stopped before sending the message.')
+    return dead + stale.update(status=OutboundEmail.STATUS_QUEUED, claim='', next_attempt_at=timezone.now())
+
+
+def retry_dead(ids: list = None) -> int:
+    '''
+    Queue dead messages (all of them, or those in `ids`) again with a fresh
+    set of attempts.
+    '''
+    dead = OutboundEmail.objects.filter(status=OutboundEmail.STATUS_DEAD)
+    if ids:
+        dead = dead.filter(pk__in=ids)
+    return dead.update(status=OutboundEmail.STATUS_QUEUED, attempts=0, next_attempt_at=timezone.now())
+
+
+def purge_sent() -> int:
+    '''
+    Delete messages sent, and dead letters that died, more than
+    NOTES_OUTBOX_RETENTION seconds ago, with the attachments the dead ones
+    still kept.
+    '''
+    cutoff = timezone.now() - datetime.timedelta(seconds=getattr(settings, 'NOTES_OUTBOX_RETENTION', 7 * 86400))
+    deleted, _ = OutboundEmail.objects.filter(status=OutboundEmail.STATUS_SENT, sent_at__lt=cutoff).delete()
+    dead = list(OutboundEmail.objects.filter(status=OutboundEmail.STATUS_DEAD, next_attempt_at__lt=cutoff))
+    for email in dead:
+        if email.attachment_path:
+            Path(email.attachment_path).unlink(missing_ok=True)
+    if dead:
+        deleted += OutboundEmail.objects.filter(pk__in=[email.pk for email in dead]).delete()[0]
+    return deleted
+
+
+def dispatch(poll_interval: float = 1.0, burst: bool = False) -> int:
+    '''
+    Dispatcher loop: send due messages in batches of NOTES_OUTBOX_BATCH_SIZE
+    over one SMTP connection, kept open while there is work and closed when
+    the outbox is empty so the server doesn't time it out. With `burst`,
+    return once nothing is due. Returns the messages sent.
+    '''
+    connection = get_connection()
+    sent = 0
+    try:
+        while True:
+            batch = claim_batch()
+            if batch:
+                sent += send_batch(batch, connection)
+                continue
+            connection.close()
+            requeue_stale()
+            purge_sent()
+            if burst:
+                return sent
+            time.sleep(poll_interval)
+    finally:
+        connection.close()
@@ -4,6 +4,7 @@ import jwt
 from typing import TYPE_CHECKING
 from . import models
 from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
 from django.core.mail import EmailMessage
 from django.db import IntegrityError
 from rest_framework import response, status
@@ -66,6 +67,31 @@ class UserLoginDataClass:
         )
 
 
+@dataclasses.dataclass(frozen=True)
+class PrincipalDataClass:
+    '''
+    The authenticated requester, resolved once per request by the authentication
+    class and exposed to views as `request.auth`.
+    '''
+    user_id: int
+    owner_id: int
+    email: str
+
+    @classmethod
+    def from_instance(cls, user: 'User') -> "PrincipalDataClass":
+        '''
+        Builds the principal from a user loaded with `select_related('owner')`,
+        provisioning the owner for accounts that predate automatic provisioning.
+        '''
+        try:
+            owner_id = user.owner.id
+        except ObjectDoesNotExist:
+            from notebook.services import provision_owner
+            owner_id = provision_owner(user.id).id
+
+        return cls(user_id=user.id, owner_id=owner_id, email=user.email)
+
+
 def create_user(user: "UserDataClass") -> "UserDataClass":
     '''
     Creates and returns an instance of `User` with given data.
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import principal_cache
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_principal(sender, instance, **kwargs):
+    '''
+    Drop the cached principal whenever the user row changes, which covers
+    profile edits, deactivation and password changes.
+    '''
+    principal_cache.delete(instance.id)
+
+
+@receiver(post_save, sender='notebook.Owner')
+@receiver(post_delete, sender='notebook.Owner')
+def invalidate_owner_principal(sender, instance, **kwargs):
+    principal_cache.delete(instance.user_id)
@@ -1,11 +1,25 @@
-from django.test import Client
+from django.conf import settings
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
 from rest_framework import status
+from core.authentication import principal_cache, token_cache
+from core import outbox
+from core.models import OutboundEmail, User
+from core.services import generate_token
+from notebook.models import Owner
+from rest_framework_simplejwt.tokens import RefreshToken
+import jwt
+import time
 import unittest
 from unittest.mock import patch
 from dotenv import load_dotenv
+import datetime
 import json
 import os
 import random
+import tempfile
 
 # Load variables from .env file
 load_dotenv()
@@ -110,5 +124,204 @@ class TestViews(unittest.TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
 
+class AuthenticationCacheTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        principal_cache.clear()
+        self.user = User.objects.create_user(
+            first_name='Kerry', last_name='Hilson',
+            email='cache.test@example.com', password='testpassword123')
+        self.token = generate_token(self.user.id)
+        self.headers = {'HTTP_AUTHORIZATION': f'Bearer {self.token}'}
+
+    def test_repeat_requests_skip_decode_and_lookup(self):
+        self.client.get('/api/v1/me/', **self.headers)
+        token_hits, principal_hits = token_cache.hits, principal_cache.hits
+
+        with patch('core.authentication.jwt.decode') as mock_decode, self.assertNumQueries(0):
+            response = self.client.get('/api/v1/me/', **self.headers)
+
+        mock_decode.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_cache.hits, token_hits + 1)
+        self.assertEqual(principal_cache.hits, principal_hits + 1)
+
+    def test_expired_token_is_not_served_from_cache(self):
+        token = jwt.encode(
+            {"id": self.user.id, "exp": int(time.time()) + 1},
+            settings.JWT_SECRET, algorithm="HS256")
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        self.client.get('/api/v1/me/', **headers)
+
+        time.sleep(1.5)
+        response = self.client.get('/api/v1/me/', **headers)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_user_changes_invalidate_principal(self):
+        self.client.get('/api/v1/me/', **self.headers)
+
+        self.user.first_name = 'Changed'
+        self.user.save()
+
+        response = self.client.get('/api/v1/me/', **self.headers)
+        self.assertEqual(json.loads(response.content)['first_name'], 'Changed')
+
+    def test_cache_stats_are_staff_only(self):
+        response = self.client.get('/api/v1/cache-stats/', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        User.objects.filter(id=self.user.id).update(is_staff=True)
+        principal_cache.clear()
+
+        response = self.client.get('/api/v1/cache-stats/', **self.headers)
+        self.assertIn('auth.tokens', json.loads(response.content))
+
+
+class VerifyEmailTests(TestCase):
+
+    def test_keeps_notes_version(self):
+        user = User.objects.create_user(first_name='Kerry', last_name='Hilson',
+                                        email='verify.test@example.com', password='testpassword123')
+        stale = Owner.objects.get(user=user)
+        Owner.objects.filter(pk=stale.pk).update(notes_version=5)
+        token = RefreshToken.for_user(user).access_token
+
+        with patch('core.views.Owner.objects.filter') as owners:
+            owners.return_value.first.return_value = stale
+            response = self.client.get(f'/api/v1/verify-email/?token={token}')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        owner = Owner.objects.get(pk=stale.pk)
+        self.assertEqual((owner.is_email_valid, owner.notes_version), (True, 5))
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        spool = tempfile.TemporaryDirectory()
+        self.addCleanup(spool.cleanup)
+        settings_override = override_settings(NOTES_OUTBOX_DIR=spool.name, NOTES_OUTBOX_MAX_ATTEMPTS=2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(
+            first_name='Kerry', last_name='Hilson',
+            email='outbox.test@example.com', password='testpassword123')
+
+    def test_reset_password_queues_instead_of_sending(self):
+        response = self.client.post('/api/v1/password-reset/', {'email': self.user.email},
+                                    content_type='application/json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = OutboundEmail.objects.get()
+        self.assertEqual(queued.status, OutboundEmail.STATUS_QUEUED)
+        self.assertEqual(queued.to, self.user.email)
+
+        self.assertEqual(outbox.dispatch(burst=True), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Online NoteTaker - Password Reset')
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, OutboundEmail.STATUS_SENT)
+        self.assertIsNotNone(queued.sent_at)
+
+    def test_batches_share_one_connection(self):
+        for number in range(5):
+            outbox.enqueue_email({'email_subject': f'Message {number}', 'email_body': 'Body',
+                                  'email_address': self.user.email})
+
+        with override_settings(NOTES_OUTBOX_BATCH_SIZE=2), \
+                patch('core.outbox.get_connection', wraps=outbox.get_connection) as mock_connection:
+            sent = outbox.dispatch(burst=True)
+
+        self.assertEqual(sent, 5)
+        self.assertEqual(mock_connection.call_count, 1)
+        self.assertEqual([message.subject for message in mail.outbox], [f'Message {n}' for n in range(5)])
+        self.assertEqual(len({id(message.connection) for message in mail.outbox}), 1)
+
+    def test_failures_back_off_then_dead_letter(self):
+        email = outbox.enqueue_email({'email_subject': 'Subject', 'email_body': 'Body',
+                                      'email_address': self.user.email})
+
+        with patch('django.core.mail.EmailMessage.send', side_effect=ConnectionRefusedError('refused')):
+            self.assertEqual(outbox.dispatch(burst=True), 0)
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutboundEmail.STATUS_QUEUED)
+            self.assertEqual(email.attempts, 1)
+            self.assertEqual(email.last_error, 'refused')
+            self.assertGreater(email.next_attempt_at, timezone.now())
+
+            # Not due yet
+            self.assertEqual(outbox.claim_batch(), [])
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            outbox.dispatch(burst=True)
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboundEmail.STATUS_DEAD)
+        self.assertEqual(email.attempts, 2)
+
+        self.assertEqual(outbox.retry_dead(), 1)
+        self.assertEqual(outbox.dispatch(burst=True), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_stale_messages_requeue_or_dead_letter(self):
+        outbox.enqueue_emails([
+            {'email_subject': subject, 'email_body': 'Body', 'email_address': self.user.email}
+            for subject in ('Fresh', 'Spent')], claim=outbox.new_claim())
+        OutboundEmail.objects.filter(subject='Spent').update(attempts=2)
+        OutboundEmail.objects.update(claimed_at=timezone.now() - datetime.timedelta(hours=1))
+
+        self.assertEqual(outbox.requeue_stale(), 2)
+
+        statuses = dict(OutboundEmail.objects.values_list('subject', 'status'))
+        self.assertEqual(statuses, {'Fresh': OutboundEmail.STATUS_QUEUED, 'Spent': OutboundEmail.STATUS_DEAD})
+        self.assertEqual(OutboundEmail.objects.get(subject='Spent').last_error,
+                         'The dispatcher stopped before sending the message.')
+
+    def test_purge_removes_old_dead_letters_and_attachments(self):
+        emails = [outbox.enqueue_email({
+            'email_subject': subject, 'email_body': 'Body', 'email_address': self.user.email,
+            'file': SimpleUploadedFile('notes.csv', b'S/N,title\n', content_type='text/csv')})
+            for subject in ('Old', 'Recent')]
+        with patch('django.core.mail.EmailMessage.send', side_effect=ConnectionRefusedError('refused')):
+            outbox.dispatch(burst=True)
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            outbox.dispatch(burst=True)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.STATUS_DEAD).count(), 2)
+        OutboundEmail.objects.filter(subject='Old').update(
+            next_attempt_at=timezone.now() - datetime.timedelta(days=8))
+
+        self.assertEqual(outbox.purge_sent(), 1)
+
+        self.assertEqual(list(OutboundEmail.objects.values_list('subject', flat=True)), ['Recent'])
+        self.assertFalse(os.path.exists(emails[0].attachment_path))
+        self.assertTrue(os.path.exists(emails[1].attachment_path))
+
+    def test_attachment_is_spooled_until_sent(self):
+        file = SimpleUploadedFile('notes.csv', b'S/N,title\n1,First\n', content_type='text/csv')
+        email = outbox.enqueue_email({'email_subject': 'Notes', 'email_body': 'Attached',
+                                      'email_address': self.user.email, 'file': file})
+        self.assertTrue(os.path.exists(email.attachment_path))
+
+        outbox.dispatch(burst=True)
+
+        part, = mail.outbox[0].attachments
+        self.assertEqual((part.get_filename(), part.get_content_type()), ('notes.csv', 'text/csv'))
+        self.assertEqual(part.get_payload(decode=True), b'S/N,title\n1,First\n')
+        self.assertFalse(os.path.exists(email.attachment_path))
+
+    def test_attachment_is_encoded_in_blocks(self):
+        content = bytes(range(256)) * 1000
+        file = SimpleUploadedFile('notes.pdf', content, content_type='application/pdf')
+        email = outbox.enqueue_email({'email_subject': 'Notes', 'email_body': 'Attached',
+                                      'email_address': self.user.email, 'file': file})
+
+        with patch('core.outbox.ENCODE_BLOCK_SIZE', 57 * 4):
+            part = outbox.encode_attachment(email.attachment_path, 'résumé.pdf', 'application/pdf')
+
+        self.assertEqual(part.get_payload(decode=True), content)
+        self.assertTrue(all(len(line) <= 76 for line in part.get_payload().splitlines()))
+        self.assertEqual(part.get_filename(), 'résumé.pdf')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -10,5 +10,6 @@ urlpatterns = [
     path("password-update/", views.UpdatePassword.as_view(), name='password-update'),
     path("login/", views.LoginAPI.as_view(), name='login'),
     path("me/", views.UserAPI.as_view(), name='me'),
-    path("logout/", views.LogoutAPI.as_view(), name='logout')
+    path("logout/", views.LogoutAPI.as_view(), name='logout'),
+    path("cache-stats/", views.CacheStatsAPI.as_view(), name='cache-stats'),
 ]
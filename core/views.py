@@ -6,7 +6,7 @@ from django.db import IntegrityError
 from rest_framework import generics, views, response, exceptions, permissions, status
 from rest_framework_simplejwt.tokens import RefreshToken
 from core.models import User
-from . import serializers as user_serializer, services as service, authentication
+from . import serializers as user_serializer, services as service, authentication, cache, outbox
 from notebook.models import Owner
 import jwt
 
@@ -82,11 +82,9 @@ The Team
                     "email_address": user.email
                 }
 
-                delivery_response = service.Util.send_verifyEmail(data)
+                outbox.enqueue_email(data)
 
-                if delivery_response == 0:
-                    return response.Response({'detail': '0 email sent'}, status=status.HTTP_204_NO_CONTENT)
-                return response.Response({'detail': '1 email sent sucessfully'}, status=status.HTTP_200_OK)
+                return response.Response({'detail': '1 email queued for delivery'}, status=status.HTTP_200_OK)
 
             return response.Response({'response': "No user found"}, status=status.HTTP_401_UNAUTHORIZED)
 
@@ -109,11 +107,12 @@ class VerifyEmail(generics.GenericAPIView):
             owner = Owner.objects.filter(user_id=user.id).first()
 
             if owner is None:
-                owner = Owner()
-                owner.user = user
-
-            owner.is_email_valid = True
-            owner.save()
+                Owner.objects.create(user=user, is_email_valid=True)
+            else:
+                # Only this flag: a full save would write back the notes
+                # version as loaded, reviving ETags and cache keys
+                owner.is_email_valid = True
+                owner.save(update_fields=['is_email_valid', 'updated_at'])
 
             return response.Response({'message': 'Email activated successfully.'}, status=status.HTTP_200_OK)
         except jwt.ExpiredSignatureError:
@@ -207,6 +206,18 @@ class LogoutAPI(views.APIView):
         return resp
 
 
+class CacheStatsAPI(views.APIView):
+    """
+    This endpoint reports hit/miss counters of this process's in-memory
+    caches to staff users, for sizing them.
+    """
+    authentication_classes = (authentication.CustomUserAuthentication, )
+    permission_classes = (permissions.IsAdminUser, )
+
+    def get(self, request):
+        return response.Response(cache.collect_stats(), status=status.HTTP_200_OK)
+
+
 class UpdatePassword(views.APIView):
     '''
     This endpoint updates a user's password by verifying 
@@ -281,10 +292,8 @@ class ResetPassword(views.APIView):
                 "email_address": user.email
             }
 
-            message_response = service.Util.send_verifyEmail(data)
+            outbox.enqueue_email(data)
 
-            if message_response == 1:
-                return response.Response({'detail': 'A link has been sent to your email to reset your password.'}, status=status.HTTP_200_OK)
-            return response.Response({'detail': 'Failed to deliver email to recipients.'})
+            return response.Response({'detail': 'A link has been sent to your email to reset your password.'}, status=status.HTTP_200_OK)
         except Exception as e:
             return response.Response({'detail': 'Unable to complete request.', 'message': e.args[0:]}, status=status.HTTP_403_FORBIDDEN)
@@ -41,6 +41,20 @@ class OwnersAdmin(admin.ModelAdmin):
         'updated_at'
     ]
     list_select_related = ['user']
+    # Maintained by increments on the row: editing the slug sequence would
+    # reissue slugs, and moving the notes version back would revive ETags
+    # and cache keys already handed out
+    readonly_fields = ['notes_version', 'notes_modified_at', 'slug_sequence']
+
+    def save_model(self, request, obj, form, change):
+        '''
+        Write back only what the form edits, so counters the row keeps for
+        notes aren't reset to the values loaded with the form.
+        '''
+        if change:
+            obj.save(update_fields=[*form.changed_data, 'updated_at'])
+        else:
+            obj.save()
 
 
 # Register your models here.
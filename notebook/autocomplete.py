@@ -0,0 +1,178 @@
+import collections
+import math
+import threading
+import time
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from core.cache import LRUCache
+from .models import Note, NoteTitleTrigram
+from .search import TOKEN_RE
+
+
+def title_trigrams(title: str) -> set:
+    '''
+    Trigrams of every word in a title. Words are padded with two spaces in
+    front and one behind, so word starts carry extra weight and 1 or 2
+    character prefixes still produce trigrams.
+    '''
+    trigrams = set()
+    for word in TOKEN_RE.findall(title.lower()):
+        padded = f'  {word} '
+        trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def query_trigrams(query: str) -> set:
+    '''
+    Like title_trigrams, but the last word is treated as an unfinished prefix
+    (no trailing pad) unless the query ends in whitespace.
+    '''
+    trigrams = title_trigrams(query)
+    words = TOKEN_RE.findall(query.lower())
+    if words and not query[-1:].isspace() and words[-1] not in words[:-1]:
+        trigrams.discard(f'  {words[-1]} '[-3:])
+    return trigrams
+
+
+def score(query_grams: set, title_grams: set, updated_at: float, now: float) -> float:
+    '''
+    Mostly the share of the query's trigrams found in the title, so a prefix
+    of a long title still scores high; plain trigram similarity breaks ties
+    in favour of closer titles, and recently edited notes get a small boost.
+    '''
+    shared = len(query_grams & title_grams)
+    similarity = 0.9 * shared / len(query_grams) + 0.1 * shared / len(query_grams | title_grams)
+    age_days = max(0.0, now - updated_at) / 86400
+    recency = getattr(settings, 'NOTES_AUTOCOMPLETE_RECENCY_WEIGHT', 0.1)
+    return similarity + recency / (1 + age_days / 30)
+
+
+def threshold() -> float:
+    return getattr(settings, 'NOTES_AUTOCOMPLETE_THRESHOLD', 0.5)
+
+
+def index_titles(notes) -> None:
+    '''
+    Replace the notes' rows in the trigram index.
+    '''
+    if not notes:
+        return
+
+    with transaction.atomic():
+        NoteTitleTrigram.objects.filter(note_id__in=[note.id for note in notes]).delete()
+        NoteTitleTrigram.objects.bulk_create(
+            [NoteTitleTrigram(owner_id=note.owner_id, note_id=note.id, trigram=trigram)
+             for note in notes for trigram in title_trigrams(note.title)],
+            batch_size=5000)
+
+
+class WarmTitleIndex:
+    '''
+    In-memory trigram postings for one owner's titles, so consecutive
+    keystrokes are answered without a database round trip. Recent query
+    results are memoized, which makes backspacing and retyping free. The
+    index is shared by request threads; the memo is guarded by a lock.
+    '''
+    memo_size = 64
+
+    def __init__(self, rows):
+        self.notes = []
+        self.postings = collections.defaultdict(list)
+        for note_id, title, updated_at in rows:
+            grams = title_trigrams(title)
+            position = len(self.notes)
+            self.notes.append((note_id, title, grams, updated_at.timestamp()))
+            for gram in grams:
+                self.postings[gram].append(position)
+        self.memo = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def complete(self, query: str, limit: int) -> list:
+        key = (query.lower(), limit)
+        with self._lock:
+            if key in self.memo:
+                self.memo.move_to_end(key)
+                return self.memo[key]
+
+        query_grams = query_trigrams(query)
+        shared = collections.Counter()
+        for gram in query_grams:
+            shared.update(self.postings.get(gram, ()))
+
+        needed = math.ceil(threshold() * len(query_grams))
+        now = time.time()
+        matches = []
+        for position, count in shared.items():
+            if count >= needed:
+                note_id, title, grams, updated_at = self.notes[position]
+                matches.append((score(query_grams, grams, updated_at, now), note_id, title))
+
+        results = as_results(matches, limit)
+        with self._lock:
+            self.memo[key] = results
+            if len(self.memo) > self.memo_size:
+                self.memo.popitem(last=False)
+        return results
+
+
+def as_results(matches, limit: int) -> list:
+    matches.sort(key=lambda match: (-match[0], match[1]))
+    return [{'id': note_id, 'title': title, 'score': round(match_score, 4)}
+            for match_score, note_id, title in matches[:limit]]
+
+
+# Owner id -> WarmTitleIndex, or False for owners too large to keep warm.
+# Dropped by notebook.signals on note writes in this process; the TTL bounds
+# staleness from writes handled by other processes.
+warm_titles = LRUCache(
+    'notes.autocomplete',
+    max_size=getattr(settings, 'NOTES_AUTOCOMPLETE_CACHE_SIZE', 1000),
+    ttl=getattr(settings, 'NOTES_AUTOCOMPLETE_CACHE_TTL', 30))
+
+
+def warm_index(owner_id: int):
+    index = warm_titles.get(owner_id)
+    if index is None:
+        max_notes = getattr(settings, 'NOTES_AUTOCOMPLETE_WARM_MAX', 5000)
+        rows = list(Note.objects.filter(owner_id=owner_id).values_list(
+            'id', 'title', 'updated_at')[:max_notes + 1])
+        index = WarmTitleIndex(rows) if len(rows) <= max_notes else False
+        warm_titles.set(owner_id, index)
+    return index
+
+
+def indexed_complete(owner_id: int, query: str, limit: int) -> list:
+    '''
+    Answer from the NoteTitleTrigram table: one indexed query for candidate
+    notes sharing enough trigrams, one for their titles.
+    '''
+    query_grams = query_trigrams(query)
+    needed = math.ceil(threshold() * len(query_grams))
+    candidates = (NoteTitleTrigram.objects
+                  .filter(owner_id=owner_id, trigram__in=query_grams)
+                  .values('note_id')
+                  .annotate(shared=Count('id'))
+                  .filter(shared__gte=needed)
+                  .order_by('-shared', '-note_id')
+                  .values_list('note_id', flat=True)[:limit * 20])
+
+    now = time.time()
+    matches = [(score(query_grams, title_trigrams(title), updated_at.timestamp(), now), note_id, title)
+               for note_id, title, updated_at in Note.objects.filter(
+                   owner_id=owner_id, pk__in=list(candidates)).values_list('id', 'title', 'updated_at')]
+    return as_results(matches, limit)
+
+
+def complete_titles(owner_id: int, query: str, limit: int = 10) -> list:
+    '''
+    Titles of the owner's notes that best match a partly typed, possibly
+    misspelt query, ranked by trigram similarity and recency.
+    '''
+    if not query_trigrams(query):
+        return []
+
+    index = warm_index(owner_id)
+    if index:
+        return index.complete(query, limit)
+    return indexed_complete(owner_id, query, limit)
@@ -0,0 +1,197 @@
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from . import revisions
+from .models import Note
+from .serializers import NoteBulkListSerializer, NoteSerializer
+from .services import owner_notes
+from .signals import bulk_note_writes, notes_bulk_changed
+
+OPERATIONS = ('create', 'update', 'delete')
+
+
+def apply_batch(owner_id: int, operations: list, atomic: bool = True) -> list:
+    '''
+    Validate and apply a list of note operations for one owner, returning
+    one result per operation in input order:
+
+        {"op": "create", "data": {...}}
+        {"op": "update", "id": 12, "data": {...}}   (partial update)
+        {"op": "delete", "id": 13}
+
+    Valid operations run with one bulk statement per kind in a single
+    transaction: deletes, then updates, then creates. When `atomic` is true
+    any invalid operation aborts the whole batch; otherwise the valid ones
+    are applied and the failures reported next to them.
+    '''
+    results = [{'index': index, 'op': None} for index in range(len(operations))]
+    pending = {op: [] for op in OPERATIONS}
+
+    # Shape checks, one operation per note
+    seen_ids = set()
+    for result, operation in zip(results, operations):
+        if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+            fail(result, status.HTTP_400_BAD_REQUEST,
+                 {'op': [f"Must be one of: {', '.join(OPERATIONS)}."]})
+            continue
+
+        op = result['op'] = operation['op']
+        if op != 'create':
+            note_id = operation.get('id')
+            if not isinstance(note_id, int) or isinstance(note_id, bool):
+                fail(result, status.HTTP_400_BAD_REQUEST, {'id': ['A note id is required.']})
+                continue
+            result['id'] = note_id
+            if note_id in seen_ids:
+                fail(result, status.HTTP_400_BAD_REQUEST,
+                     {'id': ['Only one operation per note is allowed in a batch.']})
+                continue
+            seen_ids.add(note_id)
+
+        if op != 'delete' and not isinstance(operation.get('data'), dict):
+            fail(result, status.HTTP_400_BAD_REQUEST, {'data': ['An object of note fields is required.']})
+            continue
+
+        pending[op].append((result, operation))
+
+    # Every targeted note in one query
+    targets = owner_notes(owner_id).in_bulk(
+        [result['id'] for op in ('update', 'delete') for result, _ in pending[op]])
+    for op in ('update', 'delete'):
+        found = []
+        for result, operation in pending[op]:
+            if result['id'] in targets:
+                found.append((result, operation))
+            else:
+                fail(result, status.HTTP_404_NOT_FOUND, {'detail': 'Not found.'})
+        pending[op] = found
+
+    creates = validate(pending['create'])
+    updates = validate(pending['update'], [targets[result['id']] for result, _ in pending['update']])
+    deletes = [(result, targets[result['id']]) for result, _ in pending['delete']]
+    check_slugs(creates, updates, deletes)
+
+    failed = [result for result in results if 'errors' in result]
+    if failed and atomic:
+        for result in results:
+            if 'errors' not in result:
+                fail(result, status.HTTP_424_FAILED_DEPENDENCY,
+                     {'detail': 'Not applied because other operations in the batch failed.'})
+        return results
+
+    creates = [(result, data) for result, data in creates if 'errors' not in result]
+    updates = [(result, data) for result, data in updates if 'errors' not in result]
+    created, updated = write_notes(
+        owner_id, [data for _, data in creates],
+        [(targets[result['id']], data) for result, data in updates],
+        [note for _, note in deletes])
+
+    for (result, _), data in zip(creates, NoteSerializer(created, many=True).data):
+        result.update(status=status.HTTP_201_CREATED, data=data)
+    for (result, _), data in zip(updates, NoteSerializer(updated, many=True).data):
+        result.update(status=status.HTTP_200_OK, data=data)
+    for result, _ in deletes:
+        result['status'] = status.HTTP_204_NO_CONTENT
+    return results
+
+
+def fail(result: dict, code: int, errors) -> None:
+    result['status'] = code
+    result['errors'] = errors
+
+
+def validate(pending: list, instances: list = None) -> list:
+    '''
+    Validate the data of all pending operations of one kind in a single
+    many=True pass, returning (result, validated data) pairs.
+    '''
+    if not pending:
+        return []
+
+    partial = instances is not None
+    serializer = NoteBulkListSerializer(
+        instances, data=[operation['data'] for _, operation in pending],
+        child=NoteSerializer(partial=partial), partial=partial)
+    serializer.is_valid()
+
+    validated = []
+    for (result, _), data, errors in zip(pending, serializer.validated_data, serializer.item_errors):
+        if errors:
+            fail(result, status.HTTP_400_BAD_REQUEST, errors)
+        else:
+            validated.append((result, data))
+    return validated
+
+
+def check_slugs(creates: list, updates: list, deletes: list) -> None:
+    '''
+    Slug uniqueness for the whole batch with one query. Slugs freed by notes
+    deleted in the same batch may be reused.
+    '''
+    claims = [(result, data['slug']) for result, data in creates + updates if data.get('slug')]
+    if not claims:
+        return
+
+    freed = {note.id for _, note in deletes}
+    taken = dict(Note.objects.filter(slug__in=[slug for _, slug in claims])
+                 .exclude(pk__in=freed).values_list('slug', 'id'))
+
+    for result, slug in claims:
+        holder = taken.get(slug)
+        if holder is not None and holder != result.get('id'):
+            fail(result, status.HTTP_400_BAD_REQUEST,
+                 {'slug': ['note with this slug already exists.']})
+        else:
+            # Later claims in the same batch conflict with this one
+            taken[slug] = result.get('id', -1)
+
+
+def write_notes(owner_id: int, creates: list, updates: list = (), deletes: list = ()) -> tuple:
+    '''
+    Apply validated writes in one transaction: `creates` is a list of
+    validated data, `updates` of (note, validated data) pairs and `deletes`
+    of notes. Sends a single notes_bulk_changed in place of the per-note
+    signals and returns the (created, updated) notes.
+    '''
+    if not (creates or updates or deletes):
+        return [], []
+
+    updated = []
+    update_fields = {'updated_at', 'priority_rank'}
+    now = timezone.now()
+
+    with transaction.atomic(), bulk_note_writes():
+        revisions.lock_replaced_states([note for note, _ in updates] + list(deletes))
+        if deletes:
+            Note.objects.filter(pk__in=[note.id for note in deletes]).delete()
+
+        for note, data in updates:
+            for name, value in data.items():
+                setattr(note, name, value)
+                update_fields.add(name)
+            # bulk_update skips pre_save, so derived columns are set here
+            note.priority_rank = Note.PRIORITY_RANKS.get(note.priority, 2)
+            note.updated_at = now
+            updated.append(note)
+        Note.assign_slugs(updated)
+        if updated:
+            Note.objects.bulk_update(updated, sorted(update_fields), batch_size=500)
+
+        created = [Note(owner_id=owner_id, **data) for data in creates]
+        Note.assign_slugs(created)
+        if created:
+            Note.objects.bulk_create(created, batch_size=500)
+            if created[0].pk is None:
+                # Backends that can't return inserted keys (MySQL): slugs are unique
+                ids = dict(Note.objects.filter(slug__in=[note.slug for note in created])
+                           .values_list('slug', 'id'))
+                for note in created:
+                    note.pk = ids[note.slug]
+
+        notes_bulk_changed.send(sender=Note, owner_id=owner_id,
+                                created=created, updated=updated, deleted=list(deletes))
+
+    for note in updated + list(deletes):
+        note.__dict__.pop('_replaced_state', None)
+
+    return created, updated
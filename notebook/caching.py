@@ -0,0 +1,168 @@
+import dataclasses
+import datetime
+import hashlib
+import threading
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from core.cache import register_stats
+from .models import Owner
+
+
+@dataclasses.dataclass
+class NotesVersionDataClass:
+    '''
+    The current data version of an owner's notes, read with a single primary
+    key lookup on the owner table.
+    '''
+    owner_id: int
+    version: int
+    modified_at: datetime.datetime
+    # Distinguishes owner rows that reuse a deleted owner's id
+    owner_created_at: datetime.datetime
+
+    @classmethod
+    def for_owner(cls, owner_id: int) -> "NotesVersionDataClass":
+        version, modified_at, created_at = Owner.objects.values_list(
+            'notes_version', 'notes_modified_at', 'created_at').get(pk=owner_id)
+
+        return cls(owner_id=owner_id, version=version,
+                   modified_at=modified_at or created_at, owner_created_at=created_at)
+
+    def representation_key(self, request) -> str:
+        '''
+        Identifies one rendered representation: the same version, URL (with its
+        query parameters in normalized order) and negotiated format always
+        render to the same bytes. The UTC date is included because relative
+        filters such as status=Overdue move with it.
+        '''
+        params = sorted((key, sorted(values))
+                        for key, values in request.query_params.lists())
+        key = '|'.join([
+            str(self.owner_id),
+            self.owner_created_at.isoformat(),
+            str(self.version),
+            request.build_absolute_uri(request.path),
+            urlencode(params, doseq=True),
+            getattr(request, 'accepted_media_type', ''),
+            datetime.datetime.utcnow().date().isoformat(),
+        ])
+        return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+    def etag(self, request) -> str:
+        return '"%s"' % self.representation_key(request)
+
+
+class NotesResponseCache:
+    '''
+    Read-through cache of rendered JSON note responses. Keys embed the owner's
+    notes version, so any write (API, admin or bulk) makes older entries
+    unreachable without explicit invalidation; they simply age out.
+    '''
+    key_prefix = 'notes:response:'
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+        register_stats('notes.responses', self.stats)
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'NOTES_RESPONSE_CACHE_ENABLED', True)
+
+    @property
+    def backend(self):
+        return caches[getattr(settings, 'NOTES_RESPONSE_CACHE_ALIAS', 'default')]
+
+    def cacheable(self, request) -> bool:
+        # The browsable API embeds per-request tokens, so only JSON is shared
+        return self.enabled and getattr(request, 'accepted_media_type', '').startswith('application/json')
+
+    def get(self, request, notes_version: "NotesVersionDataClass"):
+        '''
+        Returns a ready HttpResponse for a cached representation, or None.
+        '''
+        if not self.cacheable(request):
+            return None
+
+        entry = self.backend.get(self.key_prefix + notes_version.representation_key(request))
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        content_type, body = entry
+        return HttpResponse(body, content_type=content_type)
+
+    def store(self, response, request, notes_version: "NotesVersionDataClass"):
+        '''
+        Store the response body once DRF has rendered it.
+        '''
+        if not self.cacheable(request) or response.status_code != 200:
+            return response
+
+        key = self.key_prefix + notes_version.representation_key(request)
+        timeout = getattr(settings, 'NOTES_RESPONSE_CACHE_TIMEOUT', 300)
+
+        def cache_rendered(rendered):
+            self.backend.set(key, (rendered['Content-Type'], rendered.content), timeout)
+            with self._lock:
+                self.stores += 1
+
+        response.add_post_render_callback(cache_rendered)
+        return response
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+response_cache = NotesResponseCache()
+
+
+def not_modified_response(request, notes_version: "NotesVersionDataClass"):
+    '''
+    Returns a 304 response when the client's validators still match,
+    otherwise None.
+    '''
+    response = get_conditional_response(
+        request._request,
+        etag=notes_version.etag(request),
+        last_modified=int(notes_version.modified_at.timestamp()),
+    )
+
+    if response is not None:
+        add_validator_headers(response, request, notes_version)
+
+    return response
+
+
+def add_validator_headers(response, request, notes_version: "NotesVersionDataClass"):
+    '''
+    Set ETag, Last-Modified and the configured Cache-Control on a notes response.
+    Responses are per user, so they are always marked private.
+    '''
+    response['ETag'] = notes_version.etag(request)
+    response['Last-Modified'] = http_date(notes_version.modified_at.timestamp())
+
+    cache_control = {'private': True,
+                     'max_age': getattr(settings, 'NOTES_CACHE_MAX_AGE', 0)}
+    stale_while_revalidate = getattr(settings, 'NOTES_STALE_WHILE_REVALIDATE', None)
+    if stale_while_revalidate:
+        cache_control['stale_while_revalidate'] = stale_while_revalidate
+    patch_cache_control(response, **cache_control)
+    patch_vary_headers(response, ('Authorization', 'Cookie'))
+
+    return response
@@ -0,0 +1,101 @@
+import csv
+import io
+import itertools
+import re
+from datetime import datetime
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+from OnlineNotesAPI.renderers import FastJSONRenderer
+from .serializers import NoteRowSerializer, NoteSerializer
+from .services import display_note_rows
+
+# Columns of the CSV download after S/N, in display_note_rows order
+CSV_COLUMNS = ('title', 'slug', 'content', 'created_at', 'due_date',
+               'priority', 'status', 'category')
+
+# Fields of the JSON Lines export: the JSON API's, plus updated_at so
+# incremental backups can pick the next updated_since
+NDJSON_FIELDS = (*NoteSerializer.Meta.fields, 'updated_at')
+
+ACCEPTS_GZIP_RE = re.compile(r'\bgzip\b')
+
+
+def chunk_size() -> int:
+    return getattr(settings, 'NOTES_EXPORT_CHUNK_SIZE', 2000)
+
+
+def row_chunks(queryset):
+    '''
+    Display rows of the queryset in lists of `chunk_size()`, fetched with a
+    chunked iterator (a server-side cursor where the database supports one),
+    so only one chunk is held in memory at a time.
+    '''
+    size = chunk_size()
+    return chunked(display_note_rows(queryset, chunk_size=size), size)
+
+
+def chunked(rows, size: int):
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def csv_chunks(queryset):
+    '''
+    The notes CSV as encoded pieces: the header, then one piece per chunk
+    of rows numbered from 1 in the S/N column.
+    '''
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['S/N', *CSV_COLUMNS])
+    number = 0
+    for chunk in row_chunks(queryset):
+        for row in chunk:
+            number += 1
+            writer.writerow([number, *(row[name] for name in CSV_COLUMNS)])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if number == 0:
+        # No notes: just the header
+        yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(queryset):
+    '''
+    The notes as JSON Lines, one piece per chunk of rows. Each line is the
+    note as the JSON API returns it (choice codes, not the CSV download's
+    labels), plus updated_at.
+    '''
+    serializer = NoteRowSerializer(NDJSON_FIELDS)
+    render = FastJSONRenderer().render
+    size = chunk_size()
+    for chunk in chunked(serializer.project(queryset).iterator(chunk_size=size), size):
+        yield b''.join(render(row) + b'\n' for row in serializer.to_representation_many(chunk))
+
+
+def accepts_gzip(request) -> bool:
+    return bool(ACCEPTS_GZIP_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', '')))
+
+
+def streaming_download(request, chunks, content_type: str, filename: str) -> StreamingHttpResponse:
+    '''
+    Stream `chunks` as an attachment, gzip encoded on the fly when the
+    client accepts it.
+    '''
+    if accepts_gzip(request):
+        response = StreamingHttpResponse(compress_sequence(chunks), content_type=content_type)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
+def timestamped_filename(prefix: str, extension: str) -> str:
+    return f'{prefix}_{datetime.strftime(datetime.now(), "%Y-%m-%d %H:%M:%S")}.{extension}'
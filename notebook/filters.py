@@ -1,21 +1,83 @@
+from datetime import datetime
 import django_filters
+from django.db.models import Q
 from .models import Note
 
 
 class NoteFilter(django_filters.FilterSet):
+    '''
+    Composes every notes list filter and the requested ordering into a single
+    queryset, so any combination of parameters runs as one SQL statement.
+    Multi-valued filters take comma separated values, which are OR-ed together.
+
+    * status: status codes or labels (e.g. 'N,In Progress'), or the groups
+      'Unfinished', 'Overdue' and 'Done'
+    * category: category codes or names (e.g. 'Blue,R')
+    * priority: priority codes or names (e.g. 'H,Medium')
+    * due_after / due_before: inclusive due date range
+    * created_after / created_before: inclusive creation time range
+    * updated_since: notes changed at or after a time
+    * ordering: comma separated whitelisted fields, '-' for descending
+    '''
+    STATUS_GROUPS = {
+        'unfinished': lambda: Q(status__in=[Note.STATUS_NEW, Note.STATUS_WIP]),
+        'overdue': lambda: Q(due_date__lte=datetime.utcnow()),
+        'done': lambda: Q(status=Note.STATUS_END),
+    }
+
+    status = django_filters.CharFilter(method='filter_status')
+    category = django_filters.CharFilter(method='filter_category')
+    priority = django_filters.CharFilter(method='filter_priority')
+    due_after = django_filters.DateFilter(field_name='due_date', lookup_expr='gte')
+    due_before = django_filters.DateFilter(field_name='due_date', lookup_expr='lte')
+    created_after = django_filters.DateTimeFilter(
+        field_name='created_at', lookup_expr='gte')
+    created_before = django_filters.DateTimeFilter(
+        field_name='created_at', lookup_expr='lte')
+    updated_since = django_filters.DateTimeFilter(
+        field_name='updated_at', lookup_expr='gte')
+    ordering = django_filters.OrderingFilter(fields=(
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+        ('due_date', 'due_date'),
+        # Priority sorts by rank (Low < Medium < High), not by its letter code
+        ('priority_rank', 'priority'),
+        ('title', 'title'),
+    ))
+
     class Meta:
         model = Note
-        fields = ['due_date', 'priority', 'created_at']
+        fields = ['status', 'category', 'priority', 'due_after',
+                  'due_before', 'created_after', 'created_before', 'updated_since']
+
+    def filter_status(self, queryset, name, value):
+        condition = Q()
+        for term in self._split(value):
+            group = self.STATUS_GROUPS.get(term.lower())
+            if group is not None:
+                condition |= group()
+            else:
+                condition |= Q(status__in=self._choice_codes(Note.STATUS_CHOICES, term))
+        return queryset.filter(condition)
+
+    def filter_category(self, queryset, name, value):
+        codes = []
+        for term in self._split(value):
+            codes += self._choice_codes(Note.CATEGORY_CHOICES, term)
+        return queryset.filter(category__in=codes)
 
+    def filter_priority(self, queryset, name, value):
+        codes = []
+        for term in self._split(value):
+            codes += self._choice_codes(Note.PRIORITY_CHOICES, term)
+        return queryset.filter(priority__in=codes)
 
-# # Sort all the notes list by due-date, priority, and created-time
-#     filter_backends = [DjangoFilterBackend, OrderingFilter]
-#     filterset_fields = ['due_date', 'priority', 'created_at']
-#     # ordering_fields = ['due_date', 'priority', 'created_at']
+    def _split(self, value):
+        return [term.strip() for term in value.split(',') if term.strip()]
 
-#     # queryset = Note.objects.all()
-#     # serializer_class = NoteSerializer
-#     # filter_backends = (filters.DjangoFilterBackend,)
-#     # # filterset_fields = ('due_date', 'priority', 'created_at')
-#     # # ordering_fields = ('due_date', 'priority', 'created_at')
-#     # filterset_class = NoteFilter
+    def _choice_codes(self, choices, term):
+        '''
+        Accept either the stored code or the display label, case-insensitively.
+        '''
+        return [code for code, label in choices
+                if term.upper() == code or term.lower() == label.lower()]
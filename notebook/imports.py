@@ -0,0 +1,207 @@
+import csv
+import io
+import itertools
+import json
+import time
+from pathlib import Path
+from django.conf import settings
+from django.db import transaction
+from rest_framework import status
+from . import batch
+from .models import Note, NoteImport
+
+# Columns read from each row; DownloadCSV's S/N, created_at and any unknown
+# columns are ignored
+IMPORT_FIELDS = ('title', 'slug', 'content', 'due_date', 'priority', 'status', 'category')
+
+# Choice columns accept the stored code or the display label, case-insensitively
+CHOICE_CODES = {
+    name: {key.lower(): code for code, label in choices for key in (code, label)}
+    for name, choices in (('priority', Note.PRIORITY_CHOICES),
+                          ('status', Note.STATUS_CHOICES),
+                          ('category', Note.CATEGORY_CHOICES))
+}
+
+FORMAT_EXTENSIONS = {
+    '.csv': NoteImport.FORMAT_CSV,
+    '.ndjson': NoteImport.FORMAT_NDJSON,
+    '.jsonl': NoteImport.FORMAT_NDJSON,
+}
+
+
+def guess_format(filename: str) -> str:
+    extension = Path(filename).suffix.lower()
+    if extension not in FORMAT_EXTENSIONS:
+        raise ValueError('Unknown file type; pass the format as csv or ndjson.')
+    return FORMAT_EXTENSIONS[extension]
+
+
+def error_file_path(job: NoteImport) -> Path:
+    '''
+    Rejected rows of an import, one JSON object per line:
+    {"line": 12, "errors": {...}, "row": {...}}
+    '''
+    return Path(getattr(settings, 'NOTES_IMPORT_DIR', 'imports')) / f'{job.id}-errors.ndjson'
+
+
+def iter_rows(stream, file_format: str):
+    '''
+    Yield (line number, row, parse errors) from a text stream one row at a
+    time, so memory does not depend on the file size.
+    '''
+    if file_format == NoteImport.FORMAT_CSV:
+        reader = csv.DictReader(stream)
+        if not reader.fieldnames or 'title' not in reader.fieldnames:
+            raise ValueError('The CSV header must include a title column.')
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_number, None, {'non_field_errors': ['Invalid JSON.']}
+            continue
+        if not isinstance(row, dict):
+            yield line_number, row, {'non_field_errors': ['Expected a JSON object.']}
+            continue
+        yield line_number, row, None
+
+
+def note_data(row: dict) -> dict:
+    '''
+    Map a parsed row onto NoteSerializer input. Empty optional columns are
+    left out so model defaults apply. Generated slugs (e.g. from an export)
+    belong to the source account's sequence, so they are generated afresh.
+    '''
+    separator = Note._meta.get_field('slug').separator
+    data = {}
+    for name in IMPORT_FIELDS:
+        value = row.get(name)
+        if name not in ('title', 'content') and value in (None, ''):
+            continue
+        if name == 'slug' and isinstance(value, str) and separator in value:
+            continue
+        if name in CHOICE_CODES and isinstance(value, str):
+            value = CHOICE_CODES[name].get(value.strip().lower(), value)
+        data[name] = value
+    return data
+
+
+def start_import(owner_id: int, source_name: str, source_size: int, file_format: str = None,
+                 batch_size: int = None, resume_id: int = None) -> NoteImport:
+    '''
+    Create an import job, or reopen an unfinished one to resume it with the
+    same file.
+    '''
+    file_format = file_format or guess_format(source_name)
+    if resume_id is None:
+        return NoteImport.objects.create(
+            owner_id=owner_id, format=file_format, source_name=source_name,
+            source_size=source_size,
+            batch_size=batch_size or getattr(settings, 'NOTES_IMPORT_BATCH_SIZE', 1000))
+
+    job = NoteImport.objects.get(pk=resume_id, owner_id=owner_id)
+    if job.status == NoteImport.STATUS_COMPLETED:
+        raise ValueError(f'Import {job.id} has already completed.')
+    if (job.format, job.source_size) != (file_format, source_size):
+        raise ValueError(f'The file does not match the one import {job.id} started with.')
+
+    job.status = NoteImport.STATUS_RUNNING
+    job.last_error = ''
+    if batch_size:
+        job.batch_size = batch_size
+    job.save(update_fields=['status', 'last_error', 'batch_size', 'updated_at'])
+    return job
+
+
+def run_import(job: NoteImport, binary_stream, progress=None) -> NoteImport:
+    '''
+    Stream the file into the owner's notes in batches of `job.batch_size`.
+    Each batch is validated with one many=True pass and written with
+    bulk_create in the same transaction that records the job's progress, so
+    a failed run can be resumed from the last committed batch. `progress`
+    is called with the job after every batch.
+    '''
+    stream = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    rows = iter_rows(stream, job.format)
+    # Skip what earlier runs already committed
+    next(itertools.islice(rows, job.rows_read, job.rows_read), None)
+
+    path = error_file_path(job)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(path, 'ab') as errors:
+            # Rejections written by an uncommitted batch are written again
+            errors.truncate(job.error_bytes)
+            errors.seek(job.error_bytes)
+            while True:
+                chunk = list(itertools.islice(rows, job.batch_size))
+                if not chunk:
+                    break
+                import_chunk(job, chunk, errors)
+                if progress is not None:
+                    progress(job)
+    except Exception as e:
+        job.status = NoteImport.STATUS_FAILED
+        job.last_error = str(e)
+        job.save(update_fields=['status', 'last_error', 'updated_at'])
+        raise
+    finally:
+        stream.detach()
+
+    job.status = NoteImport.STATUS_COMPLETED
+    job.save(update_fields=['status', 'updated_at'])
+    return job
+
+
+def import_chunk(job: NoteImport, chunk: list, errors) -> None:
+    pending, rejected = [], []
+    for line_number, row, parse_errors in chunk:
+        result = {'line': line_number, 'row': row}
+        if parse_errors:
+            batch.fail(result, status.HTTP_400_BAD_REQUEST, parse_errors)
+            rejected.append(result)
+        else:
+            pending.append((result, {'data': note_data(row)}))
+
+    creates = batch.validate(pending)
+    batch.check_slugs(creates, [], [])
+    rejected += [result for result, _ in pending if 'errors' in result]
+    creates = [data for result, data in creates if 'errors' not in result]
+
+    rejected.sort(key=lambda result: result['line'])
+    errors.write(b''.join(
+        json.dumps({'line': result['line'], 'errors': result['errors'], 'row': result['row']},
+                   ensure_ascii=False).encode() + b'\n'
+        for result in rejected))
+    errors.flush()
+
+    with transaction.atomic():
+        batch.write_notes(job.owner_id, creates)
+        job.rows_read += len(chunk)
+        job.rows_imported += len(creates)
+        job.rows_failed += len(rejected)
+        job.error_bytes = errors.tell()
+        job.save(update_fields=['rows_read', 'rows_imported', 'rows_failed',
+                                'error_bytes', 'updated_at'])
+
+
+class ProgressLogger:
+    '''
+    Progress callback reporting rows read and throughput.
+    '''
+
+    def __init__(self, write, job: NoteImport):
+        self.write = write
+        self.started = time.perf_counter()
+        self.first_row = job.rows_read
+
+    def __call__(self, job: NoteImport):
+        elapsed = time.perf_counter() - self.started
+        rate = (job.rows_read - self.first_row) / elapsed if elapsed else 0
+        self.write(f'{job.rows_read} rows read, {job.rows_imported} imported, '
+                   f'{job.rows_failed} rejected ({rate:,.0f} rows/s)')
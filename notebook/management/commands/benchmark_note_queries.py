@@ -0,0 +1,94 @@
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.db import connection
+from notebook.management.seeding import remove_seeded, seed_notes
+from notebook.models import Note
+
+
+class Command(BaseCommand):
+    help = '''
+    Seed a large notes dataset and report EXPLAIN output and latency for each
+    per-owner access path, with and without the composite Note indexes.
+    Runs against the configured database; seeded users are removed afterwards
+    unless --keep is given.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, default=100000,
+                            help='Total number of notes to seed.')
+        parser.add_argument('--owners', type=int, default=20,
+                            help='Number of owners the notes are spread across.')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Timed runs per access path.')
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--no-compare', action='store_true',
+                            help='Only measure with the indexes in place.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the seeded data after the run.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"Seeding {options['notes']} notes across {options['owners']} owners...")
+        owners = seed_notes(options['notes'], options['owners'])
+        owner_id = owners[0].id
+
+        try:
+            if not options['no_compare']:
+                with self.indexes_dropped():
+                    before = self.measure(owner_id, options, label='without indexes')
+            after = self.measure(owner_id, options, label='with indexes')
+
+            if not options['no_compare']:
+                self.stdout.write('\nSummary (median ms):')
+                for name in after:
+                    self.stdout.write(
+                        f'  {name:<12} {before[name]:>9.2f} -> {after[name]:>9.2f}')
+        finally:
+            if not options['keep']:
+                remove_seeded(owners)
+
+    def access_paths(self, owner_id, page_size):
+        '''
+        The queries the notes endpoints issue, all scoped to a single owner.
+        '''
+        notes = Note.objects.filter(owner_id=owner_id)
+        return {
+            'list': notes.order_by('-created_at', '-id')[:page_size],
+            'status': notes.filter(status__in=[Note.STATUS_NEW, Note.STATUS_WIP]),
+            'category': notes.filter(category=Note.CATEGORY_BLUE),
+            'overdue': notes.filter(due_date__lte=date.today()),
+            'priority': notes.order_by('-priority_rank', '-id')[:page_size],
+        }
+
+    def measure(self, owner_id, options, label):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n=== {label} ==='))
+        medians = {}
+        for name, queryset in self.access_paths(owner_id, options['page_size']).items():
+            queryset = queryset.values_list('id', flat=True)
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            medians[name] = statistics.median(timings)
+
+            self.stdout.write(self.style.SUCCESS(
+                f'\n[{name}] median {medians[name]:.2f} ms, max {max(timings):.2f} ms'))
+            self.stdout.write(queryset.explain())
+        return medians
+
+    @contextmanager
+    def indexes_dropped(self):
+        with connection.schema_editor() as editor:
+            for index in Note._meta.indexes:
+                editor.remove_index(Note, index)
+        try:
+            yield
+        finally:
+            with connection.schema_editor() as editor:
+                for index in Note._meta.indexes:
+                    editor.add_index(Note, index)
+            self.stdout.write('Indexes restored.')
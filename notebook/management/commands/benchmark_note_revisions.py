@@ -0,0 +1,75 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from notebook.management.seeding import remove_seeded, seed_notes
+from notebook.models import NoteRevision
+from notebook.revisions import rebuild
+from notebook.services import owner_notes
+
+WORDS = ('note', 'task', 'review', 'draft', 'meeting', 'client', 'budget', 'deadline', 'update', 'plan')
+
+
+class Command(BaseCommand):
+    help = '''
+    Edit seeded notes repeatedly through the model, as the note endpoints
+    do, and report the revision storage per edit against the content size
+    and how long rebuilding revisions takes. Each edit rewrites a few words
+    of the content.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, default=50, help='Notes to edit.')
+        parser.add_argument('--edits', type=int, default=40, help='Edits per note.')
+        parser.add_argument('--words', type=int, default=300, help='Words of content per note.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the seeded data after the run.')
+
+    def handle(self, *args, **options):
+        random.seed(7)
+        owners = seed_notes(options['notes'])
+        try:
+            notes = list(owner_notes(owners[0].id))
+            # The first revision is the seeded content
+            versions = {note.pk: [note.content] for note in notes}
+            for note in notes:
+                note.content = ' '.join(random.choice(WORDS) for _ in range(options['words']))
+                note.save()
+            content_bytes = statistics.mean(len(note.content.encode()) for note in notes)
+
+            started = time.perf_counter()
+            for note in notes:
+                history = versions[note.pk]
+                for _ in range(options['edits']):
+                    history.append(note.content)
+                    words = note.content.split(' ')
+                    for _ in range(3):
+                        words[random.randrange(len(words))] = random.choice(WORDS).upper()
+                    note.content = ' '.join(words)
+                    note.save()
+            edit_ms = (time.perf_counter() - started) * 1000 / (len(notes) * options['edits'])
+
+            revisions = NoteRevision.objects.filter(note__in=notes)
+            sizes = list(revisions.values_list('size', flat=True))
+            snapshots = revisions.filter(is_snapshot=True).count()
+
+            timings = []
+            for note in notes:
+                for number in range(1, options['edits'] + 2):
+                    started = time.perf_counter()
+                    revision = rebuild(note, number)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    if revision.data['content'] != versions[note.pk][number - 1]:
+                        raise CommandError(f'Revision {number} of note {note.pk} rebuilt wrong')
+        finally:
+            if not options['keep']:
+                remove_seeded(owners)
+
+        timings.sort()
+        self.stdout.write(f'{len(sizes)} revisions ({snapshots} snapshots) of notes of {content_bytes:.0f} bytes')
+        self.stdout.write(f'Stored per edit: {statistics.mean(sizes):.0f} bytes on average '
+                          f'({statistics.mean(sizes) / content_bytes:.1%} of the content), '
+                          f'{statistics.median(sizes):.0f} bytes median')
+        self.stdout.write(f'Save with revision: {edit_ms:.2f} ms per edit')
+        self.stdout.write(f'Rebuild: {statistics.median(timings):.2f} ms median, '
+                          f'{timings[int(len(timings) * 0.99)]:.2f} ms p99, {timings[-1]:.2f} ms max')
@@ -0,0 +1,61 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from OnlineNotesAPI.renderers import FastJSONRenderer
+from notebook.management.seeding import remove_seeded, seed_notes
+from notebook.serializers import NoteRowSerializer, NoteSerializer
+from notebook.services import owner_notes
+
+
+class Command(BaseCommand):
+    help = '''
+    Compare the NoteSerializer + JSONRenderer read path with the values() row
+    serializer + FastJSONRenderer at several list sizes, timing the database
+    fetch, serialization and rendering together. Also checks that both paths
+    render identical bytes.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,10000,100000',
+                            help='Comma separated list sizes to measure.')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Timed runs per size and path.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the seeded data after the run.')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        self.stdout.write(f'Seeding {max(sizes)} notes for one owner...')
+        owners = seed_notes(max(sizes))
+        notes = owner_notes(owners[0].id).order_by('-created_at', '-id')
+
+        self.stdout.write(f"{'notes':>8} {'stock ms':>10} {'fast ms':>10} {'speedup':>8}")
+        try:
+            for size in sizes:
+                stock, stock_body = self.measure(
+                    lambda: JSONRenderer().render(
+                        NoteSerializer(notes[:size], many=True).data),
+                    options['repeat'])
+                fast, fast_body = self.measure(
+                    lambda: FastJSONRenderer().render(
+                        NoteRowSerializer().to_representation_many(
+                            NoteRowSerializer().project(notes)[:size])),
+                    options['repeat'])
+
+                if stock_body != fast_body:
+                    raise CommandError(f'Output differs at {size} notes')
+
+                self.stdout.write(
+                    f'{size:>8} {stock:>10.1f} {fast:>10.1f} {stock / fast:>7.1f}x')
+        finally:
+            if not options['keep']:
+                remove_seeded(owners)
+
+    def measure(self, render, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = render()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), body
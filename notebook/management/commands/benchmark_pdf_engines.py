@@ -0,0 +1,43 @@
+import time
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from OnlineNotesAPI.renderers import page_count
+from notebook.management.seeding import EMAIL_TEMPLATE, remove_seeded, seed_notes
+from notebook.reports import render_report_pdf
+from notebook.services import generate_user_notes
+
+ENGINES = ('xhtml2pdf', 'reportlab')
+
+
+class Command(BaseCommand):
+    help = '''
+    Render the report of the same seeded notes with each NOTES_PDF_ENGINE
+    and report pages per second. The engines lay out the report slightly
+    differently, so page counts differ too.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000',
+                            help='Comma separated note counts to render.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the seeded data after the run.')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        self.stdout.write(f'Seeding {max(sizes)} notes for one owner...')
+        owners = seed_notes(max(sizes))
+        try:
+            context = generate_user_notes(EMAIL_TEMPLATE.format(0))[0]
+            self.stdout.write(f"{'notes':>6} {'engine':>10} {'pages':>6} {'seconds':>8} {'pages/s':>8}")
+            for size in sizes:
+                for engine in ENGINES:
+                    # Always the single pass, whatever NOTES_PDF_RENDER_MODE is
+                    with override_settings(NOTES_PDF_ENGINE=engine, NOTES_PDF_RENDER_MODE='single'):
+                        started = time.perf_counter()
+                        pdf = render_report_pdf({**context, 'notes': context['notes'][:size]})
+                        seconds = time.perf_counter() - started
+                    pages = page_count(pdf)
+                    self.stdout.write(f'{size:>6} {engine:>10} {pages:>6} {seconds:>8.1f} {pages / seconds:>8.1f}')
+        finally:
+            if not options['keep']:
+                remove_seeded(owners)
@@ -0,0 +1,83 @@
+import multiprocessing
+import resource
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from OnlineNotesAPI import renderers
+from notebook.management.seeding import EMAIL_TEMPLATE, remove_seeded, seed_notes
+from notebook.reports import REPORT_TEMPLATE
+from notebook.services import generate_user_notes
+
+
+def peak_rss_mb(who: int) -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def render_in_child(context: dict, mode: str, chunk_size: int, processes: int, results) -> None:
+    started = time.perf_counter()
+    if mode == 'parallel':
+        pdf = renderers.render_pdf_chunked(REPORT_TEMPLATE, context, chunk_size, processes)
+    else:
+        pdf = renderers.render_single_pass(REPORT_TEMPLATE, context)
+    seconds = time.perf_counter() - started
+    # The pool's processes have exited by now, so RUSAGE_CHILDREN has the largest of them
+    results.send((seconds, renderers.page_count(pdf),
+                  peak_rss_mb(resource.RUSAGE_SELF) + peak_rss_mb(resource.RUSAGE_CHILDREN)))
+    results.close()
+
+
+class Command(BaseCommand):
+    help = '''
+    Render the PDF report of the same seeded notes in one pass and in
+    parallel chunks (render_pdf_chunked), and report the wall time and peak
+    RSS of each. Every render runs in a fresh process; its peak RSS is that
+    process plus the largest of its rendering processes.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='250,1000',
+                            help='Comma separated note counts to render.')
+        parser.add_argument('--chunk-size', type=int,
+                            default=getattr(settings, 'NOTES_PDF_CHUNK_SIZE', 250),
+                            help='Notes per parallel chunk.')
+        parser.add_argument('--processes', type=int,
+                            default=getattr(settings, 'NOTES_PDF_PROCESSES', None),
+                            help='Rendering processes; one per CPU by default.')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the seeded data after the run.')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        self.stdout.write(f'Seeding {max(sizes)} notes for one owner...')
+        owners = seed_notes(max(sizes))
+        try:
+            context = generate_user_notes(EMAIL_TEMPLATE.format(0))[0]
+            notes = context['notes']
+            # Children render from the context and must not share the connection
+            connections.close_all()
+
+            self.stdout.write(f"Chunk size: {options['chunk_size']}, "
+                              f"processes: {options['processes'] or 'one per CPU'}")
+            self.stdout.write(f"{'notes':>6} {'mode':>9} {'pages':>6} {'seconds':>8} {'peak MB':>8}")
+            for size in sizes:
+                for mode in ('single', 'parallel'):
+                    seconds, pages, peak = self.measure(
+                        {**context, 'notes': notes[:size]}, mode, options['chunk_size'], options['processes'])
+                    self.stdout.write(f'{size:>6} {mode:>9} {pages:>6} {seconds:>8.1f} {peak:>8.0f}')
+        finally:
+            if not options['keep']:
+                remove_seeded(owners)
+
+    def measure(self, context: dict, mode: str, chunk_size: int, processes: int) -> tuple:
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        child = multiprocessing.Process(target=render_in_child,
+                                        args=(context, mode, chunk_size, processes, sender))
+        child.start()
+        sender.close()
+        result = receiver.recv()
+        child.join()
+        return result
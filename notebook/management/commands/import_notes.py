@@ -0,0 +1,50 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from core.models import User
+from notebook.imports import ProgressLogger, error_file_path, run_import, start_import
+from notebook.models import NoteImport
+
+
+class Command(BaseCommand):
+    help = '''
+    Import notes for a user from a CSV file (the columns DownloadCSV emits)
+    or a JSON Lines file, streaming it in bulk_create batches. Rejected rows
+    are written to an error file. Re-run with --resume <import id> to
+    continue an interrupted import after its last committed batch.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON Lines file to import.')
+        parser.add_argument('--email', required=True, help='Email of the user who will own the notes.')
+        parser.add_argument('--format', choices=[code for code, _ in NoteImport.FORMAT_CHOICES],
+                            help='File format; guessed from the extension by default.')
+        parser.add_argument('--batch-size', type=int, help='Rows per batch.')
+        parser.add_argument('--resume', type=int, metavar='IMPORT_ID',
+                            help='Continue an interrupted import of the same file.')
+
+    def handle(self, *args, **options):
+        user = User.objects.select_related('owner').filter(email=options['email']).first()
+        if user is None:
+            raise CommandError(f"No user with email {options['email']}")
+
+        try:
+            job = start_import(
+                user.owner.id, os.path.basename(options['path']), os.path.getsize(options['path']),
+                file_format=options['format'], batch_size=options['batch_size'],
+                resume_id=options['resume'])
+        except (NoteImport.DoesNotExist, OSError, ValueError) as e:
+            raise CommandError(e)
+
+        self.stdout.write(f'Import {job.id}: {job.source_name}, starting at row {job.rows_read}')
+        try:
+            with open(options['path'], 'rb') as source:
+                run_import(job, source, progress=ProgressLogger(self.stdout.write, job))
+        except Exception as e:
+            raise CommandError(
+                f'Import {job.id} stopped after {job.rows_read} rows: {e}. '
+                f'Resume with --resume {job.id}')
+
+        self.stdout.write(
+            f'Import {job.id} completed: {job.rows_imported} imported, {job.rows_failed} rejected')
+        if job.rows_failed:
+            self.stdout.write(f'Rejected rows: {error_file_path(job)}')
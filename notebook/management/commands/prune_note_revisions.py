@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from notebook.revisions import purge_expired
+
+
+class Command(BaseCommand):
+    help = '''
+    Delete note revisions replaced more than NOTES_REVISION_RETENTION days
+    ago. Each note's newest NOTES_REVISION_LIMIT revisions are kept as the
+    notes are saved, so this only bounds their age.
+    '''
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Deleted {purge_expired()} note revisions')
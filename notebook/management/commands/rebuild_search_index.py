@@ -0,0 +1,18 @@
+import time
+from django.core.management.base import BaseCommand
+from notebook.search import get_backend
+
+
+class Command(BaseCommand):
+    help = '''
+    Rebuild the note search index of the active backend (see
+    NOTES_SEARCH_BACKEND) from the notes table. Needed after switching to the
+    'table' backend, or to repair an index after bulk loads that bypassed it.
+    '''
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        started = time.perf_counter()
+        backend.rebuild()
+        self.stdout.write(
+            f'Rebuilt {backend.name} search index in {time.perf_counter() - started:.2f}s')
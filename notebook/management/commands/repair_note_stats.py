@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from notebook.stats import repair_counters
+
+
+class Command(BaseCommand):
+    help = '''
+    Recompute the maintained per-owner note counters (OwnerNoteStats) from
+    the notes table and fix any that drifted, e.g. after bulk SQL changes or
+    after enabling NOTES_STATS_COUNTERS on an existing database.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owner', type=int, action='append', dest='owners',
+                            help='Only check this owner id (repeatable).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report drifted counters without fixing them.')
+
+    def handle(self, *args, **options):
+        fixed = repair_counters(options['owners'], dry_run=options['dry_run'])
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(f'{verb} {len(fixed)} owner(s) with wrong counters')
+        for owner_id in fixed:
+            self.stdout.write(f'  owner {owner_id}')
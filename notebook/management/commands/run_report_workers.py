@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from notebook.reports import run_workers, work
+
+
+class Command(BaseCommand):
+    help = '''
+    Render queued PDF reports with a pool of worker processes. Reports left
+    running by a stopped worker are queued again after
+    NOTES_REPORT_STALE_AFTER seconds.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=getattr(settings, 'NOTES_REPORT_WORKERS', 2),
+                            help='Worker processes; 0 renders in this process.')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once the queue is empty instead of waiting for more reports.')
+
+    def handle(self, *args, **options):
+        if options['processes'] < 1:
+            rendered = work(options['poll_interval'], burst=options['burst'])
+            self.stdout.write(f'Rendered {rendered} reports')
+            return
+
+        self.stdout.write(f"Starting {options['processes']} report workers")
+        try:
+            run_workers(options['processes'], options['poll_interval'], burst=options['burst'])
+        except KeyboardInterrupt:
+            pass
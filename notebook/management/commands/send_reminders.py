@@ -0,0 +1,37 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from notebook.models import ReminderRun
+from notebook.reminders import send_reminders
+
+
+class Command(BaseCommand):
+    help = '''
+    Email every user a digest of their notes that are overdue or due soon.
+    Meant to run daily; a run that is stopped or runs out of its time window
+    carries on from its checkpoint when started again the same day.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to send reminders for (YYYY-MM-DD); today by default.')
+        parser.add_argument('--window', type=float, default=getattr(settings, 'NOTES_REMINDER_WINDOW', None),
+                            help='Stop starting new batches after this many seconds.')
+
+    def handle(self, *args, **options):
+        run_date = None
+        if options['date']:
+            run_date = parse_date(options['date'])
+            if run_date is None:
+                raise CommandError('--date must be a date in YYYY-MM-DD form.')
+
+        started = time.perf_counter()
+        try:
+            run = send_reminders(run_date, window=options['window'])
+        except ValueError as e:
+            raise CommandError(e.args[0])
+
+        elapsed = time.perf_counter() - started
+        state = 'done' if run.status == ReminderRun.STATUS_COMPLETED else f'stopped after owner {run.last_owner_id}'
+        self.stdout.write(f'Reminders for {run.run_date}: {run.owners_notified} users, '
+                          f'{run.notes_count} notes, {state} ({elapsed:.1f}s)')
@@ -0,0 +1,62 @@
+"""
+Synthetic data shared by the benchmark management commands.
+"""
+
+import random
+from datetime import date, timedelta
+from django.db import connection
+from core.models import User
+from notebook.models import Note
+
+
+EMAIL_TEMPLATE = 'benchmark.{}@example.com'
+
+
+def seed_notes(total_notes: int, owner_count: int = 1, batch_size: int = 5000) -> list:
+    '''
+    Create `owner_count` benchmark users and spread `total_notes` random notes
+    across their owners. Returns the owners, first one holding the most notes.
+    '''
+    owners = []
+    for index in range(owner_count):
+        user = User.objects.create_user(
+            first_name='Benchmark', last_name=str(index),
+            email=EMAIL_TEMPLATE.format(index), password='benchmark')
+        owners.append(user.owner)
+
+    statuses = [choice[0] for choice in Note.STATUS_CHOICES]
+    categories = [choice[0] for choice in Note.CATEGORY_CHOICES]
+    priorities = [choice[0] for choice in Note.PRIORITY_CHOICES]
+    today = date.today()
+    batch = []
+    for index in range(total_notes):
+        batch.append(Note(
+            owner=owners[index % owner_count],
+            title=f'Benchmark note {index}',
+            slug=f'benchmark-note-{index}',
+            content='Lorem ipsum dolor sit amet. ' * 8,
+            due_date=None if index % 5 == 0 else today +
+            timedelta(days=random.randint(-60, 60)),
+            priority=random.choice(priorities),
+            status=random.choice(statuses),
+            category=random.choice(categories),
+        ))
+        if len(batch) == batch_size:
+            Note.objects.bulk_create(batch)
+            batch = []
+    Note.objects.bulk_create(batch)
+
+    with connection.cursor() as cursor:
+        if connection.vendor in ('sqlite', 'postgresql'):
+            cursor.execute('ANALYZE')
+        elif connection.vendor == 'mysql':
+            cursor.execute(f'ANALYZE TABLE {Note._meta.db_table}')
+
+    return owners
+
+
+def remove_seeded(owners) -> None:
+    '''
+    Delete the benchmark users; owners and notes cascade.
+    '''
+    User.objects.filter(id__in=[owner.user_id for owner in owners]).delete()
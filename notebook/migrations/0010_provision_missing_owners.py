@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def provision_missing_owners(apps, schema_editor):
+    '''
+    Owners used to be created lazily on first note; create them for every
+    existing user so the authentication principal can always carry one.
+    '''
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Owner = apps.get_model('notebook', 'Owner')
+
+    missing = User.objects.filter(owner__isnull=True).values_list('id', flat=True)
+    Owner.objects.bulk_create(
+        [Owner(user_id=user_id, is_email_valid=False) for user_id in missing.iterator()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notebook', '0009_note_note_owner_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(provision_missing_owners, migrations.RunPython.noop),
+    ]
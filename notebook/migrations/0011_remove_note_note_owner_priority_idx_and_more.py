@@ -0,0 +1,37 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:27
+
+from django.db import migrations, models
+import notebook.models
+
+
+def backfill_priority_rank(apps, schema_editor):
+    Note = apps.get_model('notebook', 'Note')
+    Note.objects.update(priority_rank=models.Case(
+        models.When(priority='L', then=models.Value(1)),
+        models.When(priority='H', then=models.Value(3)),
+        default=models.Value(2),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0010_provision_missing_owners'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='note',
+            name='note_owner_priority_idx',
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='priority_rank',
+            field=notebook.models.PriorityRankField(default=2, editable=False),
+        ),
+        migrations.RunPython(backfill_priority_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['owner', 'priority_rank'], name='note_owner_priority_rank_idx'),
+        ),
+    ]
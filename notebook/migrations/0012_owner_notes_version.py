@@ -0,0 +1,23 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0011_remove_note_note_owner_priority_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='owner',
+            name='notes_modified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='owner',
+            name='notes_version',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
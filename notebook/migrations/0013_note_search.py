@@ -0,0 +1,27 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0012_owner_notes_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('frequency', models.PositiveIntegerField()),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='notebook.note')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='notebook.owner')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'token'], name='note_search_owner_token_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+def add_mysql_fulltext(apps, schema_editor):
+    '''
+    MySQL maintains FULLTEXT indexes itself. SQLite's FTS5 table is installed
+    by notebook.search.ensure_sqlite_fts after migrations, and other databases
+    use the NoteSearchTerm table.
+    '''
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute(
+            'ALTER TABLE notebook_note ADD FULLTEXT INDEX note_fulltext_idx (title, content)')
+
+
+def drop_mysql_fulltext(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        schema_editor.execute('ALTER TABLE notebook_note DROP INDEX note_fulltext_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0013_note_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_mysql_fulltext, drop_mysql_fulltext),
+    ]
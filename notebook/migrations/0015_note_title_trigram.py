@@ -0,0 +1,50 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+
+
+def index_existing_titles(apps, schema_editor):
+    '''
+    Build the trigram rows for notes written before the index existed, using
+    the same padding rules as notebook.autocomplete.title_trigrams.
+    '''
+    Note = apps.get_model('notebook', 'Note')
+    NoteTitleTrigram = apps.get_model('notebook', 'NoteTitleTrigram')
+
+    rows = []
+    for note_id, owner_id, title in Note.objects.values_list('id', 'owner_id', 'title').iterator(chunk_size=2000):
+        trigrams = set()
+        for word in re.findall(r'\w+', title.lower()):
+            padded = f'  {word} '
+            trigrams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+        rows += [NoteTitleTrigram(owner_id=owner_id, note_id=note_id, trigram=trigram)
+                 for trigram in trigrams]
+        if len(rows) >= 5000:
+            NoteTitleTrigram.objects.bulk_create(rows)
+            rows = []
+    NoteTitleTrigram.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0014_note_fulltext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteTitleTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='title_trigrams', to='notebook.note')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='notebook.owner')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'trigram'], name='note_title_trigram_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing_titles, migrations.RunPython.noop),
+    ]
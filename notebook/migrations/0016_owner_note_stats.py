@@ -0,0 +1,36 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0015_note_title_trigram'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OwnerNoteStats',
+            fields=[
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='note_stats', serialize=False, to='notebook.owner')),
+                ('total', models.IntegerField(default=0)),
+                ('status_n', models.IntegerField(default=0)),
+                ('status_p', models.IntegerField(default=0)),
+                ('status_c', models.IntegerField(default=0)),
+                ('status_d', models.IntegerField(default=0)),
+                ('priority_l', models.IntegerField(default=0)),
+                ('priority_m', models.IntegerField(default=0)),
+                ('priority_h', models.IntegerField(default=0)),
+                ('category_n', models.IntegerField(default=0)),
+                ('category_b', models.IntegerField(default=0)),
+                ('category_g', models.IntegerField(default=0)),
+                ('category_o', models.IntegerField(default=0)),
+                ('category_p', models.IntegerField(default=0)),
+                ('category_r', models.IntegerField(default=0)),
+                ('category_y', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:48
+
+from django.db import migrations, models
+import notebook.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0016_owner_note_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='owner',
+            name='slug_sequence',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='note',
+            name='slug',
+            field=notebook.models.NoteSlugField(blank=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0018_note_import'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['owner', 'updated_at'], name='note_owner_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.6 on 2026-10-18 12:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0019_note_owner_updated_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed'), ('expired', 'Expired')], default='queued', max_length=10)),
+                ('progress', models.PositiveSmallIntegerField(default=0)),
+                ('notes_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('file_size', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='note_reports', to='notebook.owner')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='note_report_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.6 on 2026-10-18 13:53
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notebook', '0022_note_revision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notereport',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.text import slugify
 from django.conf import settings
 
 
@@ -11,6 +14,11 @@ class Owner(models.Model):
     is_email_valid = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Bumped on every note write; drives ETags and versioned cache keys
+    notes_version = models.PositiveBigIntegerField(default=0)
+    notes_modified_at = models.DateTimeField(null=True, blank=True)
+    # Last number handed out for generated note slugs (see NoteSlugField)
+    slug_sequence = models.PositiveBigIntegerField(default=0)
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
 
@@ -28,10 +36,80 @@ class Owner(models.Model):
     def email(self):
         return self.user.email
 
+    @classmethod
+    def reserve_slug_numbers(cls, owner_id: int, count: int) -> range:
+        '''
+        Reserve `count` consecutive slug numbers for an owner. The increment
+        locks the owner row until the surrounding transaction ends, so
+        concurrent writers never receive the same numbers, and numbers from a
+        rolled back transaction are only reused together with its notes.
+        '''
+        with transaction.atomic():
+            cls.objects.filter(pk=owner_id).update(slug_sequence=F('slug_sequence') + count)
+            last = cls.objects.values_list('slug_sequence', flat=True).get(pk=owner_id)
+        return range(last - count + 1, last + 1)
+
     class Meta:
         ordering = ['user__email']
 
 
+class PriorityRankField(models.PositiveSmallIntegerField):
+    '''
+    Numeric rank of a note's priority (Low < Medium < High), derived from the
+    priority code whenever the row is written, so priority can be sorted
+    correctly from an index. Covers save() and bulk_create; bulk_update
+    callers must list this field alongside 'priority'.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('default', 2)
+        super().__init__(*args, **kwargs)
+
+    def pre_save(self, model_instance, add):
+        rank = model_instance.PRIORITY_RANKS.get(model_instance.priority, 2)
+        setattr(model_instance, self.attname, rank)
+        return rank
+
+
+def to_base36(number: int) -> str:
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    encoded = ''
+    while True:
+        number, remainder = divmod(number, 36)
+        encoded = digits[remainder] + encoded
+        if not number:
+            return encoded
+
+
+class NoteSlugField(models.SlugField):
+    '''
+    Slug that is generated from the title when left blank, as
+    "<title>--<owner>-<number>" with the owner id and a per-owner sequence
+    number in base 36. That suffix is unique by construction, so no lookups
+    or retries are needed. Clients may not use "--" (see NoteSerializer), so
+    their slugs never collide with generated ones.
+
+    Covers save() and bulk_create one note at a time; bulk writers should
+    call Note.assign_slugs() first to reserve numbers in one statement.
+    '''
+    separator = '--'
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('blank', True)
+        super().__init__(*args, **kwargs)
+
+    def pre_save(self, model_instance, add):
+        if not getattr(model_instance, self.attname):
+            model_instance.assign_slugs([model_instance])
+        return super().pre_save(model_instance, add)
+
+    def generate(self, title: str, owner_id: int, number: int) -> str:
+        suffix = f'{self.separator}{to_base36(owner_id)}-{to_base36(number)}'
+        base = slugify(title)[:self.max_length - len(suffix)].strip('-_') or 'note'
+        return base + suffix
+
+
 class Note(models.Model):
     """
     This model includes fields for the owner who created the note, 
@@ -48,6 +126,11 @@ class Note(models.Model):
         (PRIORITY_MEDIUM, "Medium"),
         (PRIORITY_HIGH, "High")
     ]
+    PRIORITY_RANKS = {
+        PRIORITY_LOW: 1,
+        PRIORITY_MEDIUM: 2,
+        PRIORITY_HIGH: 3,
+    }
 
     STATUS_NEW = 'N'
     STATUS_WIP = 'P'
@@ -81,12 +164,13 @@ class Note(models.Model):
         Owner, on_delete=models.CASCADE, related_name='note_owner')
     title = models.CharField(max_length=100)
     content = models.TextField()
-    slug = models.SlugField(null=False, unique=True)
+    slug = NoteSlugField(null=False, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     due_date = models.DateField(null=True, blank=True)
     priority = models.CharField(
         max_length=1, choices=PRIORITY_CHOICES, default=PRIORITY_MEDIUM)
+    priority_rank = PriorityRankField()
     status = models.CharField(
         max_length=15, choices=STATUS_CHOICES, default=STATUS_NEW)
     category = models.CharField(
@@ -94,10 +178,68 @@ class Note(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        # Every note query is scoped to one owner, so each access path
+        # leads with the owner column.
+        indexes = [
+            models.Index(fields=['owner', 'created_at'],
+                         name='note_owner_created_idx'),
+            models.Index(fields=['owner', 'status'],
+                         name='note_owner_status_idx'),
+            models.Index(fields=['owner', 'category'],
+                         name='note_owner_category_idx'),
+            models.Index(fields=['owner', 'due_date'],
+                         name='note_owner_due_date_idx'),
+            models.Index(fields=['owner', 'priority_rank'],
+                         name='note_owner_priority_rank_idx'),
+            models.Index(fields=['owner', 'updated_at'],
+                         name='note_owner_updated_idx'),
+            # The one cross-owner access path: the due-date reminder scan
+            models.Index(fields=['due_date', 'status'],
+                         name='note_due_date_status_idx'),
+        ]
+
+    # Columns counted by the maintained stats counters (see notebook.stats)
+    TRACKED_FIELDS = ('status', 'priority', 'category')
+    # Columns kept by note revisions (see notebook.revisions). A save reads
+    # them from the row it replaces, as the instance's `_replaced_state`,
+    # so revisions and counters follow what was actually stored
+    REVISION_FIELDS = ('title', 'slug', 'content', 'due_date', 'priority', 'status', 'category')
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def assign_slugs(cls, notes) -> None:
+        '''
+        Generate slugs for the notes that have none, reserving all numbers an
+        owner needs with a single update.
+        '''
+        missing = {}
+        for note in notes:
+            if not note.slug:
+                missing.setdefault(note.owner_id, []).append(note)
+
+        slug_field = cls._meta.get_field('slug')
+        for owner_id, pending in missing.items():
+            numbers = Owner.reserve_slug_numbers(owner_id, len(pending))
+            for note, number in zip(pending, numbers):
+                note.slug = slug_field.generate(note.title, owner_id, number)
+
+    def tracked_values(self) -> dict:
+        # Deferred fields are absent from __dict__ and are skipped
+        return {name: self.__dict__[name] for name in self.TRACKED_FIELDS if name in self.__dict__}
+
+    def revision_state(self) -> dict:
+        return {name: self.__dict__[name] for name in (*self.REVISION_FIELDS, 'updated_at')
+                if name in self.__dict__}
+
+    def save(self, *args, **kwargs):
+        # post_save handlers (version bump, search index, counters,
+        # revisions) commit or roll back together with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self.__dict__.pop('_replaced_state', None)
+
     def get_display_info(self):
         priority_display = dict(self.PRIORITY_CHOICES).get(self.priority)
         status_display = dict(self.STATUS_CHOICES).get(self.status)
@@ -116,3 +258,215 @@ class Note(models.Model):
             "status": status_display,
             "category": category_display,
         }
+
+
+class OwnerNoteStats(models.Model):
+    '''
+    Maintained per-owner note counts by status, priority and category, used
+    by the stats endpoint when NOTES_STATS_COUNTERS is on. Updated in the
+    same transaction as each note write by notebook.stats; the
+    repair_note_stats command recomputes them from the notes table.
+    '''
+    owner = models.OneToOneField(
+        Owner, on_delete=models.CASCADE, primary_key=True, related_name='note_stats')
+    total = models.IntegerField(default=0)
+    status_n = models.IntegerField(default=0)
+    status_p = models.IntegerField(default=0)
+    status_c = models.IntegerField(default=0)
+    status_d = models.IntegerField(default=0)
+    priority_l = models.IntegerField(default=0)
+    priority_m = models.IntegerField(default=0)
+    priority_h = models.IntegerField(default=0)
+    category_n = models.IntegerField(default=0)
+    category_b = models.IntegerField(default=0)
+    category_g = models.IntegerField(default=0)
+    category_o = models.IntegerField(default=0)
+    category_p = models.IntegerField(default=0)
+    category_r = models.IntegerField(default=0)
+    category_y = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.owner_id}: {self.total} notes'
+
+
+class NoteSearchTerm(models.Model):
+    '''
+    Portable inverted index used for search on databases without a native
+    full-text facility: one row per (note, token) with its term frequency.
+    Kept up to date incrementally by notebook.search on note writes.
+    '''
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE, related_name='+')
+    note = models.ForeignKey(Note, on_delete=models.CASCADE, related_name='search_terms')
+    token = models.CharField(max_length=64)
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'token'], name='note_search_owner_token_idx'),
+        ]
+
+    def __str__(self):
+        return self.token
+
+
+class NoteTitleTrigram(models.Model):
+    '''
+    Trigram index over note titles for typo-tolerant autocomplete: one row per
+    distinct trigram of a title. Rewritten by notebook.autocomplete whenever
+    a note is saved.
+    '''
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE, related_name='+')
+    note = models.ForeignKey(Note, on_delete=models.CASCADE, related_name='title_trigrams')
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'trigram'], name='note_title_trigram_idx'),
+        ]
+
+    def __str__(self):
+        return self.trigram
+
+
+class NoteImport(models.Model):
+    '''
+    One streaming import of a notes file (see notebook.imports). Progress is
+    committed together with each batch of notes, so an interrupted import
+    resumes after the last committed row.
+    '''
+    FORMAT_CSV = 'csv'
+    FORMAT_NDJSON = 'ndjson'
+    FORMAT_CHOICES = [
+        (FORMAT_CSV, 'CSV'),
+        (FORMAT_NDJSON, 'JSON Lines'),
+    ]
+
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE, related_name='note_imports')
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    source_name = models.CharField(max_length=255)
+    source_size = models.PositiveBigIntegerField()
+    batch_size = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_RUNNING)
+    # Rows read up to the last committed batch; a resumed import skips them
+    rows_read = models.PositiveBigIntegerField(default=0)
+    rows_imported = models.PositiveBigIntegerField(default=0)
+    rows_failed = models.PositiveBigIntegerField(default=0)
+    # Length of the error file at the last committed batch
+    error_bytes = models.PositiveBigIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.source_name} ({self.status})'
+
+
+class NoteReport(models.Model):
+    '''
+    A PDF report of an owner's notes, rendered by the report workers (see
+    notebook.reports) instead of inside the request. Jobs are claimed from
+    this table, so queued work survives restarts.
+    '''
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+        (STATUS_FAILED, 'Failed'),
+        (STATUS_EXPIRED, 'Expired'),
+    ]
+
+    owner = models.ForeignKey(Owner, on_delete=models.CASCADE, related_name='note_reports')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    # Percent done; rendering reports it per stage
+    progress = models.PositiveSmallIntegerField(default=0)
+    notes_count = models.PositiveIntegerField(null=True, blank=True)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Failed renders are retried from then on, with backoff
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    worker = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='note_report_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'Report {self.id} ({self.status})'
+
+
+class ReminderRun(models.Model):
+    '''
+    Progress of one day's due-date reminders (see notebook.reminders).
+    Owners are visited in id order and `last_owner_id` is committed with
+    each batch of digests, so a rerun resumes where the last one stopped
+    and nobody is reminded twice.
+    '''
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_COMPLETED, 'Completed'),
+    ]
+
+    run_date = models.DateField(unique=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_RUNNING)
+    last_owner_id = models.PositiveBigIntegerField(default=0)
+    owners_notified = models.PositiveIntegerField(default=0)
+    notes_count = models.PositiveIntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Reminders for {self.run_date} ({self.status})'
+
+
+class NoteRevision(models.Model):
+    '''
+    A past version of a note's REVISION_FIELDS (see notebook.revisions).
+    The note row is the current version. Each revision is either a full
+    snapshot or a reverse delta against the next newer version, so a note
+    that is never edited costs nothing, and the oldest revisions can be
+    deleted without touching the rest.
+    '''
+    note = models.ForeignKey(Note, on_delete=models.CASCADE, related_name='revisions')
+    # Counts up from 1 over the note's lifetime
+    number = models.PositiveIntegerField()
+    is_snapshot = models.BooleanField(default=False)
+    data = models.JSONField()
+    # Bytes of `data` as JSON, for reporting the storage used
+    size = models.PositiveIntegerField()
+    # When this version was saved, and when it was replaced
+    saved_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['note', 'number'], name='note_revision_number_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at'], name='note_revision_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.note_id} revision {self.number}'
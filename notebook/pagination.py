@@ -0,0 +1,217 @@
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from .models import Note
+
+
+class NoteCursorPagination(BasePagination):
+    '''
+    Keyset (cursor) pagination for notes.
+
+    Pages are addressed by the sort key of the row at the page boundary
+    rather than by an offset, so each page costs O(page_size) no matter how
+    deep into the list the client is. The primary key is always appended as
+    the final sort key to make the ordering total. The ordering is taken from
+    the queryset (see NoteFilter) unless given explicitly.
+
+    Supported query parameters:
+    * cursor: opaque token taken from a previous response's next/previous link
+    * page_size: number of notes per page (bounded by NOTES_MAX_PAGE_SIZE)
+    * count: 'exact' for a full count, 'estimate' for a count capped at
+      NOTES_COUNT_ESTIMATE_CAP rows
+    '''
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    default_ordering = ('-created_at', )
+    cursor_salt = 'notebook.pagination.cursor'
+
+    def is_requested(self, request) -> bool:
+        '''
+        Pagination is opt-in through query parameters unless enabled globally.
+        '''
+        if getattr(settings, 'NOTES_PAGINATE_BY_DEFAULT', False):
+            return True
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request) -> int:
+        default_size = getattr(settings, 'NOTES_PAGE_SIZE', 50)
+        max_size = getattr(settings, 'NOTES_MAX_PAGE_SIZE', 500)
+        try:
+            page_size = int(request.query_params.get(
+                self.page_size_query_param, default_size))
+        except (TypeError, ValueError):
+            page_size = default_size
+        return max(1, min(page_size, max_size))
+
+    def paginate_queryset(self, queryset, request, view=None, ordering=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = list(ordering or queryset.query.order_by or self.default_ordering)
+        if 'id' not in [term.lstrip('-') for term in self.ordering]:
+            self.ordering.append('-id' if self.ordering[0].startswith('-') else 'id')
+
+        self.count = None
+        self.count_is_exact = None
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode == 'exact':
+            self.count = queryset.order_by().count()
+            self.count_is_exact = True
+        elif count_mode == 'estimate':
+            cap = getattr(settings, 'NOTES_COUNT_ESTIMATE_CAP', 1000)
+            self.count = queryset.order_by()[:cap + 1].count()
+            self.count_is_exact = self.count <= cap
+
+        # Under an .only() or .values() projection the sort keys must still be
+        # loaded to build cursors
+        sort_fields = [term.lstrip('-') for term in self.ordering]
+        field_names, deferred = queryset.query.deferred_loading
+        if field_names and not deferred:
+            queryset = queryset.only(*field_names, *sort_fields)
+        elif queryset.query.values_select:
+            selected = queryset.query.values_select
+            queryset = queryset.values(
+                *selected, *[name for name in sort_fields if name not in selected])
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['r'])
+        ordering = self._invert(self.ordering) if reverse else self.ordering
+
+        queryset = queryset.order_by(*self._order_expressions(queryset, ordering))
+        if cursor is not None:
+            queryset = queryset.filter(
+                self._keyset_filter(queryset, ordering, cursor['v']))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+
+        self.next_cursor = None
+        self.previous_cursor = None
+        if results and self.has_next:
+            self.next_cursor = self.encode_cursor(results[-1], reverse=False)
+        if results and self.has_previous:
+            self.previous_cursor = self.encode_cursor(results[0], reverse=True)
+
+        return results
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_link(self.next_cursor),
+            'previous': self.get_link(self.previous_cursor),
+        }
+        if self.count is not None:
+            payload['count'] = self.count
+            payload['count_is_exact'] = self.count_is_exact
+        payload['results'] = data
+        return Response(payload)
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = cursor
+        return self.request.build_absolute_uri(f'{self.request.path}?{params.urlencode()}')
+
+    def encode_cursor(self, note, reverse: bool) -> str:
+        '''
+        Sign the boundary row's sort key so clients cannot forge positions.
+        The signature has no timestamp, so the same page always gets the
+        same links and the response stays byte-stable for its ETag.
+        '''
+        values = [self._field_value(note, term.lstrip('-')) for term in self.ordering]
+        payload = {'o': self.ordering, 'v': values, 'r': int(reverse)}
+        return signing.Signer(salt=self.cursor_salt).sign_object(payload, compress=True)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = signing.Signer(salt=self.cursor_salt).unsign_object(token)
+        except signing.BadSignature:
+            raise NotFound('Invalid cursor')
+        if payload.get('o') != self.ordering or len(payload.get('v', [])) != len(self.ordering):
+            raise NotFound('Cursor does not match the requested ordering')
+        try:
+            payload['v'] = [self._parse_value(term.lstrip('-'), value)
+                            for term, value in zip(self.ordering, payload['v'])]
+        except ValidationError:
+            raise NotFound('Invalid cursor')
+        return payload
+
+    def _field_value(self, note, name):
+        value = note[name] if isinstance(note, dict) else getattr(note, name)
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    def _parse_value(self, name, value):
+        if value is None:
+            return None
+        try:
+            return Note._meta.get_field(name).to_python(value)
+        except FieldDoesNotExist:
+            return value
+
+    def _is_nullable(self, queryset, name) -> bool:
+        if name in queryset.query.annotations:
+            return False
+        return Note._meta.get_field(name).null
+
+    def _invert(self, ordering):
+        return [term[1:] if term.startswith('-') else f'-{term}' for term in ordering]
+
+    def _order_expressions(self, queryset, ordering):
+        '''
+        Nullable keys sort nulls last ascending and first descending, so that
+        inverting the ordering for backwards pages walks the exact same sequence.
+        '''
+        expressions = []
+        for term in ordering:
+            name = term.lstrip('-')
+            if not self._is_nullable(queryset, name):
+                expressions.append(term)
+            elif term.startswith('-'):
+                expressions.append(F(name).desc(nulls_first=True))
+            else:
+                expressions.append(F(name).asc(nulls_last=True))
+        return expressions
+
+    def _keyset_filter(self, queryset, ordering, values):
+        '''
+        Build the row-value comparison "sort key is after the cursor" as
+        (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...
+        '''
+        condition = Q(pk__in=[])
+        equal = Q()
+        for term, value in zip(ordering, values):
+            name = term.lstrip('-')
+            descending = term.startswith('-')
+
+            if value is None:
+                beyond = Q(**{f'{name}__isnull': False}) if descending else None
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                beyond = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+                if not descending and self._is_nullable(queryset, name):
+                    beyond |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+
+            if beyond is not None:
+                condition |= equal & beyond
+            equal &= same
+        return condition
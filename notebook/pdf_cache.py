@@ -0,0 +1,129 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+from django.conf import settings
+from core.cache import register_stats
+
+
+class PDFCache:
+    '''
+    Rendered PDFs on disk, named by a hash of everything that goes into
+    them, so identical inputs are rendered once and changed inputs simply
+    miss. Shared by every process using the same directory. A file's mtime
+    is its last use; once the directory grows past NOTES_PDF_CACHE_MAX_BYTES
+    the least recently used files are deleted.
+    '''
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        register_stats('notes.pdf', self.stats)
+
+    @property
+    def directory(self) -> Path:
+        return Path(getattr(settings, 'NOTES_PDF_CACHE_DIR', 'pdf-cache'))
+
+    @property
+    def max_bytes(self) -> int:
+        return getattr(settings, 'NOTES_PDF_CACHE_MAX_BYTES', 256 * 1024 * 1024)
+
+    @staticmethod
+    def key(*inputs) -> str:
+        return hashlib.sha256('|'.join(str(value) for value in inputs).encode()).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / f'{key}.pdf'
+
+    def open(self, key: str):
+        '''
+        The cached PDF as an open binary file, or None. Returning the open
+        file means a concurrent eviction can't remove it before it is read.
+        '''
+        path = self.path(key)
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += os.fstat(file.fileno()).st_size
+        return file
+
+    def put(self, key: str, pdf: bytes) -> None:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.part')
+        partial.write_bytes(pdf)
+        os.replace(partial, path)
+        with self._lock:
+            self.stores += 1
+        self.evict()
+
+    def entries(self) -> list:
+        entries = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if entry.name.endswith('.pdf'):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def evict(self) -> int:
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+        with self._lock:
+            self.evictions += evicted
+        return evicted
+
+    def clear(self) -> None:
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        entries = self.entries()
+        lookups = self.hits + self.misses
+        return {
+            'files': len(entries),
+            'size_bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'bytes_saved': self.bytes_saved,
+        }
+
+
+pdf_cache = PDFCache()
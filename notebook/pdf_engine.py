@@ -0,0 +1,165 @@
+import functools
+import html
+import os
+from io import BytesIO
+from django.conf import settings
+from django.template.defaultfilters import date as date_filter
+from django.utils import formats
+from django.utils.timezone import template_localtime
+from reportlab import rl_config
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Flowable, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from reportlab.platypus.flowables import HRFlowable
+
+FONT_FAMILY = 'NotesReport'
+
+# Regular, bold, italic and bold italic TrueType files, tried in order until
+# one has a regular face; missing styles fall back to bold or regular. The
+# fonts are embedded as subsets of the glyphs used. DejaVu covers most
+# scripts; reportlab's bundled Vera is the fallback.
+DEJAVU = ('DejaVuSans.ttf', 'DejaVuSans-Bold.ttf', 'DejaVuSans-Oblique.ttf', 'DejaVuSans-BoldOblique.ttf')
+FONT_CANDIDATES = (
+    ('/usr/share/fonts/truetype/dejavu', DEJAVU),
+    ('/usr/share/fonts/TTF', DEJAVU),
+    ('/usr/share/fonts/dejavu', DEJAVU),
+    (os.path.join(os.path.dirname(rl_config.__file__), 'fonts'),
+     ('Vera.ttf', 'VeraBd.ttf', 'VeraIt.ttf', 'VeraBI.ttf')),
+)
+
+COLUMNS = ('S/N', 'Title', 'Slug', 'Content', 'Date Created', 'Due Date',
+           'Priority', 'Status', 'Category')
+
+# Sizes follow xhtml2pdf's rendering of app/pdf_template.html
+MARGIN = 1 * cm
+FONT_SIZE = 7.5
+LEADING = 11.25
+CELL_PADDING = 3.75
+HEADER_RULE = colors.grey
+ROW_RULE = colors.Color(233 / 255, 197 / 255, 197 / 255)
+
+
+def font_files() -> tuple:
+    configured = getattr(settings, 'NOTES_PDF_FONT_FILES', None)
+    if configured:
+        return tuple(configured)
+    for directory, names in FONT_CANDIDATES:
+        regular, bold, italic, bold_italic = (
+            path if os.path.exists(path) else None
+            for path in (os.path.join(directory, name) for name in names))
+        if regular:
+            bold = bold or regular
+            return regular, bold, italic or regular, bold_italic or bold
+    raise ValueError('No TrueType font found for the reportlab PDF engine; set NOTES_PDF_FONT_FILES.')
+
+
+@functools.lru_cache(maxsize=None)
+def register_fonts(files: tuple) -> str:
+    names = [f'{FONT_FAMILY}{suffix}' for suffix in ('', '-Bold', '-Italic', '-BoldItalic')]
+    for name, path in zip(names, files):
+        pdfmetrics.registerFont(TTFont(name, path))
+    pdfmetrics.registerFontFamily(FONT_FAMILY, normal=names[0], bold=names[1],
+                                  italic=names[2], boldItalic=names[3])
+    return FONT_FAMILY
+
+
+class LastPageFooter(Flowable):
+    '''
+    The "(c) - page N of M" line. It is the last flowable of the report, so
+    the page it lands on is also the page count.
+    '''
+
+    def __init__(self, style):
+        super().__init__()
+        self.style = style
+
+    def wrap(self, available_width, available_height):
+        self.width = available_width
+        return available_width, self.style.leading
+
+    def draw(self):
+        page = self.canv.getPageNumber()
+        self.canv.setFont(self.style.fontName, self.style.fontSize)
+        self.canv.drawString(0, self.style.leading - self.style.fontSize, f'(c) - page {page} of {page}')
+
+
+def text(value) -> str:
+    '''
+    A context value as the template prints it, escaped for Paragraph markup.
+    '''
+    if value is None:
+        return 'None'
+    return html.escape(str(value))
+
+
+def render_notes_pdf(context: dict) -> bytes:
+    '''
+    Draws the notes report of generate_user_notes() straight with reportlab
+    platypus, laid out like app/pdf_template.html under xhtml2pdf but
+    without HTML parsing or CSS layout. Text is Unicode throughout.
+    '''
+    font = register_fonts(font_files())
+    base = ParagraphStyle('report', fontName=font, fontSize=FONT_SIZE, leading=LEADING)
+    heading = ParagraphStyle('heading', base, fontName=f'{font}-BoldItalic', alignment=TA_CENTER)
+    styles = {
+        'h1': ParagraphStyle('h1', heading, fontSize=10.3875, leading=15.58),
+        'h2': ParagraphStyle('h2', heading, fontSize=9.2325, leading=13.85),
+        'cell': ParagraphStyle('cell', base, alignment=TA_CENTER),
+        'header': ParagraphStyle('header', base, fontName=f'{font}-Bold', alignment=TA_CENTER),
+        'text': ParagraphStyle('text', base, alignment=TA_LEFT),
+    }
+
+    notes = context['notes']
+    width = A4[0] - 2 * MARGIN
+    rows = [[Paragraph(name, styles['header']) for name in COLUMNS]]
+    cell = styles['cell']
+    for number, note in enumerate(notes, 1):
+        rows.append([
+            Paragraph(str(number), cell),
+            Paragraph(text(note['title']), cell),
+            Paragraph(text(note['slug']), cell),
+            Paragraph(text(note['content']), cell),
+            Paragraph(text(date_filter(template_localtime(note['created_at']))), cell),
+            Paragraph(text(note['due_date']), cell),
+            Paragraph(text(note['priority']), cell),
+            Paragraph(text(note['status']), cell),
+            Paragraph(text(note['category']), cell),
+        ])
+
+    table = Table(rows, colWidths=[width / len(COLUMNS)] * len(COLUMNS), splitInRow=1)
+    table.setStyle(TableStyle([
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('LEFTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+        ('RIGHTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+        ('TOPPADDING', (0, 0), (-1, -1), CELL_PADDING),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), CELL_PADDING),
+        ('LINEBELOW', (0, 0), (-1, 0), 0.75, HEADER_RULE),
+        ('LINEBELOW', (0, 1), (-1, -1), 0.75, ROW_RULE),
+    ]))
+
+    story = [
+        Paragraph('<u>ONLINE NOTE MANAGEMENT SYSTEM</u>', styles['h1']),
+        Paragraph('<u>SUMMARY REPORT</u>', styles['h2']),
+        Spacer(0, LEADING),
+        Paragraph(f"<b>User:</b> {text(context['user'])}", styles['text']),
+        Paragraph(f"<b>Run Date:</b> {text(formats.localize(template_localtime(context['created_date'])))}",
+                  styles['text']),
+        HRFlowable(width='100%', thickness=1, color=colors.black, spaceBefore=LEADING / 2,
+                   spaceAfter=LEADING / 2),
+        table,
+        HRFlowable(width='100%', thickness=1, color=colors.black, spaceBefore=LEADING,
+                   spaceAfter=LEADING),
+        Paragraph(f'<b>Total: {len(notes)}</b>', styles['text']),
+        Spacer(0, LEADING / 2),
+        LastPageFooter(base),
+    ]
+
+    result = BytesIO()
+    SimpleDocTemplate(result, pagesize=A4, leftMargin=MARGIN, rightMargin=MARGIN,
+                      topMargin=MARGIN, bottomMargin=MARGIN, title='Notes Summary Report').build(story)
+    return result.getvalue()
@@ -0,0 +1,154 @@
+import datetime
+import itertools
+import time
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import get_template
+from django.utils import timezone
+from core import outbox
+from .models import Note, Owner, ReminderRun
+
+REMINDER_TEMPLATE = 'app/reminder_email.txt'
+REMINDER_SUBJECT = 'Online Note Manager - Notes Due'
+
+# Only notes still to be done are worth a reminder
+REMINDER_STATUSES = (Note.STATUS_NEW, Note.STATUS_WIP)
+
+PRIORITY_LABELS = dict(Note.PRIORITY_CHOICES)
+STATUS_LABELS = dict(Note.STATUS_CHOICES)
+
+
+def batch_size() -> int:
+    return getattr(settings, 'NOTES_REMINDER_BATCH_SIZE', 200)
+
+
+def max_listed() -> int:
+    return getattr(settings, 'NOTES_REMINDER_MAX_NOTES', 20)
+
+
+def due_notes(run_date: datetime.date, after_owner_id: int = 0):
+    '''
+    Unfinished notes of every owner after `after_owner_id` that are overdue
+    or due within NOTES_REMINDER_DAYS_AHEAD days: one range scan on the
+    (due_date, status) index, sorted so each owner's notes come together.
+    '''
+    horizon = run_date + datetime.timedelta(days=getattr(settings, 'NOTES_REMINDER_DAYS_AHEAD', 1))
+    return Note.objects.filter(
+        due_date__lte=horizon, status__in=REMINDER_STATUSES, owner_id__gt=after_owner_id
+    ).order_by('owner_id', 'due_date', 'id').values_list('owner_id', 'title', 'due_date', 'priority', 'status')
+
+
+def owner_digests(rows):
+    '''
+    Group the scan by owner into (owner_id, listed notes, notes count),
+    keeping only the first NOTES_REMINDER_MAX_NOTES notes of each owner.
+    '''
+    limit = max_listed()
+    for owner_id, notes in itertools.groupby(rows, key=lambda row: row[0]):
+        listed = list(itertools.islice(notes, limit))
+        yield owner_id, listed, len(listed) + sum(1 for _ in notes)
+
+
+def render_digests(batch: list, run_date: datetime.date) -> list:
+    '''
+    The reminder emails of a batch of owner digests, with the owners' names
+    and addresses loaded in one query, as outbox `data` dicts.
+    '''
+    users = {owner['id']: owner for owner in Owner.objects.filter(
+        id__in=[owner_id for owner_id, _, _ in batch]
+    ).values('id', 'user__email', 'user__first_name', 'user__last_name')}
+    template = get_template(REMINDER_TEMPLATE)
+
+    messages = []
+    for owner_id, listed, count in batch:
+        user = users.get(owner_id)
+        if user is None:
+            continue
+        notes = [{'title': title, 'due_date': due_date, 'priority': PRIORITY_LABELS.get(priority, priority),
+                  'status': STATUS_LABELS.get(status, status)}
+                 for _, title, due_date, priority, status in listed]
+        messages.append({
+            'email_subject': REMINDER_SUBJECT,
+            'email_body': template.render({
+                'first_name': user['user__first_name'],
+                'last_name': user['user__last_name'],
+                'overdue': [note for note in notes if note['due_date'] < run_date],
+                'due_soon': [note for note in notes if note['due_date'] >= run_date],
+                'more': count - len(listed),
+            }),
+            'email_address': user['user__email'],
+        })
+    return messages
+
+
+def commit_batch(run: ReminderRun, batch: list, messages: list) -> str:
+    '''
+    Queue the batch's emails, claimed for this run to send, and move the
+    checkpoint past its last owner in one transaction, so a batch is either
+    fully recorded or not at all. The checkpoint only moves from where this
+    run read it; if another run got there first, nothing is queued and
+    ValueError is raised. Returns the claim of the emails.
+    '''
+    last_owner_id = batch[-1][0]
+    notes_count = sum(count for _, _, count in batch)
+    claim = outbox.new_claim()
+    with transaction.atomic():
+        outbox.enqueue_emails(messages, claim=claim)
+        advanced = ReminderRun.objects.filter(
+            pk=run.pk, last_owner_id=run.last_owner_id, status=ReminderRun.STATUS_RUNNING
+        ).update(last_owner_id=last_owner_id, owners_notified=F('owners_notified') + len(messages),
+                 notes_count=F('notes_count') + notes_count)
+        if not advanced:
+            raise ValueError(f'The reminders for {run.run_date} are being sent by another run.')
+
+    run.last_owner_id = last_owner_id
+    run.owners_notified += len(messages)
+    run.notes_count += notes_count
+    return claim
+
+
+def send_now(claim: str) -> int:
+    '''
+    Send a committed batch, found by its claim, over one SMTP connection.
+    Failures are retried by `dispatch_emails`, and so is anything left
+    unsent because the process died, once it goes stale.
+    '''
+    batch = outbox.claimed(claim)
+    if not batch:
+        return 0
+    connection = get_connection()
+    try:
+        return outbox.send_batch(batch, connection)
+    finally:
+        connection.close()
+
+
+def send_reminders(run_date: datetime.date = None, window: float = None) -> ReminderRun:
+    '''
+    Email every owner with notes overdue or due soon one digest for
+    `run_date` (today by default), NOTES_REMINDER_BATCH_SIZE owners at a
+    time. Stops starting batches once `window` seconds have passed; running
+    it again the same day carries on from the checkpoint, and once the run
+    is completed it does nothing.
+    '''
+    run_date = run_date or datetime.datetime.utcnow().date()
+    run, _ = ReminderRun.objects.get_or_create(run_date=run_date)
+    if run.status == ReminderRun.STATUS_COMPLETED:
+        return run
+
+    deadline = time.monotonic() + window if window else None
+    digests = owner_digests(due_notes(run_date, run.last_owner_id).iterator(chunk_size=2000))
+    size = batch_size()
+    while True:
+        batch = list(itertools.islice(digests, size))
+        if not batch:
+            break
+        send_now(commit_batch(run, batch, render_digests(batch, run_date)))
+        if deadline is not None and time.monotonic() >= deadline:
+            return run
+
+    ReminderRun.objects.filter(pk=run.pk).update(status=ReminderRun.STATUS_COMPLETED, finished_at=timezone.now())
+    run.refresh_from_db()
+    return run
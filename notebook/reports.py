@@ -0,0 +1,256 @@
+import datetime
+import functools
+import hashlib
+import io
+import multiprocessing
+import os
+import shutil
+import socket
+import time
+from pathlib import Path
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+from django.template.loader import get_template
+from django.utils import timezone
+from OnlineNotesAPI import renderers
+from . import pdf_engine
+from .caching import NotesVersionDataClass
+from .models import NoteReport
+from .pdf_cache import pdf_cache
+from .services import generate_user_notes, owner_notes
+
+REPORT_TEMPLATE = 'app/pdf_template.html'
+
+# Progress recorded as a report moves through its stages
+PROGRESS_CLAIMED = 5
+PROGRESS_NOTES_LOADED = 20
+PROGRESS_RENDERED = 90
+PROGRESS_DONE = 100
+
+
+def report_path(report: NoteReport) -> Path:
+    return Path(getattr(settings, 'NOTES_REPORT_DIR', 'reports')) / f'{report.id}.pdf'
+
+
+@functools.lru_cache(maxsize=None)
+def template_version(template_src: str) -> str:
+    '''
+    Hash of the template source, so editing the template invalidates every
+    cached report rendered from it.
+    '''
+    return hashlib.sha256(get_template(template_src).template.source.encode()).hexdigest()[:16]
+
+
+def report_engine() -> str:
+    return getattr(settings, 'NOTES_PDF_ENGINE', 'xhtml2pdf')
+
+
+def render_report_pdf(context: dict) -> bytes:
+    '''
+    Render a notes report with the NOTES_PDF_ENGINE engine: 'xhtml2pdf'
+    lays out REPORT_TEMPLATE, 'reportlab' draws the same report directly.
+    '''
+    engine = report_engine()
+    if engine == 'reportlab':
+        return pdf_engine.render_notes_pdf(context)
+    if engine == 'xhtml2pdf':
+        return renderers.render_pdf_bytes(REPORT_TEMPLATE, context)
+    raise ValueError(f'Unknown PDF engine {engine!r}.')
+
+
+def report_key(owner_id: int, user) -> str:
+    '''
+    Cache key of an owner's report: everything the PDF is rendered from.
+    The run date printed on a cached report is when it was rendered.
+    '''
+    notes_version = NotesVersionDataClass.for_owner(owner_id)
+    return pdf_cache.key(
+        owner_id, notes_version.owner_created_at.isoformat(), notes_version.version,
+        user.first_name, user.last_name, report_engine(), REPORT_TEMPLATE, template_version(REPORT_TEMPLATE),
+        getattr(settings, 'NOTES_PDF_RENDER_MODE', 'single'), getattr(settings, 'NOTES_PDF_CHUNK_SIZE', 250))
+
+
+def report_pdf(owner_id: int, user, key: str = None):
+    '''
+    An owner's PDF report as an open binary file, from the cache or freshly
+    rendered and cached.
+    '''
+    key = key or report_key(owner_id, user)
+    cached = pdf_cache.open(key)
+    if cached is not None:
+        return cached
+
+    pdf = render_report_pdf(generate_user_notes(user.email)[0])
+    pdf_cache.put(key, pdf)
+    return io.BytesIO(pdf)
+
+
+def max_attempts() -> int:
+    return getattr(settings, 'NOTES_REPORT_MAX_ATTEMPTS', 3)
+
+
+def retry_delay(attempts: int) -> datetime.timedelta:
+    '''
+    Wait before rendering again a report that has failed `attempts` times:
+    NOTES_REPORT_RETRY_DELAY seconds, doubled per failure up to
+    NOTES_REPORT_MAX_RETRY_DELAY.
+    '''
+    base = getattr(settings, 'NOTES_REPORT_RETRY_DELAY', 30)
+    ceiling = getattr(settings, 'NOTES_REPORT_MAX_RETRY_DELAY', 600)
+    return datetime.timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), ceiling))
+
+
+def request_report(owner_id: int) -> tuple:
+    '''
+    Queue a report for the owner, or return the one already queued or
+    running, so repeated clicks don't pile up work. Returns (report, created).
+    '''
+    pending = NoteReport.objects.filter(
+        owner_id=owner_id, status__in=[NoteReport.STATUS_QUEUED, NoteReport.STATUS_RUNNING]
+    ).order_by('-id').first()
+    if pending is not None:
+        return pending, False
+    return NoteReport.objects.create(owner_id=owner_id), True
+
+
+def worker_name() -> str:
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def claim_next(worker: str):
+    '''
+    Claim the oldest queued report that is due; failed ones wait out their
+    retry delay. The claim is a conditional UPDATE, so concurrent workers
+    never render the same report, on any database.
+    '''
+    candidates = NoteReport.objects.filter(
+        status=NoteReport.STATUS_QUEUED, next_attempt_at__lte=timezone.now()
+    ).order_by('created_at', 'id').values_list('id', flat=True)[:10]
+    for report_id in candidates:
+        claimed = NoteReport.objects.filter(pk=report_id, status=NoteReport.STATUS_QUEUED).update(
+            status=NoteReport.STATUS_RUNNING, worker=worker, progress=PROGRESS_CLAIMED,
+            attempts=F('attempts') + 1, started_at=timezone.now())
+        if claimed:
+            return NoteReport.objects.get(pk=report_id)
+    return None
+
+
+def set_progress(report: NoteReport, progress: int, **fields) -> None:
+    report.progress = progress
+    for name, value in fields.items():
+        setattr(report, name, value)
+    NoteReport.objects.filter(pk=report.pk).update(progress=progress, **fields)
+
+
+def render_report(report: NoteReport) -> None:
+    '''
+    Render the report, or copy a cached one, to report_path(). The file is written
+    under a temporary name and renamed, so a finished report is never seen
+    half written. Failures requeue the report, to be retried after
+    retry_delay(), until it runs out of attempts.
+    '''
+    try:
+        user = report.owner.user
+        key = report_key(report.owner_id, user)
+        set_progress(report, PROGRESS_NOTES_LOADED, notes_count=owner_notes(report.owner_id).count())
+
+        path = report_path(report)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_suffix('.part')
+        with report_pdf(report.owner_id, user, key) as pdf, open(partial, 'wb') as destination:
+            set_progress(report, PROGRESS_RENDERED)
+            shutil.copyfileobj(pdf, destination)
+        os.replace(partial, path)
+    except Exception as e:
+        retry = report.attempts < max_attempts()
+        set_progress(report, 0, last_error=str(e) or e.__class__.__name__, worker='',
+                     status=NoteReport.STATUS_QUEUED if retry else NoteReport.STATUS_FAILED,
+                     next_attempt_at=timezone.now() + retry_delay(report.attempts),
+                     finished_at=None if retry else timezone.now())
+        return
+
+    set_progress(report, PROGRESS_DONE, status=NoteReport.STATUS_COMPLETED, file_size=path.stat().st_size,
+                 last_error='', finished_at=timezone.now())
+
+
+def process_next(worker: str = None) -> bool:
+    '''
+    Render one queued report. Returns False when the queue is empty.
+    '''
+    report = claim_next(worker or worker_name())
+    if report is None:
+        return False
+    render_report(report)
+    return True
+
+
+def requeue_stale() -> int:
+    '''
+    Put back reports whose worker stopped without finishing them (killed,
+    restarted) after NOTES_REPORT_STALE_AFTER seconds, or fail them once
+    they have used up their attempts.
+    '''
+    cutoff = timezone.now() - datetime.timedelta(
+        seconds=getattr(settings, 'NOTES_REPORT_STALE_AFTER', 900))
+    stale = NoteReport.objects.filter(status=NoteReport.STATUS_RUNNING, started_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=max_attempts()).update(
+        status=NoteReport.STATUS_FAILED, worker='', finished_at=timezone.now(),
+        last_error='The worker stopped before finishing the report.')
+    return failed + stale.update(status=NoteReport.STATUS_QUEUED, worker='', progress=0)
+
+
+def purge_expired() -> int:
+    '''
+    Delete report files older than NOTES_REPORT_RETENTION seconds.
+    '''
+    cutoff = timezone.now() - datetime.timedelta(
+        seconds=getattr(settings, 'NOTES_REPORT_RETENTION', 86400))
+    expired = list(NoteReport.objects.filter(
+        status=NoteReport.STATUS_COMPLETED, finished_at__lt=cutoff))
+    for report in expired:
+        report_path(report).unlink(missing_ok=True)
+    return NoteReport.objects.filter(pk__in=[report.id for report in expired]).update(
+        status=NoteReport.STATUS_EXPIRED)
+
+
+def work(poll_interval: float = 1.0, burst: bool = False) -> int:
+    '''
+    Worker loop: render queued reports one at a time, doing housekeeping and
+    sleeping `poll_interval` seconds whenever the queue is empty. With
+    `burst`, return once the queue is empty. Returns the reports rendered.
+    '''
+    worker = worker_name()
+    rendered = 0
+    while True:
+        if process_next(worker):
+            rendered += 1
+            continue
+        requeue_stale()
+        purge_expired()
+        if burst:
+            return rendered
+        time.sleep(poll_interval)
+
+
+def run_workers(processes: int, poll_interval: float = 1.0, burst: bool = False) -> None:
+    '''
+    Run a pool of `processes` worker processes until they exit (burst) or
+    the pool is interrupted. Rendering is CPU bound, so the pool size bounds
+    how many reports render at once.
+    '''
+    # Children must not share the parent's database connections
+    connections.close_all()
+    # Not daemonic, so parallel rendering can start its own process pool
+    pool = [multiprocessing.Process(target=work, args=(poll_interval, burst))
+            for _ in range(processes)]
+    for process in pool:
+        process.start()
+    try:
+        for process in pool:
+            process.join()
+    finally:
+        for process in pool:
+            if process.is_alive():
+                process.terminate()
+                process.join()
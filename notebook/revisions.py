@@ -0,0 +1,297 @@
+import datetime
+import itertools
+import json
+import re
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .models import Note, NoteRevision
+
+# Content is diffed as runs of whitespace and non-whitespace, so deltas
+# follow word edits and joining the tokens gives back the exact text
+TOKEN_RE = re.compile(r'\s+|\S+')
+
+# Token insertions plus deletions beyond which diff() stops looking for a
+# minimal edit; a delta that big is rarely smaller than a snapshot
+MAX_DIFF_EDITS = 400
+
+
+def snapshot_every() -> int:
+    return getattr(settings, 'NOTES_REVISION_SNAPSHOT_EVERY', 10)
+
+
+def revision_limit() -> int:
+    return getattr(settings, 'NOTES_REVISION_LIMIT', 50)
+
+
+def tokens(text: str) -> list:
+    return TOKEN_RE.findall(text)
+
+
+def shortest_edit(a: list, b: list, max_edits: int):
+    '''
+    Myers' O(ND) diff: the tokens of `a` and `b` as a list of ('=', token),
+    ('-', token) and ('+', token) steps with the fewest insertions and
+    deletions, or None when that takes more than `max_edits`. The cost
+    grows with the size of the edit rather than with the texts.
+    '''
+    n, m = len(a), len(b)
+    furthest = {1: 0}
+    trace = []
+    for d in range(max_edits + 1):
+        trace.append(dict(furthest))
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and furthest[k - 1] < furthest[k + 1]):
+                x = furthest[k + 1]
+            else:
+                x = furthest[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            furthest[k] = x
+            if x >= n and y >= m:
+                return backtrack(trace, a, b)
+    return None
+
+
+def backtrack(trace: list, a: list, b: list) -> list:
+    steps = []
+    x, y = len(a), len(b)
+    for d in range(len(trace) - 1, -1, -1):
+        furthest = trace[d]
+        k = x - y
+        if k == -d or (k != d and furthest[k - 1] < furthest[k + 1]):
+            previous_k = k + 1
+        else:
+            previous_k = k - 1
+        previous_x = furthest[previous_k]
+        previous_y = previous_x - previous_k
+        while x > previous_x and y > previous_y:
+            x -= 1
+            y -= 1
+            steps.append(('=', a[x]))
+        if d > 0:
+            steps.append(('+', b[previous_y]) if x == previous_x else ('-', a[previous_x]))
+        x, y = previous_x, previous_y
+    steps.reverse()
+    return steps
+
+
+def diff(source: str, target: str) -> list:
+    '''
+    Operations turning `source` into `target`, over tokens(): a positive
+    number copies that many tokens, a negative one skips them and a string
+    is inserted. The common prefix and suffix are trimmed first; an edit of
+    more than MAX_DIFF_EDITS tokens replaces the rest whole.
+    '''
+    a, b = tokens(source), tokens(target)
+    prefix = 0
+    while prefix < min(len(a), len(b)) and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < min(len(a), len(b)) - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    middle_a, middle_b = a[prefix:len(a) - suffix], b[prefix:len(b) - suffix]
+
+    steps = shortest_edit(middle_a, middle_b, MAX_DIFF_EDITS)
+    if steps is None:
+        steps = [('-', token) for token in middle_a] + [('+', token) for token in middle_b]
+    steps = [('=', None)] * prefix + steps + [('=', None)] * suffix
+
+    ops = []
+    for kind, run in itertools.groupby(steps, key=lambda step: step[0]):
+        if kind == '+':
+            ops.append(''.join(token for _, token in run))
+        else:
+            count = sum(1 for _ in run)
+            ops.append(count if kind == '=' else -count)
+    return ops
+
+
+def patch(source: str, ops: list) -> str:
+    a = tokens(source)
+    result = []
+    position = 0
+    for op in ops:
+        if isinstance(op, str):
+            result.append(op)
+        elif op > 0:
+            result.extend(a[position:position + op])
+            position += op
+        else:
+            position -= op
+    return ''.join(result)
+
+
+def encode_state(state: dict) -> dict:
+    '''
+    A note's REVISION_FIELDS as JSON values.
+    '''
+    encoded = {name: state[name] for name in Note.REVISION_FIELDS}
+    if encoded['due_date'] is not None:
+        encoded['due_date'] = encoded['due_date'].isoformat()
+    return encoded
+
+
+def reverse_delta(newer: dict, older: dict) -> dict:
+    '''
+    What turns the encoded `newer` version into `older`: the other fields
+    as they were, and content as diff() operations.
+    '''
+    delta = {name: older[name] for name in Note.REVISION_FIELDS
+             if name != 'content' and older[name] != newer[name]}
+    if older['content'] != newer['content']:
+        delta['content'] = diff(newer['content'], older['content'])
+    return delta
+
+
+def apply_delta(newer: dict, delta: dict) -> dict:
+    older = {**newer, **delta}
+    if 'content' in delta:
+        older['content'] = patch(newer['content'], delta['content'])
+    return older
+
+
+def json_size(data) -> int:
+    return len(json.dumps(data, separators=(',', ':')).encode())
+
+
+def build_revision(note: Note, number: int, older: dict, newer: dict) -> NoteRevision:
+    '''
+    The revision keeping `older`, replaced by `newer`. Every
+    NOTES_REVISION_SNAPSHOT_EVERY-th revision is a full snapshot, and so is
+    any revision whose delta wouldn't be smaller than one.
+    '''
+    snapshot = encode_state(older)
+    data, is_snapshot = snapshot, True
+    if number % snapshot_every():
+        delta = reverse_delta(encode_state(newer), snapshot)
+        if json_size(delta) < json_size(snapshot):
+            data, is_snapshot = delta, False
+    return NoteRevision(note_id=note.pk, number=number, is_snapshot=is_snapshot, data=data,
+                        size=json_size(data), saved_at=older.get('updated_at'))
+
+
+def lock_replaced_states(notes) -> None:
+    '''
+    Read the rows the notes' saves are about to replace with SELECT ... FOR
+    UPDATE, inside the save's transaction, and keep them as the notes'
+    `_replaced_state` for record_revisions() and the stats counters. Notes
+    whose row is gone get none. Reading the row rather than trusting the
+    instance keeps history and counters right when an instance is stale,
+    and the lock makes concurrent writes of a note take turns.
+    '''
+    notes = {note.pk: note for note in notes}
+    if not notes:
+        return
+    rows = Note.objects.select_for_update().filter(pk__in=list(notes)).values(
+        'id', *Note.REVISION_FIELDS, 'updated_at')
+    for row in rows:
+        notes[row.pop('id')]._replaced_state = row
+
+
+def latest_numbers(note_ids: list) -> dict:
+    '''
+    The latest revision number of each note. Their rows are locked by
+    lock_replaced_states(), so no other save can add one meanwhile; the
+    read locks too, so it sees revisions committed after this transaction
+    began (under MySQL's repeatable read, a plain read would not).
+    '''
+    latest = {}
+    for note_id, number in NoteRevision.objects.select_for_update().filter(
+            note_id__in=note_ids).values_list('note_id', 'number'):
+        latest[note_id] = max(number, latest.get(note_id, 0))
+    return latest
+
+
+def record_revisions(notes) -> list:
+    '''
+    Keep the versions the notes' saves replaced, as read by
+    lock_replaced_states(), for notes whose revision fields changed, with
+    one query for the latest revision numbers and one insert. Runs inside
+    the save's transaction. Revisions beyond the newest
+    NOTES_REVISION_LIMIT are deleted.
+    '''
+    changed = []
+    for note in notes:
+        older = getattr(note, '_replaced_state', None)
+        if older is None:
+            continue
+        # Deferred fields weren't saved, so they are unchanged
+        newer = {**older, **note.revision_state()}
+        if any(older[name] != newer[name] for name in Note.REVISION_FIELDS):
+            changed.append((note, older, newer))
+    if not changed:
+        return []
+
+    latest = latest_numbers([note.pk for note, _, _ in changed])
+    revisions = NoteRevision.objects.bulk_create([
+        build_revision(note, latest.get(note.pk, 0) + 1, older, newer) for note, older, newer in changed])
+
+    limit = revision_limit()
+    expired = Q()
+    for revision in revisions:
+        if revision.number > limit:
+            expired |= Q(note_id=revision.note_id, number__lte=revision.number - limit)
+    if expired:
+        NoteRevision.objects.filter(expired).delete()
+    return revisions
+
+
+def rebuild(note: Note, number: int) -> NoteRevision:
+    '''
+    Revision `number` of the note with its full state in `data`: the
+    nearest snapshot at or after it, or the note's current row, with the
+    reverse deltas in between applied. Raises NoteRevision.DoesNotExist.
+    '''
+    newer = NoteRevision.objects.filter(note=note).order_by('number')
+    chain = list(newer.filter(number__gte=number)[:snapshot_every()])
+    if not chain or chain[0].number != number:
+        raise NoteRevision.DoesNotExist(f'Note {note.pk} has no revision {number}.')
+
+    # A snapshot is normally within NOTES_REVISION_SNAPSHOT_EVERY revisions,
+    # unless the setting was raised since they were recorded
+    state = None
+    while state is None:
+        snapshots = [index for index, revision in enumerate(chain) if revision.is_snapshot]
+        if snapshots:
+            chain = chain[:snapshots[0] + 1]
+            state = chain[-1].data
+            break
+        more = list(newer.filter(number__gt=chain[-1].number)[:snapshot_every()])
+        if not more:
+            # The row, not the instance, which may be stale
+            state = encode_state(Note.objects.filter(pk=note.pk).values(*Note.REVISION_FIELDS).get())
+        chain.extend(more)
+
+    for revision in reversed(chain):
+        if not revision.is_snapshot:
+            state = apply_delta(state, revision.data)
+
+    revision = chain[0]
+    revision.data = state
+    return revision
+
+
+def restore_data(note: Note, revision: NoteRevision) -> dict:
+    '''
+    A rebuilt revision as note update data. Generated slugs are kept out,
+    since only the current one may be saved again, and the note keeps its
+    current slug instead.
+    '''
+    data = dict(revision.data)
+    separator = Note._meta.get_field('slug').separator
+    if separator in data['slug'] and data['slug'] != note.slug:
+        del data['slug']
+    return data
+
+
+def purge_expired() -> int:
+    '''
+    Delete revisions replaced more than NOTES_REVISION_RETENTION days ago.
+    Newer revisions never depend on older ones, so this is a plain delete.
+    '''
+    cutoff = timezone.now() - datetime.timedelta(days=getattr(settings, 'NOTES_REVISION_RETENTION', 365))
+    deleted, _ = NoteRevision.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,305 @@
+import collections
+import functools
+import html
+import math
+import re
+from django.conf import settings
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+from .models import Note, NoteSearchTerm
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_TOKEN_LENGTH = 64
+# Query terms beyond this are ignored, which bounds the cost of one search
+MAX_QUERY_TOKENS = 16
+# A title match counts as much as this many content matches
+TITLE_WEIGHT = 10
+
+SQLITE_FTS_TABLE = 'notebook_note_fts'
+
+SQLITE_FTS_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS notebook_note_fts USING fts5("
+    "title, content, owner_id UNINDEXED, content='notebook_note', content_rowid='id')"
+)
+
+SQLITE_FTS_TRIGGERS = {
+    'notebook_note_fts_ai': (
+        "CREATE TRIGGER IF NOT EXISTS notebook_note_fts_ai AFTER INSERT ON notebook_note BEGIN "
+        "INSERT INTO notebook_note_fts(rowid, title, content, owner_id) "
+        "VALUES (new.id, new.title, new.content, new.owner_id); END"
+    ),
+    'notebook_note_fts_ad': (
+        "CREATE TRIGGER IF NOT EXISTS notebook_note_fts_ad AFTER DELETE ON notebook_note BEGIN "
+        "INSERT INTO notebook_note_fts(notebook_note_fts, rowid, title, content, owner_id) "
+        "VALUES ('delete', old.id, old.title, old.content, old.owner_id); END"
+    ),
+    'notebook_note_fts_au': (
+        "CREATE TRIGGER IF NOT EXISTS notebook_note_fts_au "
+        "AFTER UPDATE OF title, content, owner_id ON notebook_note BEGIN "
+        "INSERT INTO notebook_note_fts(notebook_note_fts, rowid, title, content, owner_id) "
+        "VALUES ('delete', old.id, old.title, old.content, old.owner_id); "
+        "INSERT INTO notebook_note_fts(rowid, title, content, owner_id) "
+        "VALUES (new.id, new.title, new.content, new.owner_id); END"
+    ),
+}
+
+
+def tokenize(text: str) -> list:
+    '''
+    Split text into lowercase word tokens. The same rules are used to index
+    notes, parse queries and highlight matches.
+    '''
+    return [token[:MAX_TOKEN_LENGTH] for token in TOKEN_RE.findall(text.lower())]
+
+
+def query_tokens(query: str) -> list:
+    '''
+    Distinct tokens of a search query, in the order they were typed.
+    '''
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TOKENS]
+
+
+class SQLiteFTSBackend:
+    '''
+    Ranks with SQLite FTS5 and bm25(). The FTS table indexes notebook_note as
+    external content and is kept current by triggers, so writes from any path
+    (ORM, bulk, raw SQL) are indexed in the same transaction.
+    '''
+    name = 'sqlite_fts'
+
+    def rank(self, owner_id: int, tokens: list, limit: int, offset: int) -> list:
+        # Every token quoted, so user input is never parsed as FTS syntax;
+        # adjacent strings are AND-ed
+        match = ' '.join(f'"{token}"' for token in tokens)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, -bm25({SQLITE_FTS_TABLE}, %s, 1.0) AS score '
+                f'FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s AND owner_id = %s '
+                'ORDER BY score DESC, rowid LIMIT %s OFFSET %s',
+                [float(TITLE_WEIGHT), match, owner_id, limit, offset])
+            return cursor.fetchall()
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')")
+
+
+class MySQLFulltextBackend:
+    '''
+    Ranks with the FULLTEXT index on (title, content) added by migration
+    0014, which MySQL maintains itself.
+    '''
+    name = 'mysql_fulltext'
+
+    def rank(self, owner_id: int, tokens: list, limit: int, offset: int) -> list:
+        against = ' '.join(f'+{token}' for token in tokens)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT id, MATCH(title, content) AGAINST (%s IN BOOLEAN MODE) AS score '
+                'FROM notebook_note WHERE owner_id = %s '
+                'AND MATCH(title, content) AGAINST (%s IN BOOLEAN MODE) '
+                'ORDER BY score DESC, id LIMIT %s OFFSET %s',
+                [against, owner_id, against, limit, offset])
+            return cursor.fetchall()
+
+    def rebuild(self):
+        pass
+
+
+class TableBackend:
+    '''
+    Portable fallback over the NoteSearchTerm inverted index. Scores are
+    TF-IDF within the owner's notes; every query token must match.
+    '''
+    name = 'table'
+
+    def rank(self, owner_id: int, tokens: list, limit: int, offset: int) -> list:
+        terms = NoteSearchTerm.objects.filter(owner_id=owner_id, token__in=tokens)
+
+        document_frequency = dict(
+            terms.values_list('token').annotate(notes=Count('note_id', distinct=True)))
+        if len(document_frequency) < len(tokens):
+            return []
+
+        total = Note.objects.filter(owner_id=owner_id).count()
+        idf = Case(*[When(token=token, then=Value(math.log(1 + total / notes)))
+                     for token, notes in document_frequency.items()],
+                   output_field=FloatField())
+
+        ranked = (terms.values('note_id')
+                  .annotate(matched=Count('token'),
+                            score=Sum(F('frequency') * idf, output_field=FloatField()))
+                  .filter(matched=len(tokens))
+                  .order_by('-score', 'note_id'))
+        return list(ranked.values_list('note_id', 'score')[offset:offset + limit])
+
+    def rebuild(self):
+        with transaction.atomic():
+            NoteSearchTerm.objects.all().delete()
+            rows = []
+            notes = Note.objects.only('id', 'owner_id', 'title', 'content')
+            for note in notes.iterator(chunk_size=2000):
+                rows += term_rows(note)
+                if len(rows) >= 5000:
+                    NoteSearchTerm.objects.bulk_create(rows)
+                    rows = []
+            NoteSearchTerm.objects.bulk_create(rows)
+
+
+BACKENDS = {backend.name: backend for backend in (
+    SQLiteFTSBackend, MySQLFulltextBackend, TableBackend)}
+
+
+@functools.lru_cache(maxsize=None)
+def _detect_backend(vendor: str) -> str:
+    if vendor == 'mysql':
+        return MySQLFulltextBackend.name
+    if vendor == 'sqlite' and SQLITE_FTS_TABLE in connection.introspection.table_names():
+        return SQLiteFTSBackend.name
+    return TableBackend.name
+
+
+def get_backend():
+    '''
+    The backend named by NOTES_SEARCH_BACKEND; 'auto' picks the database's
+    native full-text index when there is one.
+    '''
+    name = getattr(settings, 'NOTES_SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        name = _detect_backend(connection.vendor)
+    return BACKENDS[name]()
+
+
+def term_rows(note) -> list:
+    '''
+    NoteSearchTerm rows for a note. Title occurrences count TITLE_WEIGHT times.
+    '''
+    frequency = collections.Counter(tokenize(note.content))
+    for token in tokenize(note.title):
+        frequency[token] += TITLE_WEIGHT
+
+    return [NoteSearchTerm(owner_id=note.owner_id, note_id=note.id, token=token, frequency=count)
+            for token, count in frequency.items()]
+
+
+def index_notes(notes) -> None:
+    '''
+    Replace the notes' rows in the fallback index. Native backends index
+    themselves, so this is a no-op for them.
+    '''
+    if not notes or get_backend().name != TableBackend.name:
+        return
+
+    with transaction.atomic():
+        NoteSearchTerm.objects.filter(note_id__in=[note.id for note in notes]).delete()
+        NoteSearchTerm.objects.bulk_create(
+            [row for note in notes for row in term_rows(note)], batch_size=5000)
+
+
+def ensure_sqlite_fts(using: str = 'default') -> bool:
+    '''
+    Install the FTS5 table and its triggers on SQLite, rebuilding the index
+    when anything was missing. SQLite drops triggers whenever a migration
+    rebuilds the notebook_note table, so this runs after every migrate.
+    Returns True when the index was (re)built.
+    '''
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return False
+
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s)" % ', '.join(
+                ['%s'] * (len(SQLITE_FTS_TRIGGERS) + 2)),
+            ['notebook_note', SQLITE_FTS_TABLE, *SQLITE_FTS_TRIGGERS])
+        existing = {name for name, in cursor.fetchall()}
+
+        if 'notebook_note' not in existing:
+            return False
+        if existing >= {SQLITE_FTS_TABLE, *SQLITE_FTS_TRIGGERS}:
+            return False
+
+        try:
+            with transaction.atomic(using=using):
+                cursor.execute(SQLITE_FTS_CREATE)
+                for statement in SQLITE_FTS_TRIGGERS.values():
+                    cursor.execute(statement)
+                cursor.execute(
+                    f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')")
+        except OperationalError:
+            # SQLite built without FTS5: searches use the NoteSearchTerm table
+            return False
+
+    _detect_backend.cache_clear()
+    return True
+
+
+def highlight(text: str, tokens: list) -> str:
+    '''
+    HTML-escape text and wrap every word matching a query token in <mark>.
+    '''
+    wanted = set(tokens)
+    pieces = []
+    position = 0
+    for match in TOKEN_RE.finditer(text):
+        if match.group().lower()[:MAX_TOKEN_LENGTH] in wanted:
+            pieces.append(html.escape(text[position:match.start()]))
+            pieces.append(f'<mark>{html.escape(match.group())}</mark>')
+            position = match.end()
+    pieces.append(html.escape(text[position:]))
+    return ''.join(pieces)
+
+
+def snippet(text: str, tokens: list, width: int = 160) -> str:
+    '''
+    A highlighted excerpt of about `width` characters around the first match.
+    '''
+    wanted = set(tokens)
+    start = 0
+    for match in TOKEN_RE.finditer(text):
+        if match.group().lower()[:MAX_TOKEN_LENGTH] in wanted:
+            start = max(0, match.start() - width // 3)
+            break
+
+    # Don't cut words in half at either edge
+    if start:
+        space = text.rfind(' ', 0, start)
+        start = space + 1 if space != -1 else 0
+    end = start + width
+    if end < len(text):
+        space = text.rfind(' ', start, end)
+        end = space if space > start else end
+
+    excerpt = highlight(text[start:end], tokens)
+    return f"{'…' if start else ''}{excerpt}{'…' if end < len(text) else ''}"
+
+
+def search_notes(owner_id: int, query: str, limit: int, offset: int = 0) -> list:
+    '''
+    Rank the owner's notes for a query and return one page of results with
+    highlighted title and content excerpt. Costs one ranking query and one
+    primary key lookup for the page.
+    '''
+    tokens = query_tokens(query)
+    if not tokens:
+        return []
+
+    ranked = get_backend().rank(owner_id, tokens, limit, offset)
+    rows = Note.objects.filter(owner_id=owner_id, pk__in=[note_id for note_id, _ in ranked]).values(
+        'id', 'title', 'slug', 'content', 'due_date', 'priority', 'status', 'category')
+    rows = {row['id']: row for row in rows}
+
+    results = []
+    for note_id, score in ranked:
+        row = rows.get(note_id)
+        if row is None:
+            continue
+        content = row.pop('content')
+        row['score'] = float(score)
+        row['highlight'] = {
+            'title': highlight(row['title'], tokens),
+            'content': snippet(content, tokens),
+        }
+        results.append(row)
+    return results
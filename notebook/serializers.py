@@ -1,12 +1,206 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
-from notebook.models import Note
+from rest_framework.settings import api_settings
+from rest_framework.validators import UniqueValidator
+from notebook.models import Note, NoteImport, NoteReport, NoteRevision
 
 
 class NoteSerializer(serializers.ModelSerializer):
     '''
-    This class is responsible for the serialization and deserialization of note objects
+    This class is responsible for the serialization and deserialization of note objects.
+    Pass `fields` to emit only a subset of the schema (sparse fieldsets).
     '''
+    fields_query_param = 'fields'
+
     class Meta:
         model = Note
         fields = ['id', 'title', 'slug', 'owner', 'content',
                   'created_at', 'due_date', 'priority', 'status', 'category']
+        # The owner always comes from the authenticated principal
+        read_only_fields = ['owner']
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+    def validate_slug(self, value):
+        '''
+        Slugs are optional and generated from the title when left out. The
+        "--" separator of generated slugs is reserved, except for keeping a
+        note's current slug.
+        '''
+        separator = Note._meta.get_field('slug').separator
+        if separator in value and not (self.instance is not None and value == self.instance.slug):
+            raise serializers.ValidationError(
+                f'"{separator}" is reserved for generated slugs.')
+        return value
+
+    @classmethod
+    def get_requested_fields(cls, query_params):
+        '''
+        Parse the comma separated `fields` parameter, returning None when it is
+        absent. The names double as model fields for a matching .only() projection.
+        '''
+        raw_fields = query_params.get(cls.fields_query_param)
+        if not raw_fields:
+            return None
+
+        requested = {name.strip() for name in raw_fields.split(',') if name.strip()}
+        unknown = requested - set(cls.Meta.fields)
+        if unknown:
+            raise serializers.ValidationError(
+                {cls.fields_query_param: f"Unknown fields: {', '.join(sorted(unknown))}"})
+
+        return [name for name in cls.Meta.fields if name in requested]
+
+
+class NoteImportSerializer(serializers.ModelSerializer):
+    '''
+    Progress and outcome of a notes file import.
+    '''
+
+    class Meta:
+        model = NoteImport
+        fields = ['id', 'format', 'source_name', 'status', 'batch_size', 'rows_read',
+                  'rows_imported', 'rows_failed', 'last_error', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
+class NoteReportSerializer(serializers.ModelSerializer):
+    '''
+    Progress and outcome of a PDF report job.
+    '''
+
+    class Meta:
+        model = NoteReport
+        fields = ['id', 'status', 'progress', 'notes_count', 'file_size', 'attempts',
+                  'next_attempt_at', 'last_error', 'created_at', 'started_at', 'finished_at']
+        read_only_fields = fields
+
+
+class NoteRevisionSerializer(serializers.ModelSerializer):
+    '''
+    A stored revision of a note; `size` is the bytes it takes.
+    '''
+
+    class Meta:
+        model = NoteRevision
+        fields = ['number', 'is_snapshot', 'size', 'saved_at', 'created_at']
+        read_only_fields = fields
+
+
+class NoteBulkListSerializer(serializers.ListSerializer):
+    '''
+    `many=True` validation for batch writes that carries on past invalid
+    items. After `is_valid()`, `item_errors` lines up with the input (None for
+    valid items). Pass a list of notes as `instance` to validate updates,
+    one note per item.
+
+    Slug uniqueness is not checked per item; callers check the whole batch
+    with one query instead.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        slug_field = self.child.fields['slug']
+        slug_field.validators = [validator for validator in slug_field.validators
+                                 if not isinstance(validator, UniqueValidator)]
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: ['Expected a list of items.']})
+
+        self.item_errors = []
+        validated = []
+        for index, item in enumerate(data):
+            self.child.instance = self.instance[index] if self.instance is not None else None
+            try:
+                validated.append(self.child.run_validation(item))
+                self.item_errors.append(None)
+            except serializers.ValidationError as exc:
+                validated.append(None)
+                self.item_errors.append(exc.detail)
+        self.child.instance = None
+        return validated
+
+
+class NoteRowSerializer:
+    '''
+    Read-only fast path producing exactly NoteSerializer's output from
+    `values()` rows, skipping model instantiation and the serializer field
+    machinery. Use `project()` to select the matching columns.
+    '''
+    columns = {
+        'id': 'id',
+        'title': 'title',
+        'slug': 'slug',
+        'owner': 'owner_id',
+        'content': 'content',
+        'created_at': 'created_at',
+        'due_date': 'due_date',
+        'priority': 'priority',
+        'status': 'status',
+        'category': 'category',
+        'updated_at': 'updated_at',
+    }
+
+    def __init__(self, fields=None):
+        self.fields = fields or NoteSerializer.Meta.fields
+
+    def project(self, queryset):
+        return queryset.values(*[self.columns[name] for name in self.fields])
+
+    def to_representation(self, row: dict) -> dict:
+        return self.to_representation_many([row])[0]
+
+    def to_representation_many(self, rows) -> list:
+        # Same rules as DRF's DateTimeField/DateField with ISO 8601 output
+        current_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+
+        def format_datetime(value):
+            if value is None:
+                return None
+            if current_timezone is not None and timezone.is_aware(value):
+                value = value.astimezone(current_timezone)
+            value = value.isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+        def format_date(value):
+            return None if value is None else value.isoformat()
+
+        formatters = {'created_at': format_datetime, 'updated_at': format_datetime, 'due_date': format_date}
+        plan = [(name, self.columns[name], formatters.get(name)) for name in self.fields]
+
+        return [
+            {name: (formatter(row[column]) if formatter else row[column])
+             for name, column, formatter in plan}
+            for row in rows
+        ]
+
+
+def project_notes(queryset, fields=None, fast: bool = False):
+    '''
+    Narrow the columns read for a read path: `values()` rows for the fast
+    path, an `.only()` projection of model instances otherwise.
+    '''
+    if fast:
+        return NoteRowSerializer(fields).project(queryset)
+    return queryset.only(*fields) if fields else queryset
+
+
+def serialize_notes(notes, fields=None, fast: bool = False, many: bool = True):
+    '''
+    Serialize notes loaded through `project_notes` with the matching serializer.
+    '''
+    if fast:
+        row_serializer = NoteRowSerializer(fields)
+        if many:
+            return row_serializer.to_representation_many(notes)
+        return row_serializer.to_representation(notes)
+    return NoteSerializer(notes, many=many, fields=fields).data
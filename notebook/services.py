@@ -1,10 +1,78 @@
 from datetime import datetime
+from django.db.models import F
 from django.shortcuts import render
+from django.utils import timezone
 from core.models import User
-from notebook.models import Note
-from rest_framework.response import Response
-from rest_framework import status
-from django.db.models import Q
+from notebook.models import Note, Owner
+
+
+def provision_owner(user_id: int) -> Owner:
+    '''
+    Returns the notes owner for a user, creating it if it doesn't exist yet.
+    Owner.user is unique, so concurrent callers converge on the same row.
+    '''
+    owner, _ = Owner.objects.get_or_create(
+        user_id=user_id, defaults={'is_email_valid': False})
+
+    return owner
+
+
+def owner_notes(owner_id: int):
+    '''
+    Base queryset for all notes of an owner. Filters on the owner column
+    directly, so no join through the owner table is needed.
+    '''
+    return Note.objects.filter(owner_id=owner_id)
+
+
+def bump_notes_version(owner_id: int) -> None:
+    '''
+    Mark an owner's notes as changed. Runs as a single atomic UPDATE, so
+    concurrent writers never lose an increment.
+    '''
+    Owner.objects.filter(pk=owner_id).update(
+        notes_version=F('notes_version') + 1, notes_modified_at=timezone.now())
+
+
+# Choice code -> label lookup tables, built once instead of per note
+NOTE_DISPLAY_LABELS = {
+    'priority': dict(Note.PRIORITY_CHOICES),
+    'status': dict(Note.STATUS_CHOICES),
+    'category': dict(Note.CATEGORY_CHOICES),
+}
+
+NOTE_DISPLAY_COLUMNS = ('id', 'title', 'slug', 'owner_id', 'content',
+                        'created_at', 'due_date', 'priority', 'status', 'category')
+
+
+def display_note_rows(queryset, chunk_size: int = None):
+    '''
+    Yields notes in the shape of Note.get_display_info() straight from
+    `values()` rows, with choice codes replaced by their labels. Pass
+    `chunk_size` to stream from the database instead of loading all rows.
+    '''
+    rows = queryset.values(*NOTE_DISPLAY_COLUMNS)
+    if chunk_size:
+        rows = rows.iterator(chunk_size=chunk_size)
+
+    priority_labels = NOTE_DISPLAY_LABELS['priority']
+    status_labels = NOTE_DISPLAY_LABELS['status']
+    category_labels = NOTE_DISPLAY_LABELS['category']
+
+    for row in rows:
+        display_row = {
+            "id": row['id'],
+            "title": row['title'],
+            "slug": row['slug'],
+            "owner": row['owner_id'],
+            "content": row['content'],
+            "created_at": row['created_at'],
+            "due_date": row['due_date'],
+            "priority": priority_labels.get(row['priority']),
+            "status": status_labels.get(row['status']),
+            "category": category_labels.get(row['category']),
+        }
+        yield display_row
 
 
 def generate_user_notes(user_email):
@@ -15,21 +83,16 @@ def generate_user_notes(user_email):
     as well as basic user information
     '''
     user = User.objects.get(email=user_email)
-    notes = Note.objects.select_related('owner').filter(
-        owner__user_id=user.id).all().order_by('id')
-    note_list = notes[0:]
-
-    refined_notes = [note.get_display_info()
-                     for note in notes]
+    notes = Note.objects.filter(owner__user_id=user.id).order_by('id')
 
     data = {
         "user": f"{user.first_name.title()} {user.last_name.title()}",
         "created_date": datetime.utcnow(),
-        "notes": refined_notes,
+        "notes": list(display_note_rows(notes)),
         "last_login": user.last_login
     }
 
-    return (data, note_list)
+    return (data, notes)
 
 
 def show_uploader(request):
@@ -48,52 +111,3 @@ def redirect_noexist(request):
 
     context = {'detail': 'page not found.'}
     return render(request, '404.html', context)
-
-
-def order_notes(value: str, user_id: int):
-    """
-    Function that orders notes based on: 
-    * due date, 
-    * priority 
-    * created date
-    """
-    try:
-        return Note.objects.select_related('owner').filter(owner__user_id=user_id).all().order_by(value)
-    except Exception as e:
-        return Response({'detail': e.args[0:]}, status=status.HTTP_404_NOT_FOUND)
-
-
-def categorize_notes(value: str, user_id: int):
-    """
-    Function that groups notes into one of the following categories:
-    * None
-    * Blue
-    * Green
-    * Orange
-    * Purple
-    * Red
-    * Yellow
-    """
-    return Note.objects.select_related('owner').filter(owner__user_id=user_id).all().filter(category=value[0])
-
-
-def filter_by_status(value: str, user_id: int):
-    """
-    Function that filters notes based on the following status:
-    'Unfinished': Tasks yet to be completed.
-    'Overdue': All tasks (completed or not) whose due dates are more than the current date.
-    'Done': Tasks that have been completed
-    """
-
-    try:
-        notes_queryset = Note.objects.select_related(
-            'owner').filter(owner__user_id=user_id).all()
-
-        if value.title() == 'Unfinished':
-            return notes_queryset.filter(Q(status='N') | Q(status='P'))
-        elif value.title() == 'Overdue':
-            return notes_queryset.filter(due_date__lte=datetime.utcnow())
-        elif value.title() == 'Done':
-            return notes_queryset.filter(status='C')
-    except Exception as e:
-        return Response({'detail': e.args[0:]}, status=status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,119 @@
+import contextlib
+import contextvars
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+from . import autocomplete, revisions, search, stats
+from .models import Note
+from .services import bump_notes_version, provision_owner
+
+# Sent once per bulk write (see notebook.batch) with `owner_id` and the
+# `created`, `updated` and `deleted` note instances, instead of one
+# post_save/post_delete per note. Updated and deleted notes carry the rows
+# they replaced in `_replaced_state`.
+notes_bulk_changed = Signal()
+
+_bulk_writes = contextvars.ContextVar('notebook_bulk_writes', default=False)
+
+
+@contextlib.contextmanager
+def bulk_note_writes():
+    '''
+    Per-note handlers stand down inside this block (e.g. for the post_delete
+    signals of a queryset delete); the caller sends notes_bulk_changed.
+    '''
+    token = _bulk_writes.set(True)
+    try:
+        yield
+    finally:
+        _bulk_writes.reset(token)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def provision_owner_on_registration(sender, instance, created, **kwargs):
+    '''
+    Every new user gets their notes owner up front, so note endpoints never
+    have to create it lazily.
+    '''
+    if created:
+        provision_owner(instance.id)
+
+
+@receiver(pre_save, sender=Note)
+def lock_replaced_note(sender, instance, update_fields=None, **kwargs):
+    '''
+    Runs inside the save's transaction (see Note.save), so the row read here
+    stays locked until the revision of it is recorded.
+    '''
+    if _bulk_writes.get() or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(Note.REVISION_FIELDS):
+        return
+    revisions.lock_replaced_states([instance])
+
+
+@receiver(post_save, sender=Note)
+def note_saved(sender, instance, created, update_fields=None, **kwargs):
+    '''
+    Runs inside the save's transaction (see Note.save).
+    '''
+    if _bulk_writes.get():
+        return
+
+    bump_notes_version(instance.owner_id)
+    search.index_notes([instance])
+    if update_fields is None or 'title' in update_fields:
+        autocomplete.index_titles([instance])
+    if update_fields is None or set(update_fields) & set(Note.TRACKED_FIELDS):
+        stats.count_note_save(instance, created)
+    if not created:
+        revisions.record_revisions([instance])
+    drop_warm_titles(instance.owner_id)
+
+
+@receiver(pre_delete, sender=Note)
+def lock_deleted_note(sender, instance, **kwargs):
+    '''
+    Runs inside the delete's transaction. The counters only drop what the
+    locked row held, and nothing if it was already deleted.
+    '''
+    if not _bulk_writes.get() and stats.counters_enabled():
+        revisions.lock_replaced_states([instance])
+
+
+@receiver(post_delete, sender=Note)
+def note_deleted(sender, instance, **kwargs):
+    if _bulk_writes.get():
+        return
+
+    bump_notes_version(instance.owner_id)
+    stats.count_note_delete(instance)
+    instance.__dict__.pop('_replaced_state', None)
+    drop_warm_titles(instance.owner_id)
+
+
+@receiver(notes_bulk_changed, sender=Note)
+def notes_changed_in_bulk(sender, owner_id, created=(), updated=(), deleted=(), **kwargs):
+    bump_notes_version(owner_id)
+    search.index_notes([*created, *updated])
+    autocomplete.index_titles([*created, *updated])
+    stats.count_bulk_changes(owner_id, created, updated, deleted)
+    revisions.record_revisions(updated)
+    drop_warm_titles(owner_id)
+
+
+def drop_warm_titles(owner_id: int) -> None:
+    '''
+    Dropped again on commit, in case a concurrent request re-warmed the
+    owner's titles from the pre-commit state in between.
+    '''
+    autocomplete.warm_titles.delete(owner_id)
+    transaction.on_commit(lambda: autocomplete.warm_titles.delete(owner_id))
+
+
+def install_search_index(sender, using, **kwargs):
+    '''
+    Connected to post_migrate in NotebookConfig.ready().
+    '''
+    search.ensure_sqlite_fts(using)
@@ -0,0 +1,223 @@
+import collections
+import datetime
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from .filters import NoteFilter
+from .models import Note, OwnerNoteStats
+
+DIMENSIONS = {
+    'status': Note.STATUS_CHOICES,
+    'priority': Note.PRIORITY_CHOICES,
+    'category': Note.CATEGORY_CHOICES,
+}
+
+
+def counter_field(dimension: str, code: str) -> str:
+    return f'{dimension}_{code.lower()}'
+
+
+COUNTER_FIELDS = ['total'] + [counter_field(dimension, code)
+                              for dimension, choices in DIMENSIONS.items()
+                              for code, _ in choices]
+
+
+def counter_expressions() -> dict:
+    '''
+    One conditional COUNT per counter, so all of them come from a single scan.
+    '''
+    expressions = {'total': Count('id')}
+    for dimension, choices in DIMENSIONS.items():
+        for code, _ in choices:
+            expressions[counter_field(dimension, code)] = Count('id', filter=Q(**{dimension: code}))
+    return expressions
+
+
+def due_expressions() -> dict:
+    '''
+    Date dependent counts can't be maintained, but both are range scans on
+    the (owner, due_date) index. Overdue matches the status=Overdue filter;
+    the week runs Monday to Sunday.
+    '''
+    today = datetime.datetime.utcnow().date()
+    monday = today - datetime.timedelta(days=today.weekday())
+    return {
+        'overdue': Count('id', filter=NoteFilter.STATUS_GROUPS['overdue']()),
+        'due_this_week': Count('id', filter=Q(
+            due_date__range=(monday, monday + datetime.timedelta(days=6)))),
+    }
+
+
+def counters_enabled() -> bool:
+    return getattr(settings, 'NOTES_STATS_COUNTERS', False)
+
+
+def aggregate_counts(owner_id: int) -> dict:
+    return Note.objects.filter(owner_id=owner_id).aggregate(
+        **counter_expressions(), **due_expressions())
+
+
+def maintained_counts(owner_id: int) -> dict:
+    '''
+    Read the owner's counter row, creating it from an aggregation the first
+    time it is needed.
+    '''
+    counts = OwnerNoteStats.objects.filter(owner_id=owner_id).values(*COUNTER_FIELDS).first()
+    if counts is None:
+        counts = aggregate_counts(owner_id)
+        OwnerNoteStats.objects.get_or_create(
+            owner_id=owner_id, defaults={name: counts[name] for name in COUNTER_FIELDS})
+        return counts
+
+    counts.update(Note.objects.filter(owner_id=owner_id).aggregate(**due_expressions()))
+    return counts
+
+
+def note_stats(owner_id: int) -> dict:
+    '''
+    Note counts for the stats endpoint, keyed by display label.
+    '''
+    use_counters = counters_enabled()
+    counts = maintained_counts(owner_id) if use_counters else aggregate_counts(owner_id)
+
+    stats = {'total': counts['total']}
+    for dimension, choices in DIMENSIONS.items():
+        stats[dimension] = {label: counts[counter_field(dimension, code)] for code, label in choices}
+    stats['overdue'] = counts['overdue']
+    stats['due_this_week'] = counts['due_this_week']
+    stats['source'] = 'counters' if use_counters else 'aggregate'
+    return stats
+
+
+def apply_deltas(owner_id: int, deltas: dict) -> None:
+    '''
+    Add the deltas to the owner's counters in one UPDATE. Owners without a
+    counter row are skipped; their row is built on first read.
+    '''
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if deltas:
+        OwnerNoteStats.objects.filter(owner_id=owner_id).update(
+            **{name: F(name) + delta for name, delta in deltas.items()})
+
+
+def replaced_values(note):
+    '''
+    The counted values of the row the note's write replaced, as read under
+    a row lock by revisions.lock_replaced_states(), or None if there was no
+    row.
+    '''
+    state = getattr(note, '_replaced_state', None)
+    if state is None:
+        return None
+    return {name: state[name] for name in Note.TRACKED_FIELDS}
+
+
+def save_deltas(note, created: bool):
+    '''
+    Counter changes for a saved note, or None when the row it replaced is
+    unknown.
+    '''
+    if created:
+        previous = {}
+    else:
+        previous = replaced_values(note)
+        if previous is None:
+            return None
+    # Deferred fields weren't saved, so they are unchanged
+    current = {**previous, **note.tracked_values()}
+
+    deltas = {'total': 1 if created else 0}
+    for dimension, value in current.items():
+        if previous.get(dimension) != value:
+            if dimension in previous:
+                deltas[counter_field(dimension, previous[dimension])] = -1
+            deltas[counter_field(dimension, value)] = 1
+    return deltas
+
+
+def delete_deltas(note) -> dict:
+    '''
+    Counter changes for a deleted note: nothing unless the delete removed
+    a row.
+    '''
+    values = replaced_values(note)
+    if values is None:
+        return {}
+
+    deltas = {'total': -1}
+    for dimension, value in values.items():
+        deltas[counter_field(dimension, value)] = -1
+    return deltas
+
+
+def apply_or_repair(owner_id: int, changes: list) -> None:
+    '''
+    Apply the combined deltas of several changes in one UPDATE, or recount
+    the owner if any change couldn't be expressed as deltas.
+    '''
+    if any(deltas is None for deltas in changes):
+        repair_counters([owner_id])
+        return
+
+    combined = collections.Counter()
+    for deltas in changes:
+        combined.update(deltas)
+    apply_deltas(owner_id, combined)
+
+
+def count_note_save(note, created: bool) -> None:
+    '''
+    Move the note between counters according to what the save changed
+    from the row it replaced. If that row is unknown, the owner's counters
+    are recomputed instead.
+    '''
+    if counters_enabled():
+        apply_or_repair(note.owner_id, [save_deltas(note, created)])
+
+
+def count_note_delete(note) -> None:
+    if counters_enabled():
+        apply_or_repair(note.owner_id, [delete_deltas(note)])
+
+
+def count_bulk_changes(owner_id: int, created=(), updated=(), deleted=()) -> None:
+    if counters_enabled():
+        apply_or_repair(owner_id, [save_deltas(note, True) for note in created]
+                        + [save_deltas(note, False) for note in updated]
+                        + [delete_deltas(note) for note in deleted])
+
+
+def repair_counters(owner_ids=None, dry_run: bool = False) -> list:
+    '''
+    Recompute counters from the notes table with one grouped query and fix
+    any row that drifted or is missing. Returns the ids of the owners whose
+    rows were fixed.
+    '''
+    notes = Note.objects.all()
+    stored = OwnerNoteStats.objects.all()
+    if owner_ids is not None:
+        notes = notes.filter(owner_id__in=owner_ids)
+        stored = stored.filter(owner_id__in=owner_ids)
+
+    with transaction.atomic():
+        stored = {row.owner_id: row for row in stored.select_for_update()}
+        actual = {row.pop('owner_id'): row for row in
+                  notes.order_by().values('owner_id').annotate(**counter_expressions())}
+        empty = dict.fromkeys(COUNTER_FIELDS, 0)
+
+        drifted, missing = [], []
+        for owner_id in set(actual) | set(stored):
+            counts = actual.get(owner_id, empty)
+            row = stored.get(owner_id)
+            if row is None:
+                missing.append(OwnerNoteStats(owner_id=owner_id, **counts))
+            elif any(getattr(row, name) != counts[name] for name in COUNTER_FIELDS):
+                for name in COUNTER_FIELDS:
+                    setattr(row, name, counts[name])
+                drifted.append(row)
+
+        if not dry_run:
+            OwnerNoteStats.objects.bulk_update(drifted, COUNTER_FIELDS, batch_size=500)
+            OwnerNoteStats.objects.bulk_create(missing, batch_size=500)
+
+    return sorted(row.owner_id for row in drifted + missing)
@@ -1,17 +1,40 @@
+import csv
+from concurrent.futures import ThreadPoolExecutor
 import datetime
+import gzip
+import io
 from django.conf import settings
 from django.contrib.auth.models import User
 import json
+import os
 import random
-from django.test import TestCase
+import sys
+import tempfile
+import time
+from pathlib import Path
+from io import StringIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from unittest.mock import patch
 from django.test import Client
 from django.urls import reverse
+from django.utils import timezone
 import jwt
+from pypdf import PdfReader
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from OnlineNotesAPI.renderers import FastJSONRenderer
 from core.models import User
 from core.services import generate_token
-from .models import Note, Owner
+from django.core import mail
+from core.models import OutboundEmail
+from . import autocomplete, batch, reminders, reports, revisions, stats as stats_module
+from .caching import response_cache
+from .models import Note, NoteReport, NoteRevision, Owner, OwnerNoteStats, ReminderRun
+from .services import generate_user_notes
 
 
 # Global variables
@@ -217,3 +240,1335 @@ class NoteaDetailTests(TestCase):
         self.note.refresh_from_db()
         self.assertContains(response, 'Updated', 1)
         self.assertContains(response, 'updated', 2)
+
+
+class NotePaginationTests(TestCase):
+
+    def setUp(self):
+        ''' Create a user with a handful of notes, some without a due date '''
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        self.owner = Owner.objects.get_or_create(
+            is_email_valid=False,
+            user_id=self.user.id,
+        )[0]
+
+        for index in range(7):
+            Note.objects.create(
+                owner=self.owner,
+                title=f'Note {index}',
+                slug=f'note-{index}',
+                content='Paginated note.',
+                due_date=None if index % 3 == 0 else datetime.date(
+                    2023, 10, 1 + index % 2),
+            )
+
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+
+    def walk(self, url):
+        ''' Follow next links to the end, returning the pages visited '''
+        pages = []
+        while url:
+            response = self.client.get(url, **self.headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.json())
+            url = pages[-1]['next']
+        return pages
+
+    def test_pages_cover_all_notes_once(self):
+        ''' Walk every page of the default ordering '''
+        pages = self.walk('/api/v1/notes/?page_size=3')
+        ids = [note['id'] for page in pages for note in page['results']]
+
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 1])
+        self.assertEqual(ids, list(Note.objects.order_by(
+            '-created_at', '-id').values_list('id', flat=True)))
+
+    def test_nullable_ordering_and_previous_link(self):
+        ''' Ordering by due date keeps notes without a due date and pages back correctly '''
+        pages = self.walk('/api/v1/notes/?page_size=2&ordering=due_date')
+        ids = [note['id'] for page in pages for note in page['results']]
+        self.assertEqual(len(ids), 7)
+        self.assertEqual(len(set(ids)), 7)
+
+        response = self.client.get(pages[-1]['previous'], **self.headers)
+        self.assertEqual(response.json()['results'], pages[-2]['results'])
+
+    def test_count_and_invalid_cursor(self):
+        ''' Count is opt-in and forged cursors are rejected '''
+        response = self.client.get(
+            '/api/v1/notes/?page_size=2&count=exact', **self.headers)
+        self.assertEqual(response.json()['count'], 7)
+
+        response = self.client.get(
+            '/api/v1/notes/?cursor=forged', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(NOTES_RESPONSE_CACHE_ENABLED=False)
+    def test_links_are_stable(self):
+        ''' The same page gets the same cursor links later on '''
+        first = self.client.get('/api/v1/notes/?page_size=2', **self.headers).content
+        later = time.time() + 30
+        with patch('time.time', return_value=later):
+            second = self.client.get('/api/v1/notes/?page_size=2', **self.headers).content
+        self.assertEqual(first, second)
+
+
+class BenchmarkNoteQueriesTests(TestCase):
+
+    def test_benchmark_reports_each_access_path(self):
+        ''' Run the benchmark on a tiny dataset and check the seeded data is removed '''
+        out = StringIO()
+        call_command('benchmark_note_queries', notes=40, owners=2,
+                     repeat=1, no_compare=True, stdout=out)
+
+        for path in ('list', 'status', 'category', 'overdue', 'priority'):
+            self.assertIn(f'[{path}]', out.getvalue())
+        self.assertFalse(Note.objects.exists())
+
+
+class RequestPrincipalTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+
+    def test_owner_provisioned_at_registration(self):
+        ''' Creating a user creates exactly one owner '''
+        self.assertEqual(Owner.objects.filter(user=self.user).count(), 1)
+
+    def test_reads_resolve_owner_with_authentication(self):
+        ''' Authentication loads user and owner together; reads never look the user up again '''
+        note = Note.objects.create(
+            owner=self.user.owner, title='Note', slug='note', content='...')
+
+        # User with owner, notes version, notes
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/v1/notes/', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # The principal is cached now, leaving the version and notes queries
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                f'/api/v1/notes/{note.id}/', **self.headers)
+        self.assertEqual(response.json()['owner'], self.user.owner.id)
+
+    def test_owner_cannot_be_reassigned(self):
+        ''' The owner field is taken from the principal, not the payload '''
+        other = User.objects.create_user(
+            email='other@example.com', password=password,
+            first_name=first_name, last_name=last_name)
+
+        response = self.client.post('/api/v1/notes/', {
+            'owner': other.owner.id,
+            'title': 'Mine',
+            'slug': 'mine',
+            'content': '...',
+        }, content_type='application/json', **self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Note.objects.get().owner_id, self.user.owner.id)
+
+
+class NoteFilterTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        rows = [
+            ('H', 'N', 'B', datetime.date(2023, 10, 1)),
+            ('L', 'P', 'B', datetime.date(2023, 10, 5)),
+            ('M', 'C', 'R', None),
+            ('H', 'P', 'R', datetime.date(2023, 10, 9)),
+        ]
+        for index, (priority, note_status, category, due_date) in enumerate(rows):
+            Note.objects.create(
+                owner=self.user.owner, title=f'Note {index}', slug=f'note-{index}',
+                content='...', priority=priority, status=note_status,
+                category=category, due_date=due_date)
+
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+
+    def titles(self, query):
+        response = self.client.get(f'/api/v1/notes/?{query}', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [note['title'] for note in response.json()]
+
+    def test_filters_combine(self):
+        ''' Status, category and due date range all apply together '''
+        self.assertEqual(
+            self.titles('status=Unfinished&category=Blue&due_after=2023-10-02'),
+            ['Note 1'])
+
+    def test_priority_orders_by_rank(self):
+        ''' High sorts above Medium above Low, with a secondary key '''
+        self.assertEqual(self.titles('ordering=-priority,due_date'),
+                         ['Note 0', 'Note 3', 'Note 2', 'Note 1'])
+
+    def test_priority_rank_pagination(self):
+        ''' Keyset pagination follows the rank ordering '''
+        response = self.client.get(
+            '/api/v1/notes/?ordering=priority&page_size=3', **self.headers)
+        first_page = response.json()
+        response = self.client.get(first_page['next'], **self.headers)
+
+        titles = [note['title'] for page in (first_page, response.json())
+                  for note in page['results']]
+        self.assertEqual(titles[0], 'Note 1')
+        self.assertEqual(sorted(titles[2:]), ['Note 0', 'Note 3'])
+
+    def test_unknown_ordering_is_rejected(self):
+        response = self.client.get(
+            '/api/v1/notes/?ordering=owner__user__password', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class NoteConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        self.note = Note.objects.create(
+            owner=self.user.owner, title='Note', slug='note', content='...')
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+
+    def test_matching_etag_returns_304_without_reading_notes(self):
+        for url in ('/api/v1/notes/', f'/api/v1/notes/{self.note.id}/'):
+            response = self.client.get(url, **self.headers)
+            etag = response['ETag']
+            self.assertIn('Last-Modified', response)
+            self.assertIn('private', response['Cache-Control'])
+
+            # Only the owner's version is read
+            with self.assertNumQueries(1):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etag, **self.headers)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_writes_change_the_etag(self):
+        response = self.client.get('/api/v1/notes/', **self.headers)
+        etag = response['ETag']
+
+        self.client.put(f'/api/v1/notes/{self.note.id}/', {
+            'title': 'Changed', 'slug': 'note', 'content': '...',
+        }, content_type='application/json', **self.headers)
+
+        response = self.client.get(
+            '/api/v1/notes/', HTTP_IF_NONE_MATCH=etag, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(Owner.objects.get(user=self.user).notes_version, 2)
+
+    def test_etag_depends_on_query(self):
+        first = self.client.get('/api/v1/notes/?status=Done', **self.headers)
+        second = self.client.get('/api/v1/notes/?status=New', **self.headers)
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+
+class NoteResponseCacheTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        self.note = Note.objects.create(
+            owner=self.user.owner, title='Note', slug='note', content='...')
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+
+    def test_repeat_reads_are_served_from_cache(self):
+        first = self.client.get('/api/v1/notes/?status=New&category=N', **self.headers)
+        hits = response_cache.hits
+
+        # Same parameters in another order; only the version is read
+        with self.assertNumQueries(1):
+            second = self.client.get(
+                '/api/v1/notes/?category=N&status=New', **self.headers)
+
+        self.assertEqual(response_cache.hits, hits + 1)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_writes_make_cached_responses_unreachable(self):
+        self.client.get(f'/api/v1/notes/{self.note.id}/', **self.headers)
+
+        # Bypasses the API entirely, as the admin would
+        self.note.title = 'Edited in admin'
+        self.note.save()
+
+        response = self.client.get(f'/api/v1/notes/{self.note.id}/', **self.headers)
+        self.assertEqual(response.json()['title'], 'Edited in admin')
+
+    @override_settings(NOTES_RESPONSE_CACHE_ENABLED=False)
+    def test_kill_switch(self):
+        self.client.get('/api/v1/notes/', **self.headers)
+
+        with self.assertNumQueries(2):
+            self.client.get('/api/v1/notes/', **self.headers)
+
+
+class NoteSparseFieldsetTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        self.note = Note.objects.create(
+            owner=self.user.owner, title='Note', slug='note',
+            content='A very long body', due_date=datetime.date(2023, 10, 1))
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+
+    def test_list_projection(self):
+        ''' Only the requested fields are emitted and the content column is not selected '''
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                '/api/v1/notes/?fields=title,due_date&page_size=10', **self.headers)
+
+        self.assertEqual(response.json()['results'], [
+            {'title': 'Note', 'due_date': '2023-10-01'}])
+        notes_sql = [query['sql'] for query in queries
+                     if 'FROM "notebook_note"' in query['sql']]
+        self.assertEqual(len(notes_sql), 1)
+        self.assertNotIn('"content"', notes_sql[0])
+
+    def test_detail_projection(self):
+        response = self.client.get(
+            f'/api/v1/notes/{self.note.id}/?fields=id,content', **self.headers)
+        self.assertEqual(response.json(), {'id': self.note.id, 'content': 'A very long body'})
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/v1/notes/?fields=title,password', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FastReadPathTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        Note.objects.create(
+            owner=self.user.owner, title='Ünïcode   line', slug='unicode',
+            content='"quoted"\n\ttabs', priority='H', status='P', category='G',
+            due_date=datetime.date(2023, 10, 17))
+        Note.objects.create(
+            owner=self.user.owner, title='No due date', slug='no-due-date',
+            content='')
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+
+    def get_both_paths(self, url):
+        bodies = []
+        for fast in (True, False):
+            with override_settings(NOTES_FAST_READ_PATH=fast, NOTES_RESPONSE_CACHE_ENABLED=False):
+                response = self.client.get(url, **self.headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            bodies.append(response.content)
+        return bodies
+
+    def test_fast_path_is_byte_compatible(self):
+        note_id = Note.objects.get(slug='unicode').id
+        for url in ('/api/v1/notes/', '/api/v1/notes/?page_size=1&ordering=due_date',
+                    '/api/v1/notes/?fields=title,created_at', f'/api/v1/notes/{note_id}/'):
+            fast, stock = self.get_both_paths(url)
+            self.assertEqual(fast, stock, url)
+
+    def test_renderer_matches_stock_renderer(self):
+        data = {'text': 'line\u2028separator', 'nested': [None, True, 1, 'é']}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_display_rows_match_model_display_info(self):
+        data, notes = generate_user_notes(self.user)
+        self.assertEqual(data['notes'], [note.get_display_info() for note in notes])
+
+
+class NoteSearchTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        self.other = User.objects.create_user(
+            email='other.user@example.com', password=password,
+            first_name='Other', last_name='User')
+        Note.objects.create(
+            owner=self.user.owner, title='Quarterly budget', slug='budget',
+            content='Review the <budget> spreadsheet with finance before Friday.')
+        Note.objects.create(
+            owner=self.user.owner, title='Groceries', slug='groceries',
+            content='Milk, eggs and a budget for snacks.')
+        Note.objects.create(
+            owner=self.user.owner, title='Holiday', slug='holiday',
+            content='Book flights.')
+        Note.objects.create(
+            owner=self.other.owner, title='Budget', slug='other-budget',
+            content='Not yours.')
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+
+    def search(self, query):
+        response = self.client.get(f'/api/v1/notes/search/?{query}', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def check_backend(self):
+        body = self.search('q=budget')
+        self.assertEqual([note['slug'] for note in body['results']], ['budget', 'groceries'])
+        self.assertGreater(body['results'][0]['score'], body['results'][1]['score'])
+        self.assertEqual(body['results'][0]['highlight']['title'],
+                         'Quarterly <mark>budget</mark>')
+        self.assertIn('&lt;<mark>budget</mark>&gt;',
+                      body['results'][0]['highlight']['content'])
+
+        # Every word must match
+        self.assertEqual([note['slug'] for note in self.search('q=budget+snacks')['results']],
+                         ['groceries'])
+
+        # Edits are searchable straight away
+        note = Note.objects.get(slug='holiday')
+        note.content = 'Book flights within budget.'
+        note.save()
+        self.assertEqual(len(self.search('q=budget')['results']), 3)
+        note.delete()
+        self.assertEqual(len(self.search('q=flights')['results']), 0)
+        return body
+
+    def test_native_backend(self):
+        self.assertEqual(self.check_backend()['backend'], 'sqlite_fts')
+
+    @override_settings(NOTES_SEARCH_BACKEND='table', NOTES_RESPONSE_CACHE_ENABLED=False)
+    def test_table_backend(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.check_backend()['backend'], 'table')
+
+    def test_pagination(self):
+        first = self.search('q=budget&page_size=1')
+        self.assertEqual(len(first['results']), 1)
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next'], **self.headers).json()
+        self.assertEqual([note['slug'] for note in second['results']], ['groceries'])
+        self.assertIsNone(second['next'])
+
+    def test_query_syntax_is_literal(self):
+        self.assertEqual(self.search('q=%22budget%22+OR+NEAR(')['results'], [])
+
+    def test_query_is_required(self):
+        response = self.client.get('/api/v1/notes/search/', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class NoteAutocompleteTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        for title in ('Quarterly budget review', 'Budget for groceries', 'Holiday plans'):
+            Note.objects.create(owner=self.user.owner, title=title,
+                                slug=title.lower().replace(' ', '-'), content='...')
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+
+    def complete(self, query):
+        response = self.client.get(f'/api/v1/notes/autocomplete/?q={query}', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [note['title'] for note in response.json()['results']]
+
+    def check_completions(self):
+        self.assertEqual(sorted(self.complete('bud')),
+                         ['Budget for groceries', 'Quarterly budget review'])
+        # Typo tolerant
+        self.assertEqual(self.complete('holidy')[:1], ['Holiday plans'])
+        self.assertEqual(self.complete('groceries+budg'), ['Budget for groceries'])
+        self.assertEqual(self.complete('zzz'), [])
+
+        note = Note.objects.get(title='Holiday plans')
+        note.title = 'Summer plans'
+        note.save()
+        self.assertEqual(self.complete('summ'), ['Summer plans'])
+
+    def test_warm_index(self):
+        self.check_completions()
+
+        # Repeated keystrokes don't touch the database once warm
+        self.complete('pla')
+        with CaptureQueriesContext(connection) as queries:
+            self.complete('pla')
+            self.complete('plan')
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'notebook_note' in query['sql']])
+
+    @override_settings(NOTES_AUTOCOMPLETE_WARM_MAX=1)
+    def test_trigram_table(self):
+        self.check_completions()
+
+    def test_closer_titles_rank_first(self):
+        for number in [1, *range(10, 20)]:
+            Note.objects.create(owner=self.user.owner, title=f'New {number}',
+                                slug=f'new-{number}', content='...')
+        # Every title holds the whole query; the exact one wins the tie
+        # although the others were edited more recently
+        self.assertEqual(self.complete('new+1')[0], 'New 1')
+        # A prefix of a long title still beats a short partial match
+        self.assertEqual(self.complete('quarterly')[0], 'Quarterly budget review')
+
+    def test_warm_index_shared_by_threads(self):
+        index = autocomplete.WarmTitleIndex(Note.objects.values_list('id', 'title', 'updated_at'))
+        index.memo_size = 2
+        queries = ['bud', 'budg', 'budge', 'hol', 'holi', 'plan']
+
+        def lookups():
+            for _ in range(300):
+                for query in queries:
+                    index.complete(query, 5)
+
+        # Switch threads as often as possible to provoke interleaving
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                for future in [pool.submit(lookups) for _ in range(8)]:
+                    future.result()
+        finally:
+            sys.setswitchinterval(interval)
+        self.assertLessEqual(len(index.memo), 2)
+        self.assertEqual(len(index.complete('bud', 5)), 2)
+
+
+class NoteStatsTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        today = datetime.datetime.utcnow().date()
+        rows = [
+            ('H', 'N', 'B', today - datetime.timedelta(days=30)),
+            ('L', 'P', 'B', today),
+            ('M', 'C', 'R', None),
+            ('H', 'P', 'R', today + datetime.timedelta(days=60)),
+        ]
+        for index, (priority, note_status, category, due_date) in enumerate(rows):
+            Note.objects.create(
+                owner=self.user.owner, title=f'Note {index}', slug=f'note-{index}',
+                content='...', priority=priority, status=note_status,
+                category=category, due_date=due_date)
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+
+    def get_stats(self):
+        with override_settings(NOTES_RESPONSE_CACHE_ENABLED=False):
+            response = self.client.get('/api/v1/notes/stats/', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def check_stats(self):
+        stats = self.get_stats()
+        self.assertEqual(stats['total'], 4)
+        self.assertEqual(stats['status'], {'New': 1, 'In Progress': 2, 'Completed': 1, 'Deleted': 0})
+        self.assertEqual(stats['priority'], {'Low': 1, 'Medium': 1, 'High': 2})
+        self.assertEqual(stats['category']['Blue'], 2)
+        self.assertEqual(stats['overdue'], 2)
+        self.assertEqual(stats['due_this_week'], 1)
+
+        note = Note.objects.get(slug='note-0')
+        note.status = Note.STATUS_END
+        note.save()
+        Note.objects.get(slug='note-2').delete()
+        Note.objects.create(owner=self.user.owner, title='New', slug='new', content='...')
+
+        stats = self.get_stats()
+        self.assertEqual(stats['total'], 4)
+        self.assertEqual(stats['status'], {'New': 1, 'In Progress': 2, 'Completed': 1, 'Deleted': 0})
+        self.assertEqual(stats['category'], {
+            'None': 1, 'Blue': 2, 'Green': 0, 'Orange': 0, 'Purple': 0, 'Red': 1, 'Yellow': 0})
+        return stats
+
+    def test_single_query(self):
+        self.get_stats()
+        with CaptureQueriesContext(connection) as queries:
+            self.get_stats()
+        self.assertEqual(len([query for query in queries.captured_queries
+                              if 'notebook_note"' in query['sql']]), 1)
+        self.assertEqual(self.check_stats()['source'], 'aggregate')
+
+    @override_settings(NOTES_STATS_COUNTERS=True)
+    def test_maintained_counters(self):
+        self.get_stats()
+        self.assertEqual(self.check_stats()['source'], 'counters')
+
+        # Stale copies count from the row each write replaces
+        first, second = Note.objects.get(slug='new'), Note.objects.get(slug='new')
+        for copy in (first, second):
+            copy.status = Note.STATUS_END
+            copy.save()
+        stats = self.get_stats()
+        self.assertEqual((stats['status']['New'], stats['status']['Completed']), (0, 2))
+        first.delete()
+        second.delete()
+        self.assertEqual(self.get_stats()['total'], 3)
+        self.assertEqual(stats_module.repair_counters(dry_run=True), [])
+
+    @override_settings(NOTES_STATS_COUNTERS=True)
+    def test_repair_command(self):
+        self.get_stats()
+        OwnerNoteStats.objects.filter(owner=self.user.owner).update(total=99, status_n=0)
+
+        out = StringIO()
+        call_command('repair_note_stats', '--dry-run', stdout=out)
+        self.assertIn('Found 1 owner', out.getvalue())
+        call_command('repair_note_stats', stdout=out)
+        self.assertEqual(self.get_stats()['total'], 4)
+        self.assertEqual(self.get_stats()['status']['New'], 1)
+
+
+class NoteBatchTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        self.notes = [
+            Note.objects.create(owner=self.user.owner, title=f'Note {index}',
+                                slug=f'note-{index}', content='...')
+            for index in range(3)]
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+
+    def post(self, body):
+        return self.client.post('/api/v1/notes/batch/', body,
+                                content_type='application/json', **self.headers)
+
+    def operations(self, count=50):
+        return [
+            *[{'op': 'create', 'data': {'title': f'New {index}', 'slug': f'new-{index}',
+                                        'content': 'batch', 'priority': 'H'}}
+              for index in range(count)],
+            {'op': 'update', 'id': self.notes[0].id, 'data': {'status': 'C', 'priority': 'L'}},
+            {'op': 'delete', 'id': self.notes[1].id},
+        ]
+
+    @override_settings(NOTES_STATS_COUNTERS=True)
+    def test_applies_in_bulk(self):
+        self.client.get('/api/v1/notes/stats/', **self.headers)
+        version = Owner.objects.get(pk=self.user.owner.id).notes_version
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(self.operations())
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # Independent of the number of operations (two of them record the
+        # updated notes' revisions)
+        self.assertLess(len(queries.captured_queries), 22)
+
+        body = response.json()
+        self.assertEqual((body['applied'], body['failed']), (52, 0))
+        self.assertEqual([result['status'] for result in body['results'][-3:]], [201, 200, 204])
+        self.assertEqual(body['results'][0]['data']['slug'], 'new-0')
+
+        self.assertEqual(Note.objects.filter(owner=self.user.owner).count(), 52)
+        updated = Note.objects.get(pk=self.notes[0].id)
+        self.assertEqual((updated.status, updated.priority_rank), ('C', 1))
+        self.assertEqual(Note.objects.get(slug='new-3').priority_rank, 3)
+        self.assertEqual(Owner.objects.get(pk=self.user.owner.id).notes_version, version + 1)
+
+        stats = self.client.get('/api/v1/notes/stats/', **self.headers).json()
+        self.assertEqual((stats['total'], stats['status']['Completed'], stats['priority']['High']),
+                         (52, 1, 50))
+        results = self.client.get('/api/v1/notes/autocomplete/?q=new+42', **self.headers).json()
+        self.assertEqual(results['results'][0]['title'], 'New 42')
+
+    def test_atomic_batch_rolls_back(self):
+        operations = self.operations(2) + [
+            {'op': 'create', 'data': {'title': 'Dup', 'slug': 'note-2', 'content': '...'}},
+            {'op': 'delete', 'id': 999999},
+        ]
+        response = self.post(operations)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([result['status'] for result in response.json()['results']],
+                         [424, 424, 424, 424, 400, 404])
+        self.assertEqual(Note.objects.filter(owner=self.user.owner).count(), 3)
+
+    def test_partial_batch(self):
+        operations = self.operations(2) + [
+            {'op': 'create', 'data': {'title': 'Dup', 'slug': 'new-0', 'content': '...'}},
+            {'op': 'update', 'id': self.notes[2].id, 'data': {'status': 'X'}},
+            {'op': 'rename'},
+        ]
+        response = self.post({'atomic': False, 'operations': operations})
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        body = response.json()
+        self.assertEqual([result['status'] for result in body['results']],
+                         [201, 201, 200, 204, 400, 400, 400])
+        self.assertIn('slug', body['results'][4]['errors'])
+        self.assertIn('status', body['results'][5]['errors'])
+        self.assertEqual(Note.objects.filter(owner=self.user.owner).count(), 4)
+
+
+class NoteSlugTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+
+    def test_generated_on_create(self):
+        first = self.client.post('/api/v1/notes/', {'title': 'Buy milk!', 'content': '...'},
+                                 **self.headers).json()['data']['slug']
+        second = self.client.post('/api/v1/notes/', {'title': 'Buy milk!', 'content': '...'},
+                                  **self.headers).json()['data']['slug']
+        self.assertEqual(first, Note._meta.get_field('slug').generate('Buy milk!', self.user.owner.id, 1))
+        self.assertTrue(first.startswith('buy-milk--'))
+        self.assertTrue(second.endswith('-2'))
+
+        # Client slugs are still accepted, but not in the generated namespace
+        response = self.client.post('/api/v1/notes/', {'title': 'A', 'slug': 'a--1-1', 'content': '...'},
+                                    **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post('/api/v1/notes/', {'title': 'A', 'slug': 'custom', 'content': '...'},
+                                    **self.headers)
+        self.assertEqual(response.json()['data']['slug'], 'custom')
+
+    def test_keeps_generated_slug_on_update(self):
+        note = Note.objects.create(owner=self.user.owner, title='Trip', content='...')
+        response = self.client.put(f'/api/v1/notes/{note.id}/', {
+            'title': 'Trip', 'slug': note.slug, 'content': 'edited'},
+            content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_long_and_symbol_titles(self):
+        long_note = Note.objects.create(owner=self.user.owner, title='word ' * 30, content='...')
+        symbols = Note.objects.create(owner=self.user.owner, title='!!!', content='...')
+        self.assertLessEqual(len(long_note.slug), 50)
+        self.assertTrue(long_note.slug.startswith('word-word'))
+        self.assertTrue(symbols.slug.startswith('note--'))
+
+    def test_batch_reserves_numbers_once(self):
+        operations = [{'op': 'create', 'data': {'title': 'Same title', 'content': '...'}}
+                      for _ in range(20)]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/v1/notes/batch/', operations,
+                                        content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        slugs = [result['data']['slug'] for result in response.json()['results']]
+        self.assertEqual(len(set(slugs)), 20)
+        self.assertEqual(len([query for query in queries.captured_queries
+                              if '"slug_sequence" = (' in query['sql']]), 1)
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'WHERE "notebook_note"."slug"' in query['sql']])
+
+    def test_admin_form_keeps_slug_sequence(self):
+        admin_user = User.objects.create_superuser(first_name='Admin', last_name='User',
+                                                   email='admin@example.com', password=password)
+        self.client.force_login(admin_user)
+        owner = self.user.owner
+        # A form rendered before the note was created would post the old number
+        Note.objects.create(owner=owner, title='Trip', content='...')
+        response = self.client.post(f'/admin/notebook/owner/{owner.id}/change/', {
+            'user': self.user.id, 'is_email_valid': 'on', 'slug_sequence': 0,
+            'notes_version': 0, 'notes_modified_at_0': '', 'notes_modified_at_1': ''})
+
+        self.assertEqual(response.status_code, 302)
+        owner.refresh_from_db()
+        self.assertEqual((owner.is_email_valid, owner.slug_sequence, owner.notes_version), (True, 1, 1))
+        second = Note.objects.create(owner=owner, title='Trip', content='...')
+        self.assertTrue(second.slug.endswith('-2'))
+
+
+class NoteImportTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+        self.import_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.import_dir.cleanup)
+        settings_override = override_settings(NOTES_IMPORT_DIR=Path(self.import_dir.name))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, name, content, **data):
+        file = SimpleUploadedFile(name, content.encode())
+        return self.client.post('/api/v1/notes/imports/', {'file': file, **data}, **self.headers)
+
+    def test_csv_export_round_trip(self):
+        Note.objects.create(owner=self.user.owner, title='Exported', content='Line one\nline, two',
+                            priority='H', status='P', category='G', due_date=datetime.date(2023, 10, 17))
+        exported = b''.join(self.client.get('/api/v1/csv_download/', **self.headers)).decode()
+        Note.objects.all().delete()
+
+        response = self.upload('notes.csv', exported)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['rows_imported'], 1)
+
+        note = Note.objects.get(owner=self.user.owner)
+        self.assertEqual((note.title, note.content, note.priority, note.status, note.category),
+                         ('Exported', 'Line one\nline, two', 'H', 'P', 'G'))
+        self.assertEqual(note.due_date, datetime.date(2023, 10, 17))
+
+    def test_ndjson_rejected_rows(self):
+        lines = [
+            json.dumps({'title': 'Good', 'content': '...', 'priority': 'low'}),
+            '{not json',
+            json.dumps({'title': '', 'content': '...'}),
+            '',
+            json.dumps({'title': 'Also good', 'content': '...', 'status': 'C'}),
+        ]
+        body = self.upload('notes.ndjson', '\n'.join(lines), batch_size=2).json()
+        self.assertEqual((body['status'], body['rows_read'], body['rows_imported'], body['rows_failed']),
+                         ('completed', 4, 2, 2))
+
+        response = self.client.get(f"/api/v1/notes/imports/{body['id']}/?errors=true", **self.headers)
+        errors = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([error['line'] for error in errors], [2, 3])
+        self.assertIn('title', errors[1]['errors'])
+
+    def test_resume_after_failure(self):
+        lines = '\n'.join(json.dumps({'title': f'Note {index}', 'content': '...' if index % 3 else ''})
+                          for index in range(10))
+        write_notes = batch.write_notes
+        calls = []
+
+        def fail_third_batch(*args, **kwargs):
+            calls.append(1)
+            if len(calls) == 3:
+                raise RuntimeError('connection lost')
+            return write_notes(*args, **kwargs)
+
+        with patch('notebook.batch.write_notes', fail_third_batch):
+            body = self.upload('notes.ndjson', lines, batch_size=3).json()
+        self.assertEqual((body['status'], body['rows_read']), ('failed', 6))
+
+        body = self.upload('notes.ndjson', lines, batch_size=3, resume=body['id']).json()
+        self.assertEqual((body['status'], body['rows_imported'], body['rows_failed']), ('completed', 6, 4))
+        self.assertEqual(Note.objects.filter(owner=self.user.owner).count(), 6)
+
+        response = self.client.get(f"/api/v1/notes/imports/{body['id']}/?errors=true", **self.headers)
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual([json.loads(line)['line'] for line in lines], [1, 4, 7, 10])
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as source:
+            source.write('title,content,priority\nFirst,...,High\nSecond,...,Urgent\n')
+        self.addCleanup(os.remove, source.name)
+
+        out = StringIO()
+        call_command('import_notes', source.name, '--email', email, stdout=out)
+        self.assertIn('1 imported, 1 rejected', out.getvalue())
+        self.assertEqual(Note.objects.get(owner=self.user.owner).priority_rank, 3)
+
+
+class NoteExportTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+        for number in range(5):
+            Note.objects.create(owner=self.user.owner, title=f'Note {number}', content='a, "b"\nc',
+                                priority='H', status='C', category='P')
+
+    @override_settings(NOTES_EXPORT_CHUNK_SIZE=2)
+    def test_csv_streams_in_chunks(self):
+        response = self.client.get('/api/v1/csv_download/', **self.headers)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        chunks = list(response.streaming_content)
+        # Header with the first chunk of two rows, then two more chunks
+        self.assertEqual(len(chunks), 3)
+
+        rows = list(csv.reader(StringIO(b''.join(chunks).decode())))
+        self.assertEqual(rows[0], ['S/N', 'title', 'slug', 'content', 'created_at',
+                                   'due_date', 'priority', 'status', 'category'])
+        self.assertEqual([row[0] for row in rows[1:]], ['1', '2', '3', '4', '5'])
+        self.assertEqual(rows[1][1], 'Note 0')
+        self.assertEqual(rows[1][3], 'a, "b"\nc')
+        self.assertEqual(rows[1][6:], ['High', 'Completed', 'Purple'])
+
+    def test_csv_gzip(self):
+        plain = b''.join(self.client.get('/api/v1/csv_download/', **self.headers).streaming_content)
+        response = self.client.get('/api/v1/csv_download/', HTTP_ACCEPT_ENCODING='gzip, br', **self.headers)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), plain)
+
+    @override_settings(NOTES_EXPORT_CHUNK_SIZE=2)
+    def test_ndjson_export(self):
+        response = self.client.get('/api/v1/notes/export/', **self.headers)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(len(list(response.streaming_content)), 3)
+
+        response = self.client.get('/api/v1/notes/export/', **self.headers)
+        lines = b''.join(response.streaming_content).splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['title'] for row in rows], [f'Note {number}' for number in range(5)])
+        self.assertEqual(rows[0]['content'], 'a, "b"\nc')
+        self.assertEqual((rows[0]['priority'], rows[0]['status']), ('H', 'C'))
+        self.assertTrue(rows[0]['updated_at'].endswith('Z'))
+
+        # Lines are the JSON API's representation of the same note
+        note = Note.objects.get(title='Note 0')
+        detail = self.client.get(f'/api/v1/notes/{note.id}/', **self.headers).json()
+        self.assertEqual({name: rows[0][name] for name in detail}, detail)
+
+    def test_ndjson_export_updated_since(self):
+        cutoff = datetime.datetime(2030, 1, 1, tzinfo=datetime.timezone.utc)
+        Note.objects.filter(title='Note 3').update(updated_at=cutoff)
+        response = self.client.get('/api/v1/notes/export/', {'updated_since': '2030-01-01T00:00:00Z'},
+                                   HTTP_ACCEPT_ENCODING='gzip', **self.headers)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ['Note 3'])
+
+        response = self.client.get('/api/v1/notes/export/', {'updated_since': 'yesterday'}, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class NoteReportTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+        Note.objects.create(owner=self.user.owner, title='Report me', content='...')
+        self.report_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.report_dir.cleanup)
+        settings_override = override_settings(NOTES_REPORT_DIR=Path(self.report_dir.name) / 'reports',
+                                              NOTES_PDF_CACHE_DIR=Path(self.report_dir.name) / 'cache')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_report_job(self):
+        response = self.client.post('/api/v1/notes/reports/', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        report_id = response.json()['id']
+        self.assertTrue(response['Location'].endswith(f'/api/v1/notes/reports/{report_id}/'))
+
+        # A queued report is reused
+        response = self.client.post('/api/v1/notes/reports/', **self.headers)
+        self.assertEqual((response.status_code, response.json()['id']), (status.HTTP_200_OK, report_id))
+        response = self.client.get(f'/api/v1/notes/reports/{report_id}/?download=true', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        self.assertEqual(reports.work(burst=True), 1)
+
+        body = self.client.get(f'/api/v1/notes/reports/{report_id}/', **self.headers).json()
+        self.assertEqual((body['status'], body['progress'], body['notes_count']), ('completed', 100, 1))
+        response = self.client.get(f'/api/v1/notes/reports/{report_id}/?download=true', **self.headers)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_failed_render_is_retried(self):
+        report, _ = reports.request_report(self.user.owner.id)
+        with patch('OnlineNotesAPI.renderers.render_pdf_bytes', side_effect=ValueError('Invalid PDF')):
+            self.assertTrue(reports.process_next())
+            # Not retried before its delay is up
+            report.refresh_from_db()
+            self.assertEqual(report.status, 'queued')
+            self.assertGreater(report.next_attempt_at, timezone.now() + datetime.timedelta(seconds=20))
+            self.assertFalse(reports.process_next())
+
+            for _ in range(2):
+                NoteReport.objects.filter(pk=report.pk).update(next_attempt_at=timezone.now())
+                self.assertTrue(reports.process_next())
+            self.assertFalse(reports.process_next())
+
+        report.refresh_from_db()
+        self.assertEqual((report.status, report.attempts, report.last_error), ('failed', 3, 'Invalid PDF'))
+
+    def test_stale_reports_are_requeued(self):
+        report, _ = reports.request_report(self.user.owner.id)
+        reports.claim_next('dead-worker')
+        NoteReport.objects.filter(pk=report.pk).update(
+            started_at=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc))
+
+        self.assertEqual(reports.requeue_stale(), 1)
+        report.refresh_from_db()
+        self.assertEqual((report.status, report.worker), ('queued', ''))
+
+        self.assertTrue(reports.process_next())
+        report.refresh_from_db()
+        self.assertEqual((report.status, report.attempts), ('completed', 2))
+
+    def test_pdf_downloads_are_cached(self):
+        render = reports.renderers.render_pdf_bytes
+        with patch('OnlineNotesAPI.renderers.render_pdf_bytes', wraps=render) as rendered:
+            first = self.client.get('/api/v1/pdf_download/', **self.headers)
+            body = b''.join(first.streaming_content)
+            self.assertTrue(body.startswith(b'%PDF'))
+            self.assertIn('attachment', first['Content-Disposition'])
+
+            second = self.client.get('/api/v1/pdf_view/', **self.headers)
+            self.assertEqual(b''.join(second.streaming_content), body)
+            self.assertEqual(second['ETag'], first['ETag'])
+            self.assertEqual(rendered.call_count, 1)
+
+            response = self.client.get('/api/v1/pdf_view/', HTTP_IF_NONE_MATCH=first['ETag'], **self.headers)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+            # A report job reuses the cached file too
+            reports.request_report(self.user.owner.id)
+            reports.process_next()
+            self.assertEqual(rendered.call_count, 1)
+
+            Note.objects.create(owner=self.user.owner, title='Changed', content='...')
+            response = self.client.get('/api/v1/pdf_view/', **self.headers)
+            self.assertNotEqual(response['ETag'], first['ETag'])
+            self.assertEqual(rendered.call_count, 2)
+
+        stats = reports.pdf_cache.stats()
+        self.assertEqual(stats['files'], 2)
+        self.assertGreaterEqual(stats['bytes_saved'], 2 * len(body))
+
+    def test_pdf_cache_evicts_least_recently_used(self):
+        cache = reports.pdf_cache
+        for number, key in enumerate(['a', 'b', 'c']):
+            cache.put(key, b'x' * 100)
+            os.utime(cache.path(key), (1000 + number, 1000 + number))
+        cache.open('a').close()
+
+        with override_settings(NOTES_PDF_CACHE_MAX_BYTES=300):
+            cache.put('d', b'x' * 100)
+        self.assertEqual(sorted(path.stem for path in cache.directory.glob('*.pdf')), ['a', 'c', 'd'])
+
+    @override_settings(NOTES_PDF_RENDER_MODE='parallel', NOTES_PDF_CHUNK_SIZE=4, NOTES_PDF_PROCESSES=2)
+    def test_parallel_chunked_rendering(self):
+        for number in range(1, 15):
+            Note.objects.create(owner=self.user.owner, title=f'Chunked {number}', content='...')
+        context = generate_user_notes(self.user.email)[0]
+
+        pdf = reports.renderers.render_pdf_bytes(reports.REPORT_TEMPLATE, context)
+        pages = PdfReader(io.BytesIO(pdf)).pages
+        text = '\n'.join(page.extract_text() for page in pages)
+        self.assertEqual(text.count('SUMMARY REPORT'), 1)
+        self.assertEqual(text.count('S/N'), 1)
+        self.assertIn('Total: 15', text)
+        self.assertIn(f'page {len(pages)} of {len(pages)}', text)
+        # S/N keeps counting across chunks
+        self.assertRegex(text, r'\b5\s+Chunked 4\b')
+        self.assertRegex(text, r'\b15\s+Chunked 14\b')
+
+    def test_reportlab_engine(self):
+        Note.objects.create(owner=self.user.owner, title='Überweisung — café', content='Ωmega <b>&</b>',
+                            priority='H')
+        context = generate_user_notes(self.user.email)[0]
+        with override_settings(NOTES_PDF_ENGINE='reportlab'):
+            key = reports.report_key(self.user.owner.id, self.user)
+            pdf = reports.render_report_pdf(context)
+        self.assertNotEqual(key, reports.report_key(self.user.owner.id, self.user))
+
+        pages = PdfReader(io.BytesIO(pdf)).pages
+        text = ' '.join('\n'.join(page.extract_text() for page in pages).split())
+        self.assertIn('SUMMARY REPORT', text)
+        self.assertIn('User: Kerry Hilson', text)
+        self.assertIn('Überweisung — café', text)
+        self.assertIn('Ωmega <b>&</b>', text)
+        self.assertIn('Total: 2', text)
+        self.assertIn(f'page {len(pages)} of {len(pages)}', text)
+        fonts = {font.get_object()['/BaseFont'] for font in pages[0]['/Resources']['/Font'].values()}
+        # TrueType fonts are embedded as subsets
+        self.assertTrue(any(name.startswith('/AAAAAA+') for name in fonts))
+
+
+class NoteReminderTests(TestCase):
+
+    def setUp(self):
+        self.today = datetime.date(2026, 3, 10)
+        self.users = [User.objects.create_user(email=f'reminder{number}@example.com', password=password,
+                                               first_name=first_name, last_name=last_name)
+                      for number in range(3)]
+        first, second, third = (user.owner for user in self.users)
+        Note.objects.create(owner=first, title='Overdue', content='...',
+                            due_date=self.today - datetime.timedelta(days=2))
+        Note.objects.create(owner=first, title='Tomorrow', content='...',
+                            due_date=self.today + datetime.timedelta(days=1), status=Note.STATUS_WIP)
+        Note.objects.create(owner=first, title='Next week', content='...',
+                            due_date=self.today + datetime.timedelta(days=7))
+        Note.objects.create(owner=second, title='Finished', content='...',
+                            due_date=self.today, status=Note.STATUS_END)
+        Note.objects.create(owner=third, title='Today', content='...', due_date=self.today)
+
+    def test_one_digest_per_user_with_due_notes(self):
+        with self.assertNumQueries(1):
+            digests = list(reminders.owner_digests(reminders.due_notes(self.today)))
+        self.assertEqual([(owner_id, count) for owner_id, _, count in digests],
+                         [(self.users[0].owner.id, 2), (self.users[2].owner.id, 1)])
+
+        run = reminders.send_reminders(self.today)
+
+        self.assertEqual((run.status, run.owners_notified, run.notes_count), (ReminderRun.STATUS_COMPLETED, 2, 3))
+        self.assertEqual([message.to for message in mail.outbox],
+                         [['reminder0@example.com'], ['reminder2@example.com']])
+        body = mail.outbox[0].body
+        self.assertIn('These notes are overdue:\n\n  - Overdue (due Sun, 08 Mar 2026', body)
+        self.assertIn('These notes are due soon:\n\n  - Tomorrow (due Wed, 11 Mar 2026, Medium priority, '
+                      'In Progress)', body)
+        self.assertNotIn('Next week', body)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.STATUS_SENT).count(), 2)
+
+        # Rerunning a completed day sends nothing
+        reminders.send_reminders(self.today)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_rerun_resumes_from_checkpoint(self):
+        with override_settings(NOTES_REMINDER_BATCH_SIZE=1):
+            run = reminders.send_reminders(self.today, window=0.000001)
+            self.assertEqual((run.status, run.last_owner_id), (ReminderRun.STATUS_RUNNING, self.users[0].owner.id))
+            self.assertEqual(len(mail.outbox), 1)
+
+            run = reminders.send_reminders(self.today)
+
+        self.assertEqual((run.status, run.owners_notified), (ReminderRun.STATUS_COMPLETED, 2))
+        self.assertEqual([message.to for message in mail.outbox],
+                         [['reminder0@example.com'], ['reminder2@example.com']])
+
+    def test_batches_are_sent_without_primary_keys(self):
+        # Some backends, MySQL among them, don't set pks on bulk_create()
+        bulk_create = OutboundEmail.objects.bulk_create
+
+        def without_pks(objects, **kwargs):
+            created = bulk_create(objects, **kwargs)
+            for email in created:
+                email.pk = None
+            return created
+
+        with patch.object(OutboundEmail.objects, 'bulk_create', side_effect=without_pks):
+            reminders.send_reminders(self.today)
+
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.STATUS_SENT).count(), 2)
+
+    def test_failed_sends_stay_in_outbox(self):
+        with patch('django.core.mail.EmailMessage.send', side_effect=ConnectionRefusedError('refused')):
+            run = reminders.send_reminders(self.today)
+
+        self.assertEqual(run.status, ReminderRun.STATUS_COMPLETED)
+        self.assertEqual(OutboundEmail.objects.filter(status=OutboundEmail.STATUS_QUEUED).count(), 2)
+
+
+class SendAttachmentTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+        self.spool = tempfile.TemporaryDirectory()
+        self.addCleanup(self.spool.cleanup)
+        settings_override = override_settings(NOTES_OUTBOX_DIR=self.spool.name, NOTES_ATTACHMENT_MAX_BYTES=4096)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def send(self, content: bytes):
+        file = SimpleUploadedFile('notes.pdf', content, content_type='application/pdf')
+        return self.client.post('/api/v1/send_attachment/', {'file': file}, **self.headers)
+
+    def test_attachment_is_queued(self):
+        response = self.send(b'%PDF-1.4 notes')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        queued = OutboundEmail.objects.get()
+        self.assertEqual((queued.to, queued.attachment_name), (email, 'notes.pdf'))
+        self.assertEqual(Path(queued.attachment_path).read_bytes(), b'%PDF-1.4 notes')
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=100)
+    def test_spooled_upload_is_moved_into_outbox(self):
+        content = b'x' * 2000
+        response = self.send(content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Path(OutboundEmail.objects.get().attachment_path).read_bytes(), content)
+
+    def test_oversize_content_length_is_rejected_unread(self):
+        with patch('notebook.views.SizeCappedUploadHandler') as mock_handler:
+            response = self.send(b'x' * 32 * 1024)
+
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        mock_handler.assert_not_called()
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_oversize_upload_is_stopped_while_streaming(self):
+        response = self.send(b'x' * 5000)
+
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_file_is_required(self):
+        response = self.client.post('/api/v1/send_attachment/', {}, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class NoteRevisionTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email=email,
+            password=password,
+            first_name=first_name,
+            last_name=last_name,
+        )
+        self.headers = {
+            'HTTP_AUTHORIZATION': f'Bearer {generate_token(self.user.id)}'}
+        self.note = Note.objects.create(owner=self.user.owner, title='Draft', slug='draft',
+                                        content='The quick brown fox jumps over the lazy dog.')
+        self.url = f'/api/v1/notes/{self.note.id}/revisions/'
+
+    def edit(self, **data):
+        body = {'title': self.note.title, 'slug': self.note.slug, 'content': self.note.content, **data}
+        response = self.client.put(f'/api/v1/notes/{self.note.id}/', body,
+                                   content_type='application/json', **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.note.refresh_from_db()
+
+    def test_diff_round_trip(self):
+        source = 'Line one\n  with   spacing\nand a tail'
+        target = 'Line one\nwith spacing changed\nand a tail!'
+        ops = revisions.diff(source, target)
+        self.assertEqual(revisions.patch(source, ops), target)
+        self.assertEqual(revisions.patch(target, revisions.diff(target, '')), '')
+        self.assertEqual(revisions.diff('same', 'same'), [1])
+
+    def test_edits_keep_deltas_and_rebuild(self):
+        versions = [self.note.content]
+        for number in range(1, 13):
+            content = f'{versions[-1]} Edit {number}.'
+            self.edit(content=content, priority='H' if number % 2 else 'M')
+            versions.append(content)
+
+        stored = list(NoteRevision.objects.filter(note=self.note).order_by('number'))
+        self.assertEqual(len(stored), 12)
+        self.assertEqual([revision.number for revision in stored if revision.is_snapshot], [10])
+        self.assertLess(stored[3].size, len(versions[3]))
+
+        for number in (1, 5, 9, 10, 11, 12):
+            response = self.client.get(f'{self.url}{number}/', **self.headers)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()['content'], versions[number - 1])
+            self.assertEqual(response.json()['priority'], 'H' if number % 2 == 0 else 'M')
+
+        listed = self.client.get(self.url, **self.headers).json()
+        self.assertEqual([revision['number'] for revision in listed], list(range(12, 0, -1)))
+
+    def test_restore_records_the_replaced_version(self):
+        self.edit(title='Final', content='Rewritten completely.')
+
+        response = self.client.post(f'{self.url}1/restore/', **self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.note.refresh_from_db()
+        self.assertEqual((self.note.title, self.note.content),
+                         ('Draft', 'The quick brown fox jumps over the lazy dog.'))
+        restored = self.client.get(f'{self.url}2/', **self.headers).json()
+        self.assertEqual((restored['title'], restored['content']), ('Final', 'Rewritten completely.'))
+
+    def test_stale_instances_record_what_they_replace(self):
+        first = Note.objects.get(pk=self.note.pk)
+        second = Note.objects.get(pk=self.note.pk)
+        first.content = 'First edit.'
+        first.save()
+        second.content = 'Second edit.'
+        second.save()
+
+        self.assertEqual(revisions.rebuild(self.note, 1).data['content'],
+                         'The quick brown fox jumps over the lazy dog.')
+        self.assertEqual(revisions.rebuild(self.note, 2).data['content'], 'First edit.')
+
+        # The stale instance's deltas still apply on top of later edits
+        second.content = 'Third edit.'
+        second.save()
+        self.assertEqual([revisions.rebuild(self.note, number).data['content'] for number in (1, 2, 3)],
+                         ['The quick brown fox jumps over the lazy dog.', 'First edit.', 'Second edit.'])
+
+    def test_batch_updates_are_recorded(self):
+        batch.apply_batch(self.user.owner.id, [
+            {'op': 'update', 'id': self.note.id, 'data': {'content': 'Batch edit.'}}])
+
+        revision = revisions.rebuild(self.note, 1)
+        self.assertEqual(revision.data['content'], 'The quick brown fox jumps over the lazy dog.')
+
+    def test_retention(self):
+        with override_settings(NOTES_REVISION_LIMIT=3):
+            for number in range(5):
+                self.edit(content=f'Version {number}')
+
+        self.assertEqual(list(NoteRevision.objects.filter(note=self.note).order_by('number')
+                              .values_list('number', flat=True)), [3, 4, 5])
+        self.assertEqual(revisions.rebuild(self.note, 3).data['content'], 'Version 1')
+        self.assertEqual(self.client.get(f'{self.url}1/', **self.headers).status_code, status.HTTP_404_NOT_FOUND)
+
+        NoteRevision.objects.filter(number=3).update(created_at=timezone.now() - datetime.timedelta(days=400))
+        self.assertEqual(revisions.purge_expired(), 1)
+
+    def test_other_owners_revisions_are_hidden(self):
+        self.edit(content='Changed')
+        other = User.objects.create_user(email='other@example.com', password=password,
+                                         first_name=first_name, last_name=last_name)
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {generate_token(other.id)}'}
+        self.assertEqual(self.client.get(f'{self.url}1/', **headers).status_code, status.HTTP_404_NOT_FOUND)
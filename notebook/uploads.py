@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+# Allowance for the multipart boundaries and part headers around the file
+# when judging an upload by its Content-Length
+MULTIPART_ENVELOPE = 16 * 1024
+
+
+def attachment_limit() -> int:
+    return getattr(settings, 'NOTES_ATTACHMENT_MAX_BYTES', 10 * 1024 * 1024)
+
+
+def content_length(request) -> int:
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return 0
+
+
+def declares_oversize(request, limit: int) -> bool:
+    '''
+    Whether the request says up front that its body is bigger than an upload
+    of `limit` bytes can be, so it can be refused before the body is read.
+    '''
+    return content_length(request) > limit + MULTIPART_ENVELOPE
+
+
+class SizeCappedUploadHandler(FileUploadHandler):
+    '''
+    Stops the upload as soon as the files in it pass `limit` bytes, for
+    requests without a Content-Length or with a wrong one. Install it before
+    the default handlers, which spool the data to memory or a temporary file.
+    '''
+
+    def __init__(self, request=None, limit: int = None):
+        super().__init__(request)
+        self.limit = attachment_limit() if limit is None else limit
+        self.received = 0
+        self.exceeded = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.limit:
+            self.exceeded = True
+            raise StopUpload(connection_reset=True)
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
@@ -4,7 +4,21 @@ from . import views, services
 ''' Setup endpoint routes '''
 urlpatterns = [
     path("notes/", views.NoteList.as_view(), name="note-list"),
+    path("notes/search/", views.NoteSearch.as_view(), name="note-search"),
+    path("notes/autocomplete/", views.NoteAutocomplete.as_view(), name="note-autocomplete"),
+    path("notes/stats/", views.NoteStats.as_view(), name="note-stats"),
+    path("notes/batch/", views.NoteBatch.as_view(), name="note-batch"),
+    path("notes/imports/", views.NoteImportList.as_view(), name="note-import-list"),
+    path("notes/imports/<int:import_id>/", views.NoteImportDetail.as_view(), name="note-import-detail"),
+    path("notes/export/", views.NoteExport.as_view(), name="note-export"),
+    path("notes/reports/", views.NoteReportList.as_view(), name="note-report-list"),
+    path("notes/reports/<int:report_id>/", views.NoteReportDetail.as_view(), name="note-report-detail"),
     path("notes/<int:note_id>/", views.NoteDetail.as_view(), name="note-detail"),
+    path("notes/<int:note_id>/revisions/", views.NoteRevisionList.as_view(), name="note-revision-list"),
+    path("notes/<int:note_id>/revisions/<int:number>/", views.NoteRevisionDetail.as_view(),
+         name="note-revision-detail"),
+    path("notes/<int:note_id>/revisions/<int:number>/restore/", views.NoteRevisionRestore.as_view(),
+         name="note-revision-restore"),
     path('pdf_view/', views.ViewPDF.as_view(), name="pdf_view"),
     path('pdf_download/', views.DownloadPDF.as_view(), name="pdf_download"),
     path('csv_download/', views.DownloadCSV.as_view(), name="csv_download"),
@@ -1,102 +1,398 @@
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import FileResponse, Http404
 from django.shortcuts import get_object_or_404
-from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
 from django.views.decorators.csrf import csrf_exempt
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status, permissions
 from OnlineNotesAPI import renderers
-from core import authentication, services
+from core import authentication, outbox
 from core.models import User
-from notebook.services import categorize_notes, filter_by_status, generate_user_notes, order_notes
-from .models import Note, Owner
-from .serializers import NoteSerializer
+from notebook.services import owner_notes
+from .autocomplete import complete_titles
+from .batch import apply_batch
+from .caching import NotesVersionDataClass, add_validator_headers, not_modified_response, response_cache
+from .exports import csv_chunks, ndjson_chunks, streaming_download, timestamped_filename
+from .filters import NoteFilter
+from .imports import error_file_path, run_import, start_import
+from .models import NoteImport, NoteReport, NoteRevision
+from .pagination import NoteCursorPagination
+from .reports import report_key, report_path, report_pdf, request_report
+from .search import get_backend, search_notes
+from .revisions import rebuild, restore_data
+from .serializers import (NoteImportSerializer, NoteReportSerializer, NoteRevisionSerializer, NoteSerializer,
+                          project_notes, serialize_notes)
+from .stats import note_stats
+from .uploads import SizeCappedUploadHandler, attachment_limit, declares_oversize
 from datetime import datetime
-import csv
 
 
-class NoteList(APIView):
+class NoteReadPathMixin:
+    '''
+    Selects how a view reads notes: the `values()` row serializer and the
+    orjson-backed renderer (the default, see NOTES_FAST_READ_PATH), or
+    NoteSerializer over model instances. Both produce the same bytes.
+    '''
+    renderer_classes = (renderers.FastJSONRenderer, BrowsableAPIRenderer)
+    fast_read_path = None
+
+    def use_fast_read_path(self) -> bool:
+        if self.fast_read_path is not None:
+            return self.fast_read_path
+        return getattr(settings, 'NOTES_FAST_READ_PATH', True)
+
+
+class NoteList(NoteReadPathMixin, APIView):
     authentication_classes = (authentication.CustomUserAuthentication, )
     permission_classes = (permissions.IsAuthenticated, )
 
     def get(self, request):
         '''
-        Get all notes created by the authenticated user.
+        Get all notes created by the authenticated user, narrowed and ordered by
+        any combination of the NoteFilter parameters. When a cursor or page size
+        is supplied, results are paginated by keyset (see NoteCursorPagination).
+        Answers 304 when the client's ETag still matches the owner's notes version.
+        `fields` narrows both the output and the columns read.
         '''
         try:
-            requester = request.user
+            notes_version = NotesVersionDataClass.for_owner(request.auth.owner_id)
+            not_modified = not_modified_response(request, notes_version)
+            if not_modified is not None:
+                return not_modified
+
+            cached = response_cache.get(request, notes_version)
+            if cached is not None:
+                return add_validator_headers(cached, request, notes_version)
+
+            note_filter = NoteFilter(
+                request.query_params, queryset=owner_notes(request.auth.owner_id))
+
+            if not note_filter.is_valid():
+                return Response({'detail': note_filter.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+            notes_queryset = note_filter.qs
+
+            # Sparse fieldsets: unread columns (e.g. content) are not loaded either
+            fields = NoteSerializer.get_requested_fields(request.query_params)
+            fast = self.use_fast_read_path()
+            notes_queryset = project_notes(notes_queryset, fields, fast)
+
+            paginator = NoteCursorPagination()
+            if paginator.is_requested(request):
+                page = paginator.paginate_queryset(notes_queryset, request, self)
+                response = paginator.get_paginated_response(
+                    serialize_notes(page, fields, fast))
+            else:
+                response = Response(serialize_notes(
+                    notes_queryset, fields, fast), status=status.HTTP_200_OK)
+
+            response_cache.store(response, request, notes_version)
+            return add_validator_headers(response, request, notes_version)
+        except Exception as e:
+            return Response({'detail': e.args[0:]}, status=status.HTTP_400_BAD_REQUEST)
+
+    def post(self, request):
+        '''
+        Create a new note with title, slug and content provided as part of POST data.
+        The note is saved against the requester's owner, which is provisioned
+        when the user registers.
+        '''
+        try:
+            serializer = NoteSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(owner_id=request.auth.owner_id)
+
+            return Response({"response": "record created successfully.", "data": serializer.data}, status=status.HTTP_201_CREATED)
+
+        except Exception as e:
+            return Response(data={'detail': e.args[0:]}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class NoteSearch(NoteReadPathMixin, APIView):
+    authentication_classes = (authentication.CustomUserAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
+
+    def get(self, request):
+        '''
+        Full-text search over the title and content of the authenticated user's
+        notes. Every word in `q` must match; results are ranked by relevance
+        and carry an HTML-escaped title and content excerpt with matches in
+        <mark>. Paginated with `page` and `page_size`.
+        '''
+        try:
+            query = request.query_params.get('q', '').strip()
+            if not query:
+                return Response({'detail': 'The q parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            page_size = NoteCursorPagination().get_page_size(request)
+            try:
+                page = max(1, int(request.query_params.get('page', 1)))
+            except ValueError:
+                page = 1
+
+            notes_version = NotesVersionDataClass.for_owner(request.auth.owner_id)
+            not_modified = not_modified_response(request, notes_version)
+            if not_modified is not None:
+                return not_modified
+
+            cached = response_cache.get(request, notes_version)
+            if cached is not None:
+                return add_validator_headers(cached, request, notes_version)
+
+            # One extra row tells whether there is a next page
+            results = search_notes(request.auth.owner_id, query,
+                                   limit=page_size + 1, offset=(page - 1) * page_size)
+
+            response = Response({
+                'query': query,
+                'backend': get_backend().name,
+                'next': self.page_link(request, page + 1) if len(results) > page_size else None,
+                'previous': self.page_link(request, page - 1) if page > 1 else None,
+                'results': results[:page_size],
+            }, status=status.HTTP_200_OK)
+
+            response_cache.store(response, request, notes_version)
+            return add_validator_headers(response, request, notes_version)
+        except Exception as e:
+            return Response({'detail': e.args[0:]}, status=status.HTTP_400_BAD_REQUEST)
+
+    def page_link(self, request, page):
+        params = request.query_params.copy()
+        params['page'] = page
+        return request.build_absolute_uri(f'{request.path}?{params.urlencode()}')
+
+
+class NoteAutocomplete(APIView):
+    authentication_classes = (authentication.CustomUserAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
+
+    def get(self, request):
+        '''
+        Search-as-you-type over the authenticated user's note titles. `q` may be
+        a partly typed or misspelt title; up to `limit` notes are returned,
+        ranked by trigram similarity and then recency.
+        '''
+        try:
+            query = request.query_params.get('q', '')
+            try:
+                limit = int(request.query_params.get('limit', 10))
+            except ValueError:
+                limit = 10
+            limit = max(1, min(limit, getattr(settings, 'NOTES_AUTOCOMPLETE_MAX_LIMIT', 50)))
+
+            return Response({
+                'query': query,
+                'results': complete_titles(request.auth.owner_id, query, limit),
+            }, status=status.HTTP_200_OK)
+        except Exception as e:
+            return Response({'detail': e.args[0:]}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class NoteStats(NoteReadPathMixin, APIView):
+    authentication_classes = (authentication.CustomUserAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
 
-            user = User.objects.get(email=requester)
+    def get(self, request):
+        '''
+        Counts of the authenticated user's notes by status, priority and
+        category, plus overdue and due-this-week counts. Answers 304 when the
+        client's ETag still matches the owner's notes version.
+        '''
+        try:
+            notes_version = NotesVersionDataClass.for_owner(request.auth.owner_id)
+            not_modified = not_modified_response(request, notes_version)
+            if not_modified is not None:
+                return not_modified
 
-            notes_queryset = Note.objects.select_related(
-                'owner').filter(owner__user_id=user.id).all()
+            cached = response_cache.get(request, notes_version)
+            if cached is not None:
+                return add_validator_headers(cached, request, notes_version)
 
-            note_status = request.query_params.get('status')
+            response = Response(note_stats(request.auth.owner_id), status=status.HTTP_200_OK)
 
-            query_param_keys = list(dict.keys(request.query_params))
+            response_cache.store(response, request, notes_version)
+            return add_validator_headers(response, request, notes_version)
+        except Exception as e:
+            return Response({'detail': e.args[0:]}, status=status.HTTP_400_BAD_REQUEST)
 
-            query_param_keys = [key.lower() for key in query_param_keys]
 
-            if 'status' in query_param_keys:
-                note_status = request.query_params.get('status')
-                notes_queryset = filter_by_status(note_status, user.id)
-            elif 'ordering' in query_param_keys:
-                note_status = request.query_params.get('ordering')
-                notes_queryset = order_notes(note_status, user.id)
-            elif 'category' in query_param_keys:
-                note_status = request.query_params.get('category')
-                notes_queryset = categorize_notes(note_status, user.id)
+class NoteBatch(APIView):
+    authentication_classes = (authentication.CustomUserAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
 
-            serializer = NoteSerializer(notes_queryset, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+    def post(self, request):
+        '''
+        Apply a list of create, update and delete operations to the
+        authenticated user's notes in one transaction. The body is either the
+        list itself or {"operations": [...], "atomic": false} to apply the valid
+        operations even when others fail. Every operation gets its own result.
+        '''
+        try:
+            payload = request.data
+            if isinstance(payload, list):
+                operations, atomic = payload, True
+            else:
+                operations, atomic = payload.get('operations'), payload.get('atomic', True) is not False
+
+            if not isinstance(operations, list):
+                return Response({'detail': 'Expected a list of operations.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            max_operations = getattr(settings, 'NOTES_BATCH_MAX_OPERATIONS', 500)
+            if len(operations) > max_operations:
+                return Response({'detail': f'A batch may contain at most {max_operations} operations.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            results = apply_batch(request.auth.owner_id, operations, atomic)
+            failed = sum('errors' in result for result in results)
+
+            if not failed:
+                response_status = status.HTTP_200_OK
+            elif atomic:
+                response_status = status.HTTP_400_BAD_REQUEST
+            else:
+                response_status = status.HTTP_207_MULTI_STATUS
+
+            return Response({
+                'atomic': atomic,
+                'applied': 0 if failed and atomic else len(results) - failed,
+                'failed': failed,
+                'results': results,
+            }, status=response_status)
         except Exception as e:
             return Response({'detail': e.args[0:]}, status=status.HTTP_400_BAD_REQUEST)
 
+
+class NoteImportList(APIView):
+    authentication_classes = (authentication.CustomUserAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
+
     def post(self, request):
         '''
-        Create a new note with title, slug and content provided as part of POST data.
-        The method validates that the requester is a registered member, after
-        which the note is saved. If user's email isn't validated, this endpoint creates 
-        the user as the owner of the note and sets email valid to False.
+        Import notes from an uploaded CSV (DownloadCSV's columns) or JSON Lines
+        `file`, streamed in batches of `batch_size`. Rejected rows are
+        collected in an error file. Pass `resume` with the id of an
+        interrupted import and the same file to continue after its last
+        committed batch.
         '''
         try:
-            raw_user_data = request.user
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({'detail': 'A file is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+            batch_size = request.data.get('batch_size')
+            resume = request.data.get('resume')
+            job = start_import(
+                request.auth.owner_id, upload.name, upload.size,
+                file_format=request.data.get('format') or None,
+                batch_size=min(int(batch_size), 10000) if batch_size else None,
+                resume_id=int(resume) if resume else None)
+        except NoteImport.DoesNotExist:
+            return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({'detail': e.args[0:]}, status=status.HTTP_400_BAD_REQUEST)
 
-            if raw_user_data:
-                user = get_object_or_404(User, email=raw_user_data)
+        try:
+            run_import(job, upload.file)
+        except Exception:
+            # The job records the failure and the rows committed so far
+            pass
 
-                new_note_owner = Owner.objects.select_related('user').filter(
-                    user_id=user.id).first()
+        return Response(NoteImportSerializer(job).data,
+                        status=status.HTTP_201_CREATED if job.status == NoteImport.STATUS_COMPLETED
+                        else status.HTTP_400_BAD_REQUEST)
 
-                # if new_note_owner is None, insert into owner table before creating note
-                with transaction.atomic():
-                    if new_note_owner is None:
-                        new_note_owner = Owner()
-                        new_note_owner.is_email_valid = False
-                        new_note_owner.user = user
-                        new_note_owner.save()
 
-                    new_request_data = {**request.data,
-                                        'owner': new_note_owner.id}
+class NoteImportDetail(APIView):
+    authentication_classes = (authentication.CustomUserAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
 
-                    # save new note
-                    serializer = NoteSerializer(
-                        data=new_request_data)
-                    serializer.is_valid(raise_exception=True)
+    def get(self, request, import_id):
+        '''
+        Progress of an import. `?errors=true` downloads its rejected rows as
+        JSON Lines instead.
+        '''
+        job = get_object_or_404(NoteImport, pk=import_id, owner_id=request.auth.owner_id)
 
-                    validated_data = serializer.validated_data
+        if request.query_params.get('errors') == 'true':
+            path = error_file_path(job)
+            if not path.exists():
+                return Response({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+            return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'import-{job.id}-errors.ndjson',
+                                content_type='application/x-ndjson')
 
-                    new_note = Note(**validated_data)
+        return Response(NoteImportSerializer(job).data, status=status.HTTP_200_OK)
 
-                    new_note.save()
 
-                return Response({"response": "record created successfully.", "data": serializer.data}, status=status.HTTP_201_CREATED)
+class NoteExport(APIView):
+    authentication_classes = (authentication.CustomUserAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
 
+    def get(self, request):
+        '''
+        Stream the authenticated user's notes as JSON Lines, one note object
+        per line, gzip encoded when the client accepts it. Takes the
+        NoteFilter parameters; `updated_since` limits an incremental export
+        to notes changed at or after that time.
+        '''
+        try:
+            note_filter = NoteFilter(
+                request.query_params, queryset=owner_notes(request.auth.owner_id))
+            if not note_filter.is_valid():
+                return Response({'detail': note_filter.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+            notes = note_filter.qs
+            if not request.query_params.get('ordering'):
+                notes = notes.order_by('id')
+            return streaming_download(
+                request, ndjson_chunks(notes), 'application/x-ndjson',
+                timestamped_filename('Notes export', 'ndjson'))
         except Exception as e:
-            return Response(data={'detail': e.args[0:]}, status=status.HTTP_400_BAD_REQUEST)
+            return Response({'detail': e.args[0:]}, status=status.HTTP_400_BAD_REQUEST)
+
 
+class NoteReportList(APIView):
+    authentication_classes = (authentication.CustomUserAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
 
-class NoteDetail(APIView):
+    def post(self, request):
+        '''
+        Queue a PDF report of the authenticated user's notes for the report
+        workers (manage.py run_report_workers). Answers 202 with the job; a
+        report already queued or running is returned instead of a new one.
+        '''
+        try:
+            report, created = request_report(request.auth.owner_id)
+            response = Response(NoteReportSerializer(report).data,
+                                status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK)
+            response['Location'] = request.build_absolute_uri(f'{request.path}{report.id}/')
+            return response
+        except Exception as e:
+            return Response({'detail': e.args[0:]}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class NoteReportDetail(APIView):
+    authentication_classes = (authentication.CustomUserAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
+
+    def get(self, request, report_id):
+        '''
+        Progress of a report. `?download=true` streams the finished PDF from
+        disk instead.
+        '''
+        report = get_object_or_404(NoteReport, pk=report_id, owner_id=request.auth.owner_id)
+
+        if request.query_params.get('download') == 'true':
+            if report.status != NoteReport.STATUS_COMPLETED:
+                return Response({'detail': f'The report is {report.status}.'}, status=status.HTTP_409_CONFLICT)
+            return FileResponse(open(report_path(report), 'rb'), as_attachment=True,
+                                filename=f'Notes report {report.id}.pdf', content_type='application/pdf')
+
+        return Response(NoteReportSerializer(report).data, status=status.HTTP_200_OK)
+
+
+class NoteDetail(NoteReadPathMixin, APIView):
     """
     This class is used to retrieve, update or delete a note based on ID.
     """
@@ -108,18 +404,31 @@ class NoteDetail(APIView):
         """
         This method retrieves a specific note using the provided id and 
         returns it in json format if found else raises 404 error code. 
-        Only notes created by the logged in user are returned.
+        Only notes created by the logged in user are returned. Answers 304
+        when the client's ETag still matches the owner's notes version.
+        `fields` narrows both the output and the columns read.
         """
         try:
-            requester = request.user
-            user = User.objects.get(email=requester)
+            notes_version = NotesVersionDataClass.for_owner(request.auth.owner_id)
+            not_modified = not_modified_response(request, notes_version)
+            if not_modified is not None:
+                return not_modified
 
-            notes_queryset = Note.objects.select_related(
-                'owner').filter(owner__user_id=user.id).all()
+            cached = response_cache.get(request, notes_version)
+            if cached is not None:
+                return add_validator_headers(cached, request, notes_version)
+
+            fields = NoteSerializer.get_requested_fields(request.query_params)
+            fast = self.use_fast_read_path()
+            notes_queryset = project_notes(
+                owner_notes(request.auth.owner_id), fields, fast)
 
             note = get_object_or_404(notes_queryset, pk=note_id)
-            serializer = NoteSerializer(note)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            response = Response(serialize_notes(
+                note, fields, fast, many=False), status=status.HTTP_200_OK)
+
+            response_cache.store(response, request, notes_version)
+            return add_validator_headers(response, request, notes_version)
         except Exception as e:
             return Response({'detail': e.args[0:]}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -128,13 +437,8 @@ class NoteDetail(APIView):
         This method updates a note using the specific note details of the given id 
         and returns it in json format if found else raises 404 error code.
         """
-        requester = request.user
-        user = User.objects.get(email=requester)
-
-        notes_queryset = Note.objects.select_related(
-            'owner').filter(owner__user_id=user.id).all()
-
-        note = get_object_or_404(notes_queryset, pk=note_id)
+        note = get_object_or_404(
+            owner_notes(request.auth.owner_id), pk=note_id)
         serializer = NoteSerializer(note, data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
@@ -146,52 +450,109 @@ class NoteDetail(APIView):
         identifier i.e., Note Id provided as parameter. If not present then
         raises HTTP Not Found Error with appropriate message.
         """
-        requester = request.user
-        user = User.objects.get(email=requester)
-
-        notes_queryset = Note.objects.select_related(
-            'owner').filter(owner__user_id=user.id).all()
-
-        note = get_object_or_404(notes_queryset, pk=note_id)
+        note = get_object_or_404(
+            owner_notes(request.auth.owner_id), pk=note_id)
         note.delete()
         return Response({'response': 'deleted'}, status=status.HTTP_204_NO_CONTENT)
 
 
-class ViewPDF(APIView):
+class NoteRevisionList(APIView):
+    authentication_classes = (authentication.CustomUserAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
+
+    def get(self, request, note_id):
+        '''
+        The note's stored revisions, newest first.
+        '''
+        note = get_object_or_404(owner_notes(request.auth.owner_id).only('id'), pk=note_id)
+        revisions = NoteRevision.objects.filter(note=note).order_by('-number').defer('data')
+        return Response(NoteRevisionSerializer(revisions, many=True).data, status=status.HTTP_200_OK)
+
+
+class NoteRevisionMixin:
+    authentication_classes = (authentication.CustomUserAuthentication, )
+    permission_classes = (permissions.IsAuthenticated, )
+
+    def get_revision(self, request, note_id, number):
+        note = get_object_or_404(owner_notes(request.auth.owner_id), pk=note_id)
+        try:
+            return note, rebuild(note, number)
+        except NoteRevision.DoesNotExist:
+            raise Http404('No such revision.')
+
+
+class NoteRevisionDetail(NoteRevisionMixin, APIView):
+
+    def get(self, request, note_id, number):
+        '''
+        A revision with the note's fields as they were, rebuilt from the
+        nearest snapshot.
+        '''
+        _, revision = self.get_revision(request, note_id, number)
+        return Response({**NoteRevisionSerializer(revision).data, **revision.data}, status=status.HTTP_200_OK)
+
+
+class NoteRevisionRestore(NoteRevisionMixin, APIView):
+
+    def post(self, request, note_id, number):
+        '''
+        Restore the note to this revision. The version it replaces becomes
+        a new revision, so a restore can be undone.
+        '''
+        note, revision = self.get_revision(request, note_id, number)
+        serializer = NoteSerializer(note, data=restore_data(note, revision), partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class CachedReportMixin:
     '''
-    API view to render PDF file from HTML template and send it in response
+    Serves the user's PDF report from the rendered report cache (see
+    notebook.pdf_cache), with an ETag naming the cached file's inputs.
     '''
     authentication_classes = (authentication.CustomUserAuthentication, )
     permission_classes = (permissions.IsAuthenticated, )
 
+    def report_response(self, request, **file_options):
+        key = report_key(request.auth.owner_id, request.user)
+        etag = f'"{key}"'
+        response = get_conditional_response(request._request, etag=etag)
+        if response is None:
+            # Hits are sent straight from disk (sendfile under WSGI servers that offer it)
+            response = FileResponse(report_pdf(request.auth.owner_id, request.user, key),
+                                    content_type='application/pdf', **file_options)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization', 'Cookie'))
+        return response
+
+
+class ViewPDF(CachedReportMixin, APIView):
+    '''
+    API view to render PDF file from HTML template and send it in response
+    '''
+
     def get(self, request, *args, **kwargs):
         try:
-            pdf = renderers.render_to_pdf(
-                'app/pdf_template.html', generate_user_notes(request.user)[0])
-            return HttpResponse(pdf, content_type='application/pdf')
+            return self.report_response(request)
         except Exception as e:
-            return Response({'detail': e.args[0:]})
+            return Response({'detail': e.args[0:]}, status=status.HTTP_400_BAD_REQUEST)
 
 
 # Automatically downloads to PDF file
-class DownloadPDF(APIView):
+class DownloadPDF(CachedReportMixin, APIView):
     '''
     This class downloads notes list as PDF.
     '''
-    authentication_classes = (authentication.CustomUserAuthentication, )
-    permission_classes = (permissions.IsAuthenticated, )
 
     def get(self, request):
-
-        pdf = renderers.render_to_pdf(
-            'app/pdf_template.html', generate_user_notes(request.user)[0])
-
-        response = HttpResponse(pdf, content_type='application/pdf')
-        filename = "Notes List_%s.pdf" % (
-            datetime.strftime(datetime.now(), "%Y-%m-%d %H:%M:%S"))
-        content = "attachment; filename=%s" % (filename)
-        response['Content-Disposition'] = content
-        return response
+        try:
+            filename = "Notes List_%s.pdf" % (
+                datetime.strftime(datetime.now(), "%Y-%m-%d %H:%M:%S"))
+            return self.report_response(request, as_attachment=True, filename=filename)
+        except Exception as e:
+            return Response({'detail': e.args[0:]}, status=status.HTTP_400_BAD_REQUEST)
 
 
 class DownloadCSV(APIView):
@@ -203,39 +564,12 @@ class DownloadCSV(APIView):
 
     def get(self, request):
         '''
-        Utility code that builds a list of user's notes into a CSV and downloads the file to their machine.
+        Streams the user's notes as a CSV download, a chunk of rows at a
+        time, gzip encoded when the client accepts it.
         '''
-
-        refined_notes = generate_user_notes(request.user)[0]['notes']
-
-        note_fields = ['S/N']
-        note_values = []
-
-        for index, note in enumerate(refined_notes):
-            note_value = []
-            for key, value in note.items():
-                if key != 'owner' and key != 'id':
-                    note_value.append(value)
-
-                    # Populate headers only once
-                    if index == 0:
-                        note_fields.append(key)
-            note_values.append(note_value)
-
-        current_timestamp = datetime.strftime(
-            datetime.now(), "%Y-%m-%d %H:%M:%S")
-
-        response = HttpResponse(content_type='text/csv')
-        response[
-            'Content-Disposition'] = f'attachment; filename={"Notes list_%s.csv" % (current_timestamp)}'
-
-        writer = csv.writer(response)
-        writer.writerow(note_fields)
-
-        for index, note in enumerate(note_values):
-            writer.writerow([index + 1, *note])
-
-        return response
+        notes = owner_notes(request.auth.owner_id).order_by('id')
+        return streaming_download(
+            request, csv_chunks(notes), 'text/csv', timestamped_filename('Notes list', 'csv'))
 
 
 class SendAttachment(APIView):
@@ -252,9 +586,21 @@ class SendAttachment(APIView):
         File attachment is required.
         '''
         try:
+            limit = attachment_limit()
+            if declares_oversize(request, limit):
+                return Response({'detail': f'Attachments are limited to {limit} bytes.'},
+                                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            # Before the body is parsed, so an oversize upload stops early
+            size_cap = SizeCappedUploadHandler(request._request, limit)
+            request._request.upload_handlers.insert(0, size_cap)
 
             requester = request.user
             file = request.FILES.get('file')
+            if size_cap.exceeded:
+                return Response({'detail': f'Attachments are limited to {limit} bytes.'},
+                                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+            if file is None:
+                return Response({'detail': 'File attachment is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
             user = get_object_or_404(User, email=requester)
 
@@ -282,11 +628,8 @@ The Team
                 "file": file
             }
 
-            message_response = services.Util.send_verifyEmail(data)
-
-            if message_response == 1:
-                return Response({'detail': '1 mail sent successfully'}, status=status.HTTP_200_OK)
+            outbox.enqueue_email(data)
 
-            return Response({'detail': 'Failed to deliver email to recipients.'})
+            return Response({'detail': '1 mail queued for delivery'}, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({'detail': e.args[0:]}, status=status.HTTP_400_BAD_REQUEST)